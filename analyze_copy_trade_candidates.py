@@ -1,111 +1,63 @@
 import json
-from collections import defaultdict
+import numpy as np
+import dictionary_encoding
+import wallet_scoring
+from dictionary_encoding import PAIRS
+from stage_memo import StageMemo, code_version, content_hash
 
 # Load the wallet P&L data
 def load_wallet_data(file_path="wallet_pnl.json"):
     with open(file_path, "r") as f:
         return json.load(f)
 
-# Determine the most common trading pairs dynamically
-def get_common_pairs(wallets, top_n=5):
-    pair_counts = defaultdict(int)
-    for wallet in wallets:
-        asset_pairs = wallet["pnl"]["asset_pairs"]
-        for pair in asset_pairs:
-            pair_counts[pair] += 1
-    
-    # Sort pairs by frequency and take the top N
-    sorted_pairs = sorted(pair_counts.items(), key=lambda x: x[1], reverse=True)
-    common_pairs = [pair for pair, count in sorted_pairs[:top_n]]
-    return common_pairs
+# Pair ids of all wallets' asset pairs as one flat array, with the index of the wallet each
+# belongs to (see dictionary_encoding.py)
+def encode_wallet_pairs(wallets):
+    return PAIRS.encode_lists([wallet["pnl"]["asset_pairs"] for wallet in wallets])
+
+# Determine the most common trading pairs dynamically; returns pair ids, most frequent first
+# (ties in first-seen order)
+def get_common_pairs(pair_ids, top_n=5):
+    if len(pair_ids) == 0:
+        return []
+    pair_counts = np.bincount(pair_ids)
+    first_seen = np.full(len(pair_counts), len(pair_ids))
+    np.minimum.at(first_seen, pair_ids, np.arange(len(pair_ids)))
+    pairs = np.flatnonzero(pair_counts)
+    order = np.lexsort((first_seen[pairs], -pair_counts[pairs]))
+    return pairs[order[:top_n]].tolist()
 
 # Filter wallets based on criteria
-def filter_wallets(wallets, common_pairs):
+def filter_wallets(wallets, pair_ids, pair_owners, common_pairs):
+    # Wallets trading at least one exotic pair (not in the common pairs)
+    exotic = ~np.isin(pair_ids, common_pairs)
+    has_exotic_pairs = (np.bincount(pair_owners[exotic], minlength=len(wallets)) > 0).tolist()
+
     filtered_wallets = []
-    for wallet in wallets:
+    for wallet, exotic_pairs in zip(wallets, has_exotic_pairs):
         net_xlm_change = wallet["pnl"]["net_xlm_change"]
         num_swaps_analyzed = wallet["pnl"]["num_swaps_analyzed"]
-        asset_pairs = wallet["pnl"]["asset_pairs"]
 
         # Check profitability and swaps analyzed
         if net_xlm_change <= 50 or num_swaps_analyzed <= 0:
             continue
 
-        # Check for exotic pairs (not in the common pairs)
-        has_exotic_pairs = any(pair not in common_pairs for pair in asset_pairs)
-        if not has_exotic_pairs:
+        if not exotic_pairs:
             continue
 
         filtered_wallets.append(wallet)
     return filtered_wallets
 
+# Scoring features of one wallet P&L record (see wallet_scoring.py)
+def wallet_features(wallet):
+    pnl = wallet["pnl"]
+    round_trip_profit = pnl["num_round_trips"] > 0 and pnl["total_pnl_xlm"] > 0
+    return (pnl["net_xlm_change"], wallet["num_swaps"], wallet["total_volume_xlm"],
+            pnl["num_swaps_analyzed"], pnl["asset_pairs"], round_trip_profit)
+
 # Rank wallets based on a scoring system
 def rank_wallets(wallets):
-    ranked_wallets = []
-    for wallet in wallets:
-        net_xlm_change = wallet["pnl"]["net_xlm_change"]
-        num_swaps = wallet["num_swaps"]
-        total_volume_xlm = wallet["total_volume_xlm"]
-        num_swaps_analyzed = wallet["pnl"]["num_swaps_analyzed"]
-        asset_pairs = wallet["pnl"]["asset_pairs"]
-        total_pnl_xlm = wallet["pnl"]["total_pnl_xlm"]
-        num_round_trips = wallet["pnl"]["num_round_trips"]
-
-        # Calculate metrics
-        per_swap_profit = net_xlm_change / num_swaps_analyzed if num_swaps_analyzed > 0 else 0
-        daily_swaps = num_swaps / 2.0  # 48 hours = 2 days
-        pair_diversity = len(asset_pairs)
-
-        # Scoring system (weights can be adjusted)
-        # - Profitability (40%): Higher net_xlm_change is better
-        # - Activity (30%): Higher daily_swaps is better
-        # - Efficiency (20%): Higher per_swap_profit is better
-        # - Stability (10%): Lower pair_diversity is better (less volatility)
-        max_net_xlm = max(w["pnl"]["net_xlm_change"] for w in wallets)
-        max_daily_swaps = max(w["num_swaps"] / 2.0 for w in wallets)
-        max_per_swap_profit = max(w["pnl"]["net_xlm_change"] / w["pnl"]["num_swaps_analyzed"] for w in wallets)
-        max_pair_diversity = max(len(w["pnl"]["asset_pairs"]) for w in wallets)
-
-        profitability_score = (net_xlm_change / max_net_xlm) if max_net_xlm > 0 else 0
-        activity_score = (daily_swaps / max_daily_swaps) if max_daily_swaps > 0 else 0
-        efficiency_score = (per_swap_profit / max_per_swap_profit) if max_per_swap_profit > 0 else 0
-        stability_score = 1 - (pair_diversity / max_pair_diversity) if max_pair_diversity > 0 else 1
-
-        # Weighted score
-        score = (
-            0.4 * profitability_score +
-            0.3 * activity_score +
-            0.2 * efficiency_score +
-            0.1 * stability_score
-        )
-
-        # Risk assessment
-        risk_level = "Low" if daily_swaps > 100 else "Moderate" if daily_swaps > 10 else "High"
-        if pair_diversity > 20:
-            risk_level = "Moderate" if risk_level == "Low" else "High"
-
-        # Recommendation
-        trade_type = "Directional"
-        if num_round_trips > 0 and total_pnl_xlm > 0:
-            trade_type = "Directional and Round-Trips"
-
-        ranked_wallets.append({
-            "source_account": wallet["source_account"],
-            "net_xlm_change": net_xlm_change,
-            "num_swaps": num_swaps,
-            "total_volume_xlm": total_volume_xlm,
-            "per_swap_profit": per_swap_profit,
-            "daily_swaps": daily_swaps,
-            "pair_diversity": pair_diversity,
-            "asset_pairs": asset_pairs,
-            "score": score,
-            "risk_level": risk_level,
-            "trade_type": trade_type
-        })
-
-    # Sort by score descending
-    ranked_wallets.sort(key=lambda x: x["score"], reverse=True)
-    return ranked_wallets
+    return wallet_scoring.score_wallets(wallets, wallet_features)
 
 # Generate recommendations
 def generate_recommendations(ranked_wallets, top_n=3):
@@ -135,17 +87,16 @@ def generate_recommendations(ranked_wallets, top_n=3):
 
     return primary_candidates, secondary_candidates
 
-# Main function to analyze and rank candidates
-def analyze_copy_trade_candidates():
-    # Load data
-    wallets = load_wallet_data()
-
+# Select and rank copy-trade candidates from the loaded wallet P&L records.
+# Returns the candidates document {"primary_candidates": [...], "secondary_candidates": [...]}.
+def find_copy_trade_candidates(wallets):
     # Determine common pairs dynamically
-    common_pairs = get_common_pairs(wallets)
-    print(f"Determined common pairs: {common_pairs}")
+    pair_ids, pair_owners = encode_wallet_pairs(wallets)
+    common_pairs = get_common_pairs(pair_ids)
+    print(f"Determined common pairs: {PAIRS.decode_all(common_pairs)}")
 
     # Filter wallets
-    filtered_wallets = filter_wallets(wallets, common_pairs)
+    filtered_wallets = filter_wallets(wallets, pair_ids, pair_owners, common_pairs)
     print(f"Filtered {len(filtered_wallets)} wallets meeting criteria.")
 
     # Rank wallets
@@ -154,7 +105,27 @@ def analyze_copy_trade_candidates():
 
     # Generate recommendations
     primary_candidates, secondary_candidates = generate_recommendations(ranked_wallets)
-    
+    return {
+        "primary_candidates": primary_candidates,
+        "secondary_candidates": secondary_candidates
+    }
+
+# Memo key for the candidates computed from `wallets`: the input records and the code of this
+# file and the scoring module
+def candidates_memo_key(wallets):
+    return content_hash(wallets, code_version(__file__, wallet_scoring.__file__, dictionary_encoding.__file__))
+
+# Main function to analyze and rank candidates
+def analyze_copy_trade_candidates():
+    # Load data
+    wallets = load_wallet_data()
+
+    # Reuse the stored candidates when neither the input nor the scoring code changed
+    candidates = StageMemo().memoize("copy_trade_candidates", candidates_memo_key(wallets),
+                                     lambda: find_copy_trade_candidates(wallets))
+    primary_candidates = candidates["primary_candidates"]
+    secondary_candidates = candidates["secondary_candidates"]
+
     # Print results
     print("\nPrimary Candidates:")
     for candidate in primary_candidates:
@@ -173,10 +144,7 @@ def analyze_copy_trade_candidates():
 
     # Save results
     with open("copy_trade_candidates.json", "w") as f:
-        json.dump({
-            "primary_candidates": primary_candidates,
-            "secondary_candidates": secondary_candidates
-        }, f, indent=2)
+        json.dump(candidates, f, indent=2)
 
     print("\nSaved results to copy_trade_candidates.json")
 
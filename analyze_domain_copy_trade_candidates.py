@@ -1,112 +1,76 @@
 import json
-from collections import defaultdict
+import numpy as np
+import dictionary_encoding
+import wallet_scoring
+from dictionary_encoding import PAIRS
+from stage_memo import StageMemo, code_version, content_hash
 
 # Load the domain wallet rankings data
 def load_wallet_data(file_path="domain_wallet_rankings.json"):
     with open(file_path, "r") as f:
         return json.load(f)
 
-# Determine the most common trading pairs dynamically
-def get_common_pairs(wallets, top_n=5):
-    pair_counts = defaultdict(int)
+# Pair ids of all wallets (both directions of each traded asset, in assets_traded order) as one
+# flat array, with the index of the wallet each belongs to and the swaps behind it
+# (see dictionary_encoding.py)
+def encode_wallet_pairs(wallets):
+    wallet_pairs = []
+    pair_swaps = []
     for wallet in wallets:
-        # Generate asset pairs from assets_traded
+        pairs = []
         for asset_code, data in wallet["assets_traded"].items():
-            pair_counts[f"XLM/{asset_code}"] += data["num_swaps"]
-            pair_counts[f"{asset_code}/XLM"] += data["num_swaps"]
-    
-    # Sort pairs by frequency and take the top N
-    sorted_pairs = sorted(pair_counts.items(), key=lambda x: x[1], reverse=True)
-    common_pairs = [pair for pair, count in sorted_pairs[:top_n]]
-    return common_pairs
+            pairs += (f"XLM/{asset_code}", f"{asset_code}/XLM")
+            pair_swaps += (data["num_swaps"], data["num_swaps"])
+        wallet_pairs.append(pairs)
+    pair_ids, pair_owners = PAIRS.encode_lists(wallet_pairs)
+    return pair_ids, pair_owners, np.array(pair_swaps, dtype=np.int64)
+
+# Determine the most common trading pairs dynamically; returns pair ids, most swapped first
+# (ties in first-seen order)
+def get_common_pairs(pair_ids, pair_swaps, top_n=5):
+    if len(pair_ids) == 0:
+        return []
+    pair_counts = np.bincount(pair_ids, weights=pair_swaps)
+    first_seen = np.full(len(pair_counts), len(pair_ids))
+    np.minimum.at(first_seen, pair_ids, np.arange(len(pair_ids)))
+    pairs = np.flatnonzero(first_seen < len(pair_ids))
+    order = np.lexsort((first_seen[pairs], -pair_counts[pairs]))
+    return pairs[order[:top_n]].tolist()
 
 # Filter wallets based on criteria
-def filter_wallets(wallets, common_pairs):
+def filter_wallets(wallets, pair_ids, pair_owners, common_pairs):
+    # Wallets trading at least one exotic pair (not in the common pairs)
+    exotic = ~np.isin(pair_ids, common_pairs)
+    has_exotic_pairs = (np.bincount(pair_owners[exotic], minlength=len(wallets)) > 0).tolist()
+    pair_bounds = np.searchsorted(pair_owners, np.arange(len(wallets) + 1)).tolist()
+
     filtered_wallets = []
-    for wallet in wallets:
+    for index, (wallet, exotic_pairs) in enumerate(zip(wallets, has_exotic_pairs)):
         net_xlm_flow = wallet["net_xlm_flow"]
         num_swaps = wallet["num_swaps"]
 
-        # Generate asset pairs from assets_traded
-        asset_pairs = set()
-        for asset_code, data in wallet["assets_traded"].items():
-            asset_pairs.add(f"XLM/{asset_code}")
-            asset_pairs.add(f"{asset_code}/XLM")
-
         # Check profitability and number of swaps
         if net_xlm_flow <= 50 or num_swaps <= 0:
             continue
 
-        # Check for exotic pairs (not in the common pairs)
-        has_exotic_pairs = any(pair not in common_pairs for pair in asset_pairs)
-        if not has_exotic_pairs:
+        if not exotic_pairs:
             continue
 
-        wallet["asset_pairs"] = list(asset_pairs)
+        # Decoded once per candidate, distinct and in first-seen order
+        asset_pairs = dict.fromkeys(pair_ids[pair_bounds[index]:pair_bounds[index + 1]].tolist())
+        wallet["asset_pairs"] = PAIRS.decode_all(asset_pairs)
         filtered_wallets.append(wallet)
     return filtered_wallets
 
+# Scoring features of one domain wallet rankings record (see wallet_scoring.py); domain
+# rankings have no P&L, so net XLM flow stands in for net XLM change and every swap counts
+def wallet_features(wallet):
+    return (wallet["net_xlm_flow"], wallet["num_swaps"], wallet["xlm_inflows"] + wallet["xlm_outflows"],
+            wallet["num_swaps"], wallet["asset_pairs"], False)
+
 # Rank wallets based on a scoring system
 def rank_wallets(wallets):
-    ranked_wallets = []
-    for wallet in wallets:
-        net_xlm_flow = wallet["net_xlm_flow"]
-        num_swaps = wallet["num_swaps"]
-        asset_pairs = wallet["asset_pairs"]
-
-        # Calculate metrics
-        per_swap_profit = net_xlm_flow / num_swaps if num_swaps > 0 else 0
-        daily_swaps = num_swaps / 2.0  # 48 hours = 2 days
-        pair_diversity = len(asset_pairs)
-
-        # Scoring system (weights can be adjusted)
-        # - Profitability (40%): Higher net_xlm_flow is better
-        # - Activity (30%): Higher daily_swaps is better
-        # - Efficiency (20%): Higher per_swap_profit is better
-        # - Stability (10%): Lower pair_diversity is better (less volatility)
-        max_net_xlm = max(w["net_xlm_flow"] for w in wallets)
-        max_daily_swaps = max(w["num_swaps"] / 2.0 for w in wallets)
-        max_per_swap_profit = max(w["net_xlm_flow"] / w["num_swaps"] for w in wallets if w["num_swaps"] > 0)
-        max_pair_diversity = max(len(w["asset_pairs"]) for w in wallets)
-
-        profitability_score = (net_xlm_flow / max_net_xlm) if max_net_xlm > 0 else 0
-        activity_score = (daily_swaps / max_daily_swaps) if max_daily_swaps > 0 else 0
-        efficiency_score = (per_swap_profit / max_per_swap_profit) if max_per_swap_profit > 0 else 0
-        stability_score = 1 - (pair_diversity / max_pair_diversity) if max_pair_diversity > 0 else 1
-
-        # Weighted score
-        score = (
-            0.4 * profitability_score +
-            0.3 * activity_score +
-            0.2 * efficiency_score +
-            0.1 * stability_score
-        )
-
-        # Risk assessment
-        risk_level = "Low" if daily_swaps > 100 else "Moderate" if daily_swaps > 10 else "High"
-        if pair_diversity > 20:
-            risk_level = "Moderate" if risk_level == "Low" else "High"
-
-        # Recommendation
-        trade_type = "Directional"
-
-        ranked_wallets.append({
-            "source_account": wallet["source_account"],
-            "net_xlm_change": net_xlm_flow,  # Align with copy trade candidates
-            "num_swaps": num_swaps,
-            "total_volume_xlm": wallet["xlm_inflows"] + wallet["xlm_outflows"],
-            "per_swap_profit": per_swap_profit,
-            "daily_swaps": daily_swaps,
-            "pair_diversity": pair_diversity,
-            "asset_pairs": asset_pairs,
-            "score": score,
-            "risk_level": risk_level,
-            "trade_type": trade_type
-        })
-
-    # Sort by score descending
-    ranked_wallets.sort(key=lambda x: x["score"], reverse=True)
-    return ranked_wallets
+    return wallet_scoring.score_wallets(wallets, wallet_features)
 
 # Generate recommendations
 def generate_recommendations(ranked_wallets, top_n=3):
@@ -136,17 +100,16 @@ def generate_recommendations(ranked_wallets, top_n=3):
 
     return primary_candidates, secondary_candidates
 
-# Main function to analyze and rank candidates
-def analyze_domain_copy_trade_candidates():
-    # Load data
-    wallets = load_wallet_data()
-
+# Select and rank copy-trade candidates from the loaded domain wallet rankings records.
+# Returns the candidates document {"primary_candidates": [...], "secondary_candidates": [...]}.
+def find_domain_copy_trade_candidates(wallets):
     # Determine common pairs dynamically
-    common_pairs = get_common_pairs(wallets)
-    print(f"Determined common pairs: {common_pairs}")
+    pair_ids, pair_owners, pair_swaps = encode_wallet_pairs(wallets)
+    common_pairs = get_common_pairs(pair_ids, pair_swaps)
+    print(f"Determined common pairs: {PAIRS.decode_all(common_pairs)}")
 
     # Filter wallets
-    filtered_wallets = filter_wallets(wallets, common_pairs)
+    filtered_wallets = filter_wallets(wallets, pair_ids, pair_owners, common_pairs)
     print(f"Filtered {len(filtered_wallets)} domain-specific wallets meeting criteria.")
 
     # Rank wallets
@@ -155,7 +118,27 @@ def analyze_domain_copy_trade_candidates():
 
     # Generate recommendations
     primary_candidates, secondary_candidates = generate_recommendations(ranked_wallets)
-    
+    return {
+        "primary_candidates": primary_candidates,
+        "secondary_candidates": secondary_candidates
+    }
+
+# Memo key for the candidates computed from `wallets`: the input records and the code of this
+# file and the scoring module
+def candidates_memo_key(wallets):
+    return content_hash(wallets, code_version(__file__, wallet_scoring.__file__, dictionary_encoding.__file__))
+
+# Main function to analyze and rank candidates
+def analyze_domain_copy_trade_candidates():
+    # Load data
+    wallets = load_wallet_data()
+
+    # Reuse the stored candidates when neither the input nor the scoring code changed
+    candidates = StageMemo().memoize("domain_copy_trade_candidates", candidates_memo_key(wallets),
+                                     lambda: find_domain_copy_trade_candidates(wallets))
+    primary_candidates = candidates["primary_candidates"]
+    secondary_candidates = candidates["secondary_candidates"]
+
     # Print results
     print("\nPrimary Domain-Specific Candidates:")
     for candidate in primary_candidates:
@@ -174,10 +157,7 @@ def analyze_domain_copy_trade_candidates():
 
     # Save results
     with open("domain_copy_trade_candidates.json", "w") as f:
-        json.dump({
-            "primary_candidates": primary_candidates,
-            "secondary_candidates": secondary_candidates
-        }, f, indent=2)
+        json.dump(candidates, f, indent=2)
 
     print("\nSaved domain-specific results to domain_copy_trade_candidates.json")
 
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import time
+import psycopg
+from datetime import datetime, timedelta, timezone
+from bench_swap_limit import create_synthetic_history
+from wallet_profit_loss import SWAPS_QUERY
+
+# Benchmark: wall-clock of fetching every wallet's swaps for a range of batch sizes, comparing
+# the array-parameter query (one prepared statement) with the old per-batch IN (%s, ...) list.
+# Use the fastest array batch size to set wallet_profit_loss.BATCH_SIZE.
+
+# Rewrite the array query into the old IN-list form for a batch of n wallets
+def in_list_query(num_wallets):
+    placeholders = ",".join(["%s"] * num_wallets)
+    return SWAPS_QUERY.replace("= ANY(%s)", f"IN ({placeholders})")
+
+# Fetch all wallets in batches and return (seconds, rows)
+def time_fetch(conn, wallets, start_time, batch_size, use_array, limit_per_wallet):
+    num_rows = 0
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        for batch_start in range(0, len(wallets), batch_size):
+            batch_wallets = wallets[batch_start:batch_start + batch_size]
+            if use_array:
+                cursor.execute(SWAPS_QUERY, (batch_wallets, start_time, limit_per_wallet), prepare=True)
+            else:
+                cursor.execute(in_list_query(len(batch_wallets)), (*batch_wallets, start_time, limit_per_wallet))
+            num_rows += len(cursor.fetchall())
+    return time.perf_counter() - started, num_rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark swap fetch batch sizes")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DSN", "postgresql:///postgres"))
+    parser.add_argument("--synthetic", action="store_true",
+                        help="run against synthetic TEMP tables instead of the database's history tables")
+    parser.add_argument("--wallets-file", default="wallet_rankings.json")
+    parser.add_argument("--batch-sizes", default="25,50,100,250,500,1000")
+    parser.add_argument("--limit-per-wallet", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    with psycopg.connect(args.dsn) as conn:
+        if args.synthetic:
+            create_synthetic_history(conn, num_whales=20, whale_swaps=5000, num_small=980, small_swaps=40)
+            wallets = [row[0] for row in conn.execute("SELECT DISTINCT source_account FROM history_operations")]
+        else:
+            with open(args.wallets_file, "r") as f:
+                wallets = [wallet["source_account"] for wallet in json.load(f)]
+        start_time = datetime.now(timezone.utc) - timedelta(hours=48)
+
+        print(f"{'batch size':>10}{'IN list (s)':>14}{'ANY array (s)':>16}{'rows':>10}")
+        best = None
+        for batch_size in batch_sizes:
+            in_secs = min(time_fetch(conn, wallets, start_time, batch_size, False, args.limit_per_wallet)[0]
+                          for _ in range(args.repeat))
+            array_runs = [time_fetch(conn, wallets, start_time, batch_size, True, args.limit_per_wallet)
+                          for _ in range(args.repeat)]
+            array_secs = min(secs for secs, _ in array_runs)
+            print(f"{batch_size:>10}{in_secs:>14.3f}{array_secs:>16.3f}{array_runs[0][1]:>10}")
+            if best is None or array_secs < best[1]:
+                best = (batch_size, array_secs)
+
+    print(f"Fastest array batch size: {best[0]} ({best[1]:.3f}s)")
@@ -0,0 +1,45 @@
+import argparse
+import os
+import time
+import psycopg
+from datetime import datetime, timedelta, timezone
+from bench_swap_limit import create_synthetic_history
+from wallet_profit_loss import fetch_swap_rows, row_to_swap
+
+# Benchmark: swap extraction through the regular cursor path (text columns + float() per amount)
+# versus binary COPY decoded straight into typed columns, on a synthetic TEMP-table history.
+
+# Extract and convert every swap with the given backend, returning (seconds, swaps)
+def time_extract(conn, wallets, start_time, limit_per_wallet, extract):
+    started = time.perf_counter()
+    rows = fetch_swap_rows(conn, (wallets, start_time, limit_per_wallet), extract)
+    swaps = [row_to_swap(row) for row in rows]
+    return time.perf_counter() - started, swaps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cursor vs binary COPY swap extraction")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DSN", "postgresql:///postgres"))
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--swaps-per-wallet", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with psycopg.connect(args.dsn) as conn:
+        print("Creating synthetic swap history...")
+        create_synthetic_history(conn, num_whales=0, whale_swaps=0,
+                                 num_small=args.wallets, small_swaps=args.swaps_per_wallet)
+        wallets = [row[0] for row in conn.execute("SELECT DISTINCT source_account FROM history_operations")]
+        start_time = datetime.now(timezone.utc) - timedelta(hours=48)
+
+        results = {}
+        for extract in ("cursor", "copy"):
+            runs = [time_extract(conn, wallets, start_time, args.swaps_per_wallet, extract) for _ in range(args.repeat)]
+            results[extract] = (min(secs for secs, _ in runs), runs[0][1])
+
+    cursor_secs, cursor_swaps = results["cursor"]
+    copy_secs, copy_swaps = results["copy"]
+    assert cursor_swaps == copy_swaps, "COPY backend returned different swaps"
+    print(f"{'backend':<10}{'swaps':>10}{'seconds':>10}")
+    print(f"{'cursor':<10}{len(cursor_swaps):>10}{cursor_secs:>10.3f}")
+    print(f"{'copy':<10}{len(copy_swaps):>10}{copy_secs:>10.3f}")
+    print(f"Binary COPY speedup: {cursor_secs / copy_secs:.2f}x")
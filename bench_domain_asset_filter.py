@@ -0,0 +1,116 @@
+import argparse
+import os
+import time
+import psycopg
+from datetime import datetime, timedelta, timezone
+from domain_wallet_rankings import TARGET_ASSET_FILTER, build_domain_swaps_query, domain_query_params
+
+# Benchmark: the domain swap query's asset filter as the previous per-asset OR chain versus the
+# unnested target relation probed through hashed subplans, as the number of tracked assets grows.
+# A synthetic TEMP-table history spreads swaps over ISSUED_ASSETS assets (half credit_alphanum4,
+# half credit_alphanum12), and each run tracks the first N of them.
+ISSUED_ASSETS = 10000
+
+# The previous filter: four jsonb comparisons per asset and leg, ORed together (credit_alphanum4 only)
+def or_chain_filter(num_assets):
+    condition = """
+            ((ho.details->>'asset_type' = 'credit_alphanum4' AND ho.details->>'asset_code' = %s AND ho.details->>'asset_issuer' = %s)
+            OR (ho.details->>'source_asset_type' = 'credit_alphanum4' AND ho.details->>'source_asset_code' = %s AND ho.details->>'source_asset_issuer' = %s))
+        """
+    return "(" + " OR ".join([condition] * num_assets) + ")"
+
+# Code and issuer of synthetic asset i; even assets are credit_alphanum4, odd ones credit_alphanum12
+def asset_code(i):
+    return f"A{i:03d}"[-4:] if i % 2 == 0 else f"LONGCODE{i:04d}"
+
+def asset_issuer(i):
+    return "G" + str(i).zfill(55)
+
+# History of `num_swaps` swaps over the last day, alternating buys and sells of random assets
+def create_synthetic_history(conn, num_swaps):
+    conn.execute("CREATE TEMP TABLE history_transactions (id bigint PRIMARY KEY, successful boolean, created_at timestamptz)")
+    conn.execute("""
+        CREATE TEMP TABLE history_operations (
+            id bigint PRIMARY KEY, transaction_id bigint, source_account text, type integer, details jsonb
+        )
+    """)
+    conn.execute("""
+        WITH swaps AS (
+            SELECT id, (random() * (%(num_assets)s - 1))::int AS asset FROM generate_series(1, %(num_swaps)s) AS id
+        ),
+        legs AS (
+            SELECT id,
+                   CASE WHEN asset %% 2 = 0 THEN 'credit_alphanum4' ELSE 'credit_alphanum12' END AS asset_type,
+                   CASE WHEN asset %% 2 = 0 THEN right('A' || lpad(asset::text, 3, '0'), 4)
+                        ELSE 'LONGCODE' || lpad(asset::text, 4, '0') END AS code,
+                   'G' || lpad(asset::text, 55, '0') AS issuer
+            FROM swaps
+        ),
+        txs AS (
+            INSERT INTO history_transactions
+            SELECT id, true, now() - (id %% 1440) * interval '1 minute' FROM legs
+        )
+        INSERT INTO history_operations
+        SELECT
+            id, id,
+            'G' || lpad((id %% 2000)::text, 55, 'A'),
+            CASE WHEN id %% 3 = 0 THEN 2 ELSE 13 END,
+            CASE WHEN id %% 2 = 0 THEN jsonb_build_object(
+                'source_asset_type', 'native', 'source_amount', (random() * 1000)::numeric(20, 7)::text,
+                'asset_type', asset_type, 'asset_code', code, 'asset_issuer', issuer,
+                'amount', (random() * 100)::numeric(20, 7)::text)
+            ELSE jsonb_build_object(
+                'source_asset_type', asset_type, 'source_asset_code', code, 'source_asset_issuer', issuer,
+                'source_amount', (random() * 100)::numeric(20, 7)::text,
+                'asset_type', 'native', 'amount', (random() * 1000)::numeric(20, 7)::text)
+            END
+        FROM legs
+    """, {"num_swaps": num_swaps, "num_assets": ISSUED_ASSETS})
+    conn.execute("ANALYZE history_transactions")
+    conn.execute("ANALYZE history_operations")
+
+# Run one query `repeat` times; returns (best seconds, sorted rows)
+def time_query(conn, query, params, repeat):
+    best, rows = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(query, params, prepare=False).fetchall()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, sorted(rows, key=lambda row: row[:1] + tuple(str(value) for value in row[4:]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the domain asset filter: OR chain vs hash join")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DSN", "postgresql:///postgres"))
+    parser.add_argument("--swaps", type=int, default=200000)
+    parser.add_argument("--assets", default="5,50,500,5000", help="comma-separated tracked asset counts")
+    parser.add_argument("--or-chain-limit", type=int, default=500,
+                        help="largest asset count the OR chain is timed at (it grows linearly)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start_time = datetime.now(timezone.utc) - timedelta(hours=36)
+    join_query = build_domain_swaps_query()
+    summary = [f"{'assets':>7}{'OR chain s':>12}{'join s':>10}{'rows':>8}{'alphanum12 rows':>17}"]
+    with psycopg.connect(args.dsn) as conn:
+        print("Creating synthetic swap history...")
+        create_synthetic_history(conn, args.swaps)
+        for num_assets in [int(count) for count in args.assets.split(",")]:
+            assets = [(asset_code(i), asset_issuer(i)) for i in range(num_assets)]
+            join_secs, join_rows = time_query(conn, join_query, domain_query_params(assets, start_time, None),
+                                              args.repeat)
+            alphanum12_rows = sum(1 for row in join_rows if len(row[4] or row[6]) > 4)
+            or_secs = "-"
+            if num_assets <= args.or_chain_limit:
+                # Same query with the previous filter: its per-asset params follow (start, end)
+                or_query = join_query.replace(TARGET_ASSET_FILTER, or_chain_filter(num_assets))
+                asset_params = [value for code, issuer in assets for value in (code, issuer, code, issuer)]
+                params = [[], [], start_time, None] + asset_params
+                seconds, or_rows = time_query(conn, or_query, params, args.repeat)
+                # The OR chain only ever matched credit_alphanum4 legs
+                expected = [row for row in join_rows if len(row[4] or row[6]) <= 4]
+                assert or_rows == expected, "OR chain and hash join select different swaps"
+                or_secs = f"{seconds:.3f}"
+            summary.append(f"{num_assets:>7}{or_secs:>12}{join_secs:>10.3f}{len(join_rows):>8}{alphanum12_rows:>17}")
+    print(f"{args.swaps} swaps over {ISSUED_ASSETS} issued assets")
+    print("\n".join(summary))
@@ -0,0 +1,92 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from analyze_copy_trade_candidates import find_copy_trade_candidates
+from pnl_pool import analyze_wallet_batches
+from wallet_profit_loss import BATCH_SIZE, WINDOW_HOURS, batch_swap_rows
+from wallet_rankings import rankings_from_rows
+
+# Benchmark: client-side cost of a full-universe refresh on a synthetic network of 500k active
+# accounts. Swap counts per account follow a heavy tail (most accounts swap a handful of times,
+# a few bots hit the 200-swap cap). The synthetic rows stand in for the streaming cursors of
+# wallet_rankings.fetch_swaps_universe() and wallet_profit_loss.iter_universe_swap_batches();
+# Horizon's own scan time is not included and has to fit in what is left of the budget.
+REFRESH_BUDGET_SECS = 15 * 60
+LIMIT_PER_WALLET = 200
+
+# Synthetic account addresses and per-account swap counts (within the 48h window)
+def make_accounts(num_accounts, seed):
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.zipf(1.8, num_accounts), LIMIT_PER_WALLET)
+    accounts = [f"G{i:055d}" for i in range(num_accounts)]
+    return accounts, counts.tolist()
+
+# SWAPS_QUERY-layout rows grouped by account (sorted), newest first, like the server-side cursor
+def make_swap_rows(accounts, counts, seed, num_assets=200):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    issuers = [f"G{'I' * 50}{i:05d}" for i in range(num_assets)]
+    assets = [(f"ASSET{i}", issuers[i]) for i in range(num_assets)]
+    window_secs = WINDOW_HOURS * 3600
+    for account, count in zip(accounts, counts):
+        offsets = sorted(rng.randrange(window_secs) for _ in range(count))
+        code, issuer = assets[rng.randrange(num_assets)]
+        for offset in offsets:
+            created_at = now - timedelta(seconds=offset)
+            xlm_amount = rng.uniform(1, 500)
+            asset_amount = round(rng.uniform(1, 100000), 7)
+            if rng.random() < 0.5:
+                yield (account, 13, "native", None, None, xlm_amount,
+                       "credit_alphanum4", code, issuer, asset_amount, created_at)
+            else:
+                yield (account, 13, "credit_alphanum4", code, issuer, asset_amount,
+                       "native", None, None, xlm_amount, created_at)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a full-universe ranking and P&L refresh")
+    parser.add_argument("--accounts", type=int, default=500_000)
+    parser.add_argument("--processes", type=int, default=None, help="P&L worker processes (default: all CPUs)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    accounts, counts = make_accounts(args.accounts, args.seed)
+    total_swaps = sum(counts)
+    print(f"Synthetic universe: {len(accounts)} accounts, {total_swaps} swaps in the window")
+
+    # Row generation alone, so it can be told apart from the pipeline's own work below
+    started = time.perf_counter()
+    for _ in make_swap_rows(accounts, counts, args.seed):
+        pass
+    generate_secs = time.perf_counter() - started
+
+    # Rankings: order the per-account aggregate like the server-side ORDER BY and build records
+    started = time.perf_counter()
+    aggregate = sorted(((account, count, count * 250.0) for account, count in zip(accounts, counts)),
+                       key=lambda row: (-row[1], row[0]))
+    rankings = rankings_from_rows(aggregate)
+    ranking_secs = time.perf_counter() - started
+
+    # P&L: stream rows into wallet batches and run the columnar engine over all of them
+    started = time.perf_counter()
+    addresses = [wallet["source_account"] for wallet in rankings]
+    swap_batches = batch_swap_rows(make_swap_rows(accounts, counts, args.seed), addresses, LIMIT_PER_WALLET,
+                                   BATCH_SIZE)
+    pnl_results = analyze_wallet_batches(rankings, swap_batches, LIMIT_PER_WALLET, processes=args.processes)
+    pnl_secs = time.perf_counter() - started - generate_secs
+
+    # Candidates: filter and score every wallet
+    started = time.perf_counter()
+    candidates = find_copy_trade_candidates(pnl_results)
+    candidates_secs = time.perf_counter() - started
+
+    total_secs = ranking_secs + pnl_secs + candidates_secs
+    print(f"{'stage':<24}{'seconds':>10}")
+    print(f"{'row generation':<24}{generate_secs:>10.1f}  (synthetic input, excluded below)")
+    print(f"{'rankings':<24}{ranking_secs:>10.1f}  {len(rankings)} accounts")
+    print(f"{'P&L':<24}{pnl_secs:>10.1f}  {len(pnl_results)} wallets")
+    print(f"{'candidates':<24}{candidates_secs:>10.1f}  "
+          f"{len(candidates['primary_candidates']) + len(candidates['secondary_candidates'])} candidates")
+    print(f"{'total':<24}{total_secs:>10.1f}  {100 * total_secs / REFRESH_BUDGET_SECS:.0f}% of the "
+          f"{REFRESH_BUDGET_SECS // 60}-minute refresh budget")
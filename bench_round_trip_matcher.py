@@ -0,0 +1,77 @@
+import argparse
+import random
+import time
+from pnl_engine import FEE_PER_SWAP, MATCH_TOLERANCE, SLIPPAGE, RoundTripMatcher
+
+# Benchmark: the previous linear pending_trades scan versus the bucketed RoundTripMatcher on
+# synthetic bot wallets with tens of thousands of swaps of one asset. Both must produce the
+# same round trips.
+
+# Previous implementation: scan the pending list for the first buy within tolerance
+def linear_round_trips(swaps):
+    pending = []
+    round_trips = []
+    for is_buy, sold, received in swaps:
+        if is_buy:
+            pending.append((received, sold))
+        elif pending:
+            for i, (prev_amount, prev_xlm) in enumerate(pending):
+                if abs(prev_amount - sold) < MATCH_TOLERANCE:
+                    round_trips.append((received - prev_xlm) * (1 - SLIPPAGE) - (2 * FEE_PER_SWAP))
+                    pending.pop(i)
+                    break
+    return round_trips
+
+def indexed_round_trips(swaps):
+    matcher = RoundTripMatcher()
+    round_trips = []
+    for is_buy, sold, received in swaps:
+        if is_buy:
+            matcher.add(received, sold)
+        else:
+            prev_xlm = matcher.match(sold)
+            if prev_xlm is not None:
+                round_trips.append((received - prev_xlm) * (1 - SLIPPAGE) - (2 * FEE_PER_SWAP))
+    return round_trips
+
+# Synthetic bot: buys of random sizes, sells that close an earlier buy about half of the time
+def make_wallet(num_swaps, rng):
+    swaps = []
+    bought = []
+    for _ in range(num_swaps):
+        if not bought or rng.random() < 0.55:
+            asset_amount = round(rng.uniform(1, 100000), 7)
+            bought.append(asset_amount)
+            swaps.append((True, rng.uniform(1, 500), asset_amount))
+        else:
+            if rng.random() < 0.5:
+                sold = bought[rng.randrange(len(bought))] + rng.uniform(-0.005, 0.005)
+            else:
+                sold = round(rng.uniform(1, 100000), 7)
+            swaps.append((False, sold, rng.uniform(1, 500)))
+    return swaps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark linear vs indexed round-trip matching")
+    parser.add_argument("--wallets", type=int, default=5)
+    parser.add_argument("--swaps-per-wallet", default="10000,20000,40000")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'swaps/wallet':>12}{'round trips':>13}{'linear (s)':>12}{'indexed (s)':>13}{'speedup':>9}")
+    for num_swaps in [int(n) for n in args.swaps_per_wallet.split(",")]:
+        wallets = [make_wallet(num_swaps, rng) for _ in range(args.wallets)]
+
+        started = time.perf_counter()
+        linear = [linear_round_trips(swaps) for swaps in wallets]
+        linear_secs = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = [indexed_round_trips(swaps) for swaps in wallets]
+        indexed_secs = time.perf_counter() - started
+
+        assert linear == indexed, "Indexed matcher produced different round trips"
+        num_round_trips = sum(len(round_trips) for round_trips in indexed)
+        print(f"{num_swaps:>12}{num_round_trips:>13}{linear_secs:>12.3f}{indexed_secs:>13.3f}"
+              f"{linear_secs / indexed_secs:>8.1f}x")
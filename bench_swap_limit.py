@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+import psycopg
+from datetime import datetime, timedelta, timezone
+from wallet_profit_loss import SWAPS_QUERY
+
+# Benchmark: bytes sent by the swap batch query with the per-wallet limit applied in SQL
+# versus fetching every swap and cutting in Python (the previous behaviour).
+# Runs against any scratch PostgreSQL database: the synthetic history_operations /
+# history_transactions tables are TEMP tables that shadow the real ones for this session.
+NO_LIMIT = 2**31 - 1
+
+# Create a whale-heavy synthetic swap history: a few bots with tens of thousands of swaps
+# and many ordinary wallets below the per-wallet limit
+def create_synthetic_history(conn, num_whales, whale_swaps, num_small, small_swaps):
+    conn.execute("""
+        CREATE TEMP TABLE history_transactions (
+            id bigint PRIMARY KEY,
+            successful boolean,
+            created_at timestamptz
+        )
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE history_operations (
+            id bigint PRIMARY KEY,
+            transaction_id bigint,
+            source_account text,
+            type integer,
+            details jsonb
+        )
+    """)
+    conn.execute("""
+        WITH wallets AS (
+            SELECT w, CASE WHEN w < %(num_whales)s THEN %(whale_swaps)s ELSE %(small_swaps)s END AS n
+            FROM generate_series(0, %(num_whales)s + %(num_small)s - 1) AS w
+        ),
+        swaps AS (
+            SELECT w, i, row_number() OVER () AS id
+            FROM wallets, generate_series(1, n) AS i
+        ),
+        txs AS (
+            INSERT INTO history_transactions
+            SELECT id, true, now() - (i %% 2880) * interval '1 minute' FROM swaps
+        )
+        INSERT INTO history_operations
+        SELECT
+            id, id,
+            'G' || lpad(w::text, 55, 'A'),
+            13,
+            jsonb_build_object(
+                'source_asset_type', 'native',
+                'source_amount', (random() * 1000)::numeric(20, 7)::text,
+                'asset_type', 'credit_alphanum4',
+                'asset_code', 'USDC',
+                'asset_issuer', 'GA5ZSEJYB37JRC5AVCIA5MOP4RHTM335X2KGX3IHOJAPP5RE34K4KZVN',
+                'amount', (random() * 100)::numeric(20, 7)::text,
+                'path', '[]'::jsonb
+            )
+        FROM swaps
+    """, {"num_whales": num_whales, "whale_swaps": whale_swaps, "num_small": num_small, "small_swaps": small_swaps})
+    conn.execute("ANALYZE history_transactions")
+    conn.execute("ANALYZE history_operations")
+
+# Run the batch query through COPY ... TO STDOUT and count the bytes and rows that come back
+def measure_transfer(conn, wallets, start_time, limit_per_wallet):
+    query = SWAPS_QUERY.strip().rstrip(";")
+    total_bytes = 0
+    num_rows = 0
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        with cursor.copy(f"COPY ({query}) TO STDOUT", (wallets, start_time, limit_per_wallet)) as copy:
+            for data in copy:
+                total_bytes += len(data)
+                num_rows += bytes(data).count(b"\n")
+    return total_bytes, num_rows, time.perf_counter() - started
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bytes transferred with the per-wallet swap limit in SQL")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DSN", "postgresql:///postgres"))
+    parser.add_argument("--whales", type=int, default=5)
+    parser.add_argument("--whale-swaps", type=int, default=20000)
+    parser.add_argument("--small", type=int, default=95)
+    parser.add_argument("--small-swaps", type=int, default=50)
+    parser.add_argument("--limit-per-wallet", type=int, default=200)
+    args = parser.parse_args()
+
+    with psycopg.connect(args.dsn) as conn:
+        print("Creating synthetic whale-heavy swap history...")
+        create_synthetic_history(conn, args.whales, args.whale_swaps, args.small, args.small_swaps)
+        wallets = [row[0] for row in conn.execute("SELECT DISTINCT source_account FROM history_operations")]
+        start_time = datetime.now(timezone.utc) - timedelta(hours=48)
+
+        python_bytes, python_rows, python_secs = measure_transfer(conn, wallets, start_time, NO_LIMIT)
+        sql_bytes, sql_rows, sql_secs = measure_transfer(conn, wallets, start_time, args.limit_per_wallet)
+
+    print(f"{'mode':<22}{'rows':>10}{'bytes':>14}{'seconds':>10}")
+    print(f"{'limit in Python':<22}{python_rows:>10}{python_bytes:>14}{python_secs:>10.3f}")
+    print(f"{'limit in SQL':<22}{sql_rows:>10}{sql_bytes:>14}{sql_secs:>10.3f}")
+    print(f"Bytes transferred reduced by {100 * (1 - sql_bytes / python_bytes):.1f}%")
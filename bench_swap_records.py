@@ -0,0 +1,97 @@
+import argparse
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from swap_records import SwapList
+from wallet_profit_loss import row_to_swap
+
+# Benchmark: memory and pickling cost of the wallet P&L task list with the previous 10-key swap
+# dicts versus SwapRecord objects with interned assets, for 1000 wallets x 200 swaps.
+
+ASSETS = [
+    ("credit_alphanum4", "USDC", "GA5ZSEJYB37JRC5AVCIA5MOP4RHTM335X2KGX3IHOJAPP5RE34K4KZVN"),
+    ("credit_alphanum4", "AQUA", "GBNZILSTVQZ4R7IKQDGHYGY2QXL5QOFJYQMXPKWRRM5PAV7Y4M67AQUA"),
+    ("credit_alphanum4", "yXLM", "GARDNV3Q7YGT4AKSDF25LT32YSCCW4EV22Y2TV3I2PU2MMXJTEDL5T55"),
+    ("credit_alphanum12", "SHITCOIN", "GBDBUYZIXTBTZQSSGOYFF6Y4CQNXYB6GUIBQFHQQ2QDRVGDO6XPLKWS6"),
+]
+
+# Synthetic swap query rows in SWAPS_QUERY layout
+def make_rows(num_wallets, swaps_per_wallet, rng):
+    start = datetime(2025, 5, 10, tzinfo=timezone.utc)
+    rows = []
+    for w in range(num_wallets):
+        wallet = "G" + f"{w:055d}"
+        for i in range(swaps_per_wallet):
+            asset_type, code, issuer = rng.choice(ASSETS)
+            closed_at = start + timedelta(seconds=rng.randrange(172800))
+            if rng.random() < 0.5:
+                rows.append((wallet, 13, "native", None, None, f"{rng.uniform(1, 500):.7f}",
+                             asset_type, code, issuer, f"{rng.uniform(1, 1e5):.7f}", closed_at))
+            else:
+                rows.append((wallet, 13, asset_type, code, issuer, f"{rng.uniform(1, 1e5):.7f}",
+                             "native", None, None, f"{rng.uniform(1, 500):.7f}", closed_at))
+    return rows
+
+# The swap dict row_to_swap produced before SwapRecord
+def row_to_swap_dict(row):
+    return {
+        "type": row[1],
+        "source_asset_type": row[2],
+        "source_asset_code": row[3] if row[2] != "native" else "XLM",
+        "source_asset_issuer": row[4],
+        "source_amount": float(row[5]) if row[5] else 0.0,
+        "asset_type": row[6],
+        "asset_code": row[7] if row[6] != "native" else "XLM",
+        "asset_issuer": row[8],
+        "amount": float(row[9]) if row[9] else 0.0,
+        "closed_at": row[10]
+    }
+
+# Build the P&L task list and return (task list, bytes allocated, seconds)
+def build_tasks(rows, convert, list_type):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    swaps_by_wallet = {}
+    for row in rows:
+        swaps_by_wallet.setdefault(row[0], list_type()).append(convert(row))
+    tasks = [{"source_account": wallet, "num_swaps": len(swaps), "total_volume_xlm": 0.0, "swaps": swaps}
+             for wallet, swaps in swaps_by_wallet.items()]
+    seconds = time.perf_counter() - started
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tasks, allocated, seconds
+
+# Pickle the tasks in Pool.map-sized chunks, as the pool's task queue does, then unpickle them
+# as the workers do. Returns (pickled bytes, dump seconds, load seconds).
+def pickle_tasks(tasks, processes):
+    chunksize, extra = divmod(len(tasks), processes * 4)
+    chunksize += 1 if extra else 0
+    started = time.perf_counter()
+    chunks = [pickle.dumps(tasks[chunk_start:chunk_start + chunksize])
+              for chunk_start in range(0, len(tasks), chunksize)]
+    dump_secs = time.perf_counter() - started
+    started = time.perf_counter()
+    for chunk in chunks:
+        pickle.loads(chunk)
+    load_secs = time.perf_counter() - started
+    return sum(len(chunk) for chunk in chunks), dump_secs, load_secs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark swap dicts vs SwapRecord memory and pickling")
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--swaps-per-wallet", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=8)
+    args = parser.parse_args()
+
+    rows = make_rows(args.wallets, args.swaps_per_wallet, random.Random(7))
+    print(f"{'representation':<16}{'memory (MB)':>13}{'build (s)':>11}{'pickled (MB)':>14}{'dump (s)':>10}{'load (s)':>10}")
+    for label, convert, list_type in (("dict", row_to_swap_dict, list), ("SwapRecord", row_to_swap, SwapList)):
+        tasks, allocated, build_secs = build_tasks(rows, convert, list_type)
+        pickled_bytes, dump_secs, load_secs = pickle_tasks(tasks, args.processes)
+        print(f"{label:<16}{allocated / 1e6:>13.1f}{build_secs:>11.3f}{pickled_bytes / 1e6:>14.1f}"
+              f"{dump_secs:>10.3f}{load_secs:>10.3f}")
+        del tasks
@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from aiohttp import web
+from stellar_toml import TomlCache, resolve_domains
+
+# Benchmark: stellar_toml's resolver against a local stand-in for many issuer hosts.
+# The server answers /<domain>/.well-known/stellar.toml after a fixed latency, with an ETag and
+# Last-Modified so revalidation can be exercised; a few domains misbehave ("hang-*" never
+# answers within the timeout, "missing-*" is a 404, "broken-*" is not valid TOML, "once304-*"
+# answers its first request with an unsolicited 304 and "always304-*" every request). Runs:
+#   serial       one request at a time, like the previous per-domain requests.get loop
+#   cold         concurrent, empty cache
+#   warm         every entry fresh: only domains that failed before are requested again
+#   revalidate   every entry past its TTL: conditional requests answered with 304
+#   host down    entries past their TTL and the server unreachable: stale entries are used
+LAST_MODIFIED = "Mon, 05 Oct 2026 00:00:00 GMT"
+# Served by "broken-*": an unclosed [[CURRENCIES] table header, which toml.loads rejects (an
+# unterminated array such as "CURRENCIES = [" is silently parsed as empty)
+BROKEN_DOCUMENT = 'VERSION = "2.0.0"\n[[CURRENCIES]\ncode = "BROKEN"\n'
+
+# stellar.toml of a synthetic issuer with a few live and one dead currency
+def toml_document(domain):
+    issuer = "G" + hashlib.sha256(domain.encode()).hexdigest().upper()[:55]
+    currencies = "".join(f'\n[[CURRENCIES]]\ncode = "{domain.split(".")[0][:8].upper()}{i}"\nissuer = "{issuer}"\n'
+                         f'status = "{"live" if i < 3 else "dead"}"\n' for i in range(4))
+    return f'VERSION = "2.0.0"\n{currencies}'
+
+# Stand-in issuer hosts; returns the aiohttp app and its request counter {status: count}
+def make_app(latency_secs, hang_secs):
+    requests_by_status = Counter()
+    requests_by_domain = Counter()
+
+    async def stellar_toml(request):
+        domain = request.match_info["domain"]
+        requests_by_domain[domain] += 1
+        if domain.startswith("hang-"):
+            await asyncio.sleep(hang_secs)
+        await asyncio.sleep(latency_secs)
+        if domain.startswith("missing-"):
+            requests_by_status[404] += 1
+            raise web.HTTPNotFound()
+        if domain.startswith("always304-") or (domain.startswith("once304-") and requests_by_domain[domain] == 1):
+            requests_by_status[304] += 1
+            return web.Response(status=304)
+        text = BROKEN_DOCUMENT if domain.startswith("broken-") else toml_document(domain)
+        etag = f'"{hashlib.sha1(text.encode()).hexdigest()[:16]}"'
+        if request.headers.get("If-None-Match") == etag:
+            requests_by_status[304] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        requests_by_status[200] += 1
+        return web.Response(text=text, headers={"ETag": etag, "Last-Modified": LAST_MODIFIED})
+
+    app = web.Application()
+    app.router.add_get("/{domain}/.well-known/stellar.toml", stellar_toml)
+    return app, requests_by_status
+
+# Run the stand-in server on its own event loop thread; returns (port, stop function)
+def start_server(app):
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    return port, stop
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent, cached stellar.toml resolution")
+    parser.add_argument("--domains", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stand-in response")
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-host timeout in seconds")
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    domains = [f"issuer{i}.example" for i in range(args.domains - 3)]
+    domains += ["hang-1.example", "missing-1.example", "broken-1.example"]
+    app, requests_by_status = make_app(args.latency, args.timeout * 2)
+    port, stop = start_server(app)
+    url_template = f"http://127.0.0.1:{port}/{{domain}}/.well-known/stellar.toml"
+    cache_root = tempfile.mkdtemp(prefix="toml_cache_")
+
+    def run(name, cache, max_concurrent=32):
+        before = Counter(requests_by_status)
+        started = time.perf_counter()
+        resolved = asyncio.run(resolve_domains(domains, cache, url_template, args.timeout, max_concurrent))
+        seconds = time.perf_counter() - started
+        requests = requests_by_status - before
+        assets = sum(len(assets) for assets in resolved.values())
+        summary.append(f"{name:<12}{seconds:>9.2f}{requests[200]:>7}{requests[304]:>7}{requests[404]:>7}{assets:>9}")
+        return resolved
+
+    summary = [f"{'run':<12}{'seconds':>9}{'200':>7}{'304':>7}{'404':>7}{'assets':>9}"]
+    try:
+        results = {}
+        if not args.skip_serial:
+            results["serial"] = run("serial", TomlCache(tempfile.mkdtemp(dir=cache_root)), max_concurrent=1)
+        results["cold"] = run("cold", TomlCache(cache_root))
+        results["warm"] = run("warm", TomlCache(cache_root))
+        results["revalidate"] = run("revalidate", TomlCache(cache_root, ttl_secs=0))
+        stop()
+        results["host down"] = run("host down", TomlCache(cache_root, ttl_secs=0))
+        assert all(resolved == results["cold"] for resolved in results.values()), "Resolved assets differ"
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+    print(f"{len(domains)} domains, {args.latency}s latency, {args.timeout}s per-host timeout")
+    print("\n".join(summary))
@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+from analyze_copy_trade_candidates import rank_wallets
+
+# Benchmark: the previous per-wallet scoring loop, which recomputed the normalizing maxima over
+# all wallets for every wallet, versus the vectorized wallet_scoring module on synthetic P&L
+# records. Both must produce the same ranking; the previous loop is quadratic, so it only runs
+# up to --max-previous wallets.
+
+# Previous implementation of analyze_copy_trade_candidates.rank_wallets()
+def previous_rank_wallets(wallets):
+    ranked_wallets = []
+    for wallet in wallets:
+        net_xlm_change = wallet["pnl"]["net_xlm_change"]
+        num_swaps = wallet["num_swaps"]
+        num_swaps_analyzed = wallet["pnl"]["num_swaps_analyzed"]
+        asset_pairs = wallet["pnl"]["asset_pairs"]
+
+        per_swap_profit = net_xlm_change / num_swaps_analyzed if num_swaps_analyzed > 0 else 0
+        daily_swaps = num_swaps / 2.0
+        pair_diversity = len(asset_pairs)
+
+        max_net_xlm = max(w["pnl"]["net_xlm_change"] for w in wallets)
+        max_daily_swaps = max(w["num_swaps"] / 2.0 for w in wallets)
+        max_per_swap_profit = max(w["pnl"]["net_xlm_change"] / w["pnl"]["num_swaps_analyzed"] for w in wallets)
+        max_pair_diversity = max(len(w["pnl"]["asset_pairs"]) for w in wallets)
+
+        profitability_score = (net_xlm_change / max_net_xlm) if max_net_xlm > 0 else 0
+        activity_score = (daily_swaps / max_daily_swaps) if max_daily_swaps > 0 else 0
+        efficiency_score = (per_swap_profit / max_per_swap_profit) if max_per_swap_profit > 0 else 0
+        stability_score = 1 - (pair_diversity / max_pair_diversity) if max_pair_diversity > 0 else 1
+        score = 0.4 * profitability_score + 0.3 * activity_score + 0.2 * efficiency_score + 0.1 * stability_score
+        ranked_wallets.append((wallet["source_account"], score))
+
+    ranked_wallets.sort(key=lambda x: x[1], reverse=True)
+    return ranked_wallets
+
+# Synthetic wallet P&L record that passes filter_wallets()
+def make_wallet(i, pairs, rng):
+    return {
+        "source_account": f"G{i:055d}",
+        "num_swaps": rng.randint(1, 1000),
+        "total_volume_xlm": rng.uniform(0, 1e6),
+        "pnl": {
+            "net_xlm_change": rng.uniform(51, 10000),
+            "num_swaps_analyzed": rng.randint(1, 200),
+            "asset_pairs": rng.sample(pairs, rng.randint(1, 30)),
+            "total_pnl_xlm": rng.uniform(-100, 100),
+            "num_round_trips": rng.randint(0, 5),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-wallet vs vectorized candidate scoring")
+    parser.add_argument("--wallets", default="1000,10000,100000")
+    parser.add_argument("--max-previous", type=int, default=5000,
+                        help="largest wallet count to run the quadratic previous implementation on")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    pairs = [f"XLM/ASSET{i}" for i in range(60)]
+
+    print(f"{'wallets':>10}{'previous (s)':>14}{'vectorized (s)':>16}{'speedup':>9}")
+    for num_wallets in [int(n) for n in args.wallets.split(",")]:
+        wallets = [make_wallet(i, pairs, rng) for i in range(num_wallets)]
+
+        started = time.perf_counter()
+        ranked = rank_wallets(wallets)
+        vectorized_secs = time.perf_counter() - started
+
+        if num_wallets <= args.max_previous:
+            started = time.perf_counter()
+            previous = previous_rank_wallets(wallets)
+            previous_secs = time.perf_counter() - started
+            assert previous == [(w["source_account"], w["score"]) for w in ranked], "Vectorized scoring differs"
+            print(f"{num_wallets:>10}{previous_secs:>14.3f}{vectorized_secs:>16.3f}{previous_secs / vectorized_secs:>8.1f}x")
+        else:
+            print(f"{num_wallets:>10}{'-':>14}{vectorized_secs:>16.3f}{'-':>9}")
@@ -0,0 +1,19 @@
+# Binary COPY extraction backend.
+# Runs a SELECT through COPY ... TO STDOUT (FORMAT BINARY) and decodes each column straight
+# into a typed Python value (float, int, datetime), skipping the row protocol's text encoding
+# and the float() parsing the cursor path does for every amount.
+
+# Wrap `query` so every output column is cast server-side to the declared Postgres type.
+# column_types is a list of (column_name, pg_type) in output order.
+def build_copy_statement(query, column_types):
+    casts = ",\n    ".join(f"{name}::{pg_type}" for name, pg_type in column_types)
+    return f"COPY (SELECT\n    {casts}\nFROM ({query.strip().rstrip(';')}) AS extracted) TO STDOUT (FORMAT BINARY)"
+
+# Yield typed row tuples for `query` via binary COPY (params are bound client-side,
+# since COPY does not accept server-side parameters)
+def copy_rows(conn, query, params, column_types):
+    statement = build_copy_statement(query, column_types)
+    with conn.cursor() as cursor:
+        with cursor.copy(statement, params) as copy:
+            copy.set_types([pg_type for _, pg_type in column_types])
+            yield from copy.rows()
@@ -1,4 +1,10 @@
+import asyncio
 import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from rankings_api import build_domain_table_indexes, build_table_indexes
 
 def load_data():
     # Load copy trade candidates
@@ -15,6 +21,13 @@ def load_data():
     except FileNotFoundError:
         domain_rankings = []
 
+    # Load per-domain wallet rankings ({domain: records})
+    try:
+        with open("domain_wallet_rankings_by_domain.json", "r") as f:
+            domain_rankings_by_domain = json.load(f)
+    except FileNotFoundError:
+        domain_rankings_by_domain = {}
+
     # Load network-wide wallet rankings
     try:
         with open("wallet_rankings.json", "r") as f:
@@ -32,4 +45,94 @@ def load_data():
     except FileNotFoundError:
         domain_copy_trade_all = []
 
-    return all_candidates, domain_rankings, network_rankings, domain_copy_trade_all
+    return all_candidates, domain_rankings, network_rankings, domain_copy_trade_all, domain_rankings_by_domain
+
+# Files load_data() reads; their (mtime, size) signature tells the reloader when to reload
+DATA_FILES = [
+    "copy_trade_candidates.json",
+    "domain_wallet_rankings.json",
+    "wallet_rankings.json",
+    "domain_copy_trade_candidates.json",
+    "domain_wallet_rankings_by_domain.json",
+]
+RELOAD_INTERVAL = 5  # Seconds between data file checks
+
+# (mtime_ns, size) of every data file, None for missing files
+def data_signature():
+    signature = []
+    for path in DATA_FILES:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+# One immutable, fully parsed version of the ranking data
+class Dataset:
+    def __init__(self, all_candidates, domain_rankings, network_rankings, domain_copy_trade_all,
+                 domain_rankings_by_domain, signature):
+        self.all_candidates = all_candidates
+        self.domain_rankings = domain_rankings
+        self.network_rankings = network_rankings
+        self.domain_copy_trade_all = domain_copy_trade_all
+        self.domain_rankings_by_domain = domain_rankings_by_domain
+        self.signature = signature
+        self.version = "-".join(str(part[0]) if part else "0" for part in signature)
+        mtimes = [part[0] for part in signature if part]
+        self.modified_at = datetime.fromtimestamp(max(mtimes) / 1e9 if mtimes else time.time(), tz=timezone.utc)
+        self.tables = build_table_indexes(self)  # Pre-sorted indexes for the JSON API
+        self.domain_tables = build_domain_table_indexes(self)  # The same per ranked domain
+
+# Parse the data files into a Dataset (blocking; run it off the event loop)
+def load_dataset():
+    signature = data_signature()
+    return Dataset(*load_data(), signature)
+
+# Keeps the current Dataset and replaces it when the data files change.
+# Handlers read `reloader.dataset` once per request; a reload builds a complete new Dataset in
+# a worker thread and swaps the reference in one assignment, so in-flight requests keep the
+# version they started with and never see a half-loaded one.
+class DataReloader:
+    def __init__(self, interval=RELOAD_INTERVAL):
+        self.interval = interval
+        self.dataset = load_dataset()
+        self.task = None
+
+    # Start watching on the running event loop; the task is kept here so it is never collected
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.watch())
+        return self.task
+
+    # Poll the data files and reload after a change has settled (unchanged for one interval,
+    # so a pipeline publishing several files is picked up as one version)
+    async def watch(self):
+        pending_signature = None
+        failed_signature = None  # Files that failed to parse are not retried until they change again
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                signature = data_signature()
+            except OSError:
+                logging.exception("Cannot check the ranking data files")
+                continue
+            if signature == self.dataset.signature or signature == failed_signature:
+                pending_signature = None
+                continue
+            if signature != pending_signature:
+                pending_signature = signature
+                continue
+            try:
+                dataset = await asyncio.to_thread(load_dataset)
+            except Exception:
+                # Any failure (unreadable files, unexpected data while building the indexes)
+                # keeps the current dataset; the watcher itself must never die
+                logging.exception("Keeping current ranking data, reload failed")
+                failed_signature = signature
+                pending_signature = None
+                continue
+            if dataset.signature == signature:
+                self.dataset = dataset
+                pending_signature = None
+                logging.info(f"Reloaded ranking data (version {dataset.version})")
@@ -0,0 +1,82 @@
+import threading
+import numpy as np
+
+# Dictionary encoding of the strings every stage passes around: 56-character G-addresses,
+# "CODE_ISSUER" asset keys and "XLM/CODE" pair labels.
+# A Dictionary gives each distinct string a dense integer id in first-seen order, so hot loops
+# hash, compare, pickle and store small ints and look strings up again only when a result
+# leaves the stage. The run-wide dictionaries below live for one process (one pipeline run);
+# ids are never persisted, and on-disk intermediates carry their own dictionary per file
+# (encode_column / decode_column).
+# The pipeline runs stages on threads (the P&L pool feeder and the candidate stages encode into
+# the same dictionaries), so assigning a new id is serialized by a lock; lookups of known
+# strings stay lock-free.
+
+# Bidirectional string <-> dense id mapping
+class Dictionary:
+    def __init__(self, values=()):
+        self.ids = {}
+        self.values = []
+        self.lock = threading.Lock()
+        for value in values:
+            self.encode(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    # Id of value, assigning the next id on first sight. The string is appended before its id is
+    # published, so any id a lock-free reader sees can already be decoded.
+    def encode(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            with self.lock:
+                value_id = self.ids.get(value)
+                if value_id is None:
+                    self.values.append(value)
+                    value_id = self.ids[value] = len(self.values) - 1
+        return value_id
+
+    # Ids of many values as an int64 array
+    def encode_all(self, values):
+        return np.fromiter((self.encode(value) for value in values), dtype=np.int64)
+
+    # Ids of every value of many lists as one flat int64 array, plus the index of the list each
+    # value came from. Known strings are looked up in a single C-level pass.
+    def encode_lists(self, lists):
+        values = [value for values in lists for value in values]
+        value_ids = list(map(self.ids.get, values))
+        if None in value_ids:
+            value_ids = [self.encode(value) if value_id is None else value_id
+                         for value, value_id in zip(values, value_ids)]
+        owners = np.repeat(np.arange(len(lists)), [len(values) for values in lists])
+        return np.array(value_ids, dtype=np.int64), owners
+
+    def decode(self, value_id):
+        return self.values[value_id]
+
+    # Strings of many ids as a list
+    def decode_all(self, value_ids):
+        values = self.values
+        return [values[value_id] for value_id in value_ids]
+
+# Run-wide dictionaries; on-disk files encode their own (encode_column) and readers map them to
+# these ids. Worker processes only hold the ids assigned before they started (pnl_pool's
+# forkserver workers none at all), so they must only pass ids back, never decode them.
+ACCOUNTS = Dictionary()  # G-addresses
+ASSETS = Dictionary()  # Asset keys ("XLM" / "CODE_ISSUER")
+PAIRS = Dictionary()  # Pair labels ("XLM/CODE" / "CODE/XLM")
+
+# Dictionary-encode a text column for storage: returns (int32 codes, dictionary array) where
+# dictionary[codes] restores the column. The dictionary holds each distinct string once.
+def encode_column(values):
+    dictionary, codes = np.unique(np.asarray(values, dtype=np.str_), return_inverse=True)
+    return codes.astype(np.int32).reshape(-1), dictionary
+
+# Decode an encode_column() pair back into a list of strings
+def decode_column(codes, dictionary):
+    if len(dictionary) == 0:
+        return [""] * len(codes)
+    return dictionary[codes].tolist()
@@ -1,127 +1,116 @@
 import json
-import psycopg
 from datetime import datetime, timedelta, timezone
-import requests
-import toml
 import os
+import argparse
+import hashlib
+from horizon_db import run_queries
+from stellar_toml import resolve_domain_assets
+from swap_cache import SwapCache, columns_to_rows, contiguous_runs, hour_start, rows_to_columns, split_window
+from window_aggregates import hour_number
 
-# Database connection parameters
-DB_HOST = "horizon.cz2imkksk7b4.us-west-1.rds.amazonaws.com"
-DB_PORT = 5434
-DB_NAME = "horizon"
-DB_USER = "stellar"
-DB_PASS = "new_stellar_pass"
-
-# Connect to the PostgreSQL database
-conn = psycopg.connect(
-    host=DB_HOST,
-    port=DB_PORT,
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASS,
-    connect_timeout=300,
-    sslmode="require"
-)
-cursor = conn.cursor()
-
-# Fetch assets issued by a domain by directly parsing stellar.toml
-def get_assets_by_domain(domain):
-    try:
-        response = requests.get(f"https://{domain}/.well-known/stellar.toml", timeout=10)
-        response.raise_for_status()
-        toml_content = toml.loads(response.text)
-        
-        assets = []
-        if "CURRENCIES" in toml_content:
-            for currency in toml_content["CURRENCIES"]:
-                if "code" in currency and "issuer" in currency and "status" in currency and currency["status"] == "live":
-                    assets.append((currency["code"], currency["issuer"]))
-        
-        print(f"Assets found for {domain}: {len(assets)} assets")
-        return assets
-    except (requests.RequestException, toml.TomlDecodeError) as e:
-        print(f"Error fetching or parsing stellar.toml for {domain}: {e}")
-        return []
-
-# Fetch swaps for assets issued by specified domains
-def fetch_swaps_for_domains(domains):
-    start_time = datetime.now(timezone.utc) - timedelta(hours=36)  # Reduced to 36 hours
-    swaps_by_wallet = {}
+# Domains whose issued assets are ranked (comma-separated RANKING_DOMAINS overrides the default)
+DOMAINS = [domain.strip() for domain in os.getenv("RANKING_DOMAINS", "lu.meme").split(",") if domain.strip()]
 
-    # Get assets for each domain
-    target_assets = []
-    for domain in domains:
-        assets = get_assets_by_domain(domain)
-        target_assets.extend(assets)
+# Output columns of the domain swap query with the types the binary COPY backend decodes them into
+DOMAIN_SWAP_COLUMN_TYPES = [
+    ("source_account", "text"),
+    ("num_swaps", "int8"),
+    ("xlm_inflows", "float8"),
+    ("xlm_outflows", "float8"),
+    ("dest_asset_code", "text"),
+    ("dest_asset_issuer", "text"),
+    ("src_asset_code", "text"),
+    ("src_asset_issuer", "text"),
+]
 
-    if not target_assets:
-        print("No assets found for the specified domains.")
-        return swaps_by_wallet
-
-    print(f"Processing swaps for {len(target_assets)} assets...")
-
-    # Prepare conditions for all assets in a single query
-    conditions = []
-    asset_params = []
-    for asset_code, asset_issuer in target_assets:
-        condition = """
-            ((ho.details->>'asset_type' = 'credit_alphanum4' AND ho.details->>'asset_code' = %s AND ho.details->>'asset_issuer' = %s)
-            OR (ho.details->>'source_asset_type' = 'credit_alphanum4' AND ho.details->>'source_asset_code' = %s AND ho.details->>'source_asset_issuer' = %s))
-        """
-        conditions.append(condition)
-        asset_params.extend([asset_code, asset_issuer, asset_code, asset_issuer])
-
-    # Combine all conditions with OR
-    asset_conditions = " OR ".join(conditions)
-
-    # Single query to fetch swaps for all assets
-    query = f"""
-    WITH path_payment_ops AS (
-        SELECT DISTINCT ON (ho.transaction_id)
+# Column layout of cached per-hour domain aggregate partitions
+DOMAIN_CACHE_SCHEMA = [
+    ("source_account", "text"),
+    ("num_swaps", "int"),
+    ("xlm_inflows", "float"),
+    ("xlm_outflows", "float"),
+    ("dest_asset_code", "text"),
+    ("dest_asset_issuer", "text"),
+    ("src_asset_code", "text"),
+    ("src_asset_issuer", "text"),
+]
+NUM_ROW_COLUMNS = len(DOMAIN_CACHE_SCHEMA)  # Row width before the optional hour bucket
+
+# Operations whose destination or source leg is one of the target assets. The targets are one
+# relation unnested from two parallel arrays, so each IN is a hashed subplan: one hash probe per
+# operation leg however many assets are tracked, where a chain of per-asset ORs re-evaluated
+# every comparison on every row. Matching on (code, issuer) alone covers both
+# credit_alphanum4 and credit_alphanum12 assets.
+TARGET_ASSET_FILTER = """(
+                (ho.details->>'asset_code', ho.details->>'asset_issuer') IN (SELECT code, issuer FROM target_assets)
+                OR (ho.details->>'source_asset_code', ho.details->>'source_asset_issuer')
+                    IN (SELECT code, issuer FROM target_assets)
+            )"""
+
+# Build the domain swap query. Path payments and payments touching a target asset are selected
+# once (target_ops) and then split by type. Rows are aggregated per (wallet, destination asset,
+# source asset), and additionally per hour bucket when by_hour is set (used to fill the local
+# swap cache); both legs are returned so each row can be attributed to the domain issuing the
+# traded asset. Parameters come from domain_query_params().
+def build_domain_swaps_query(by_hour=False):
+    bucket_column = ",\n        date_trunc('hour', created_at) as bucket" if by_hour else ""
+    bucket_group = ", bucket" if by_hour else ""
+    return f"""
+    WITH target_assets AS (
+        SELECT code, issuer FROM unnest(%s::text[], %s::text[]) AS asset(code, issuer)
+    ),
+    target_ops AS (
+        SELECT
+            ho.id,
             ho.transaction_id,
+            ho.type,
             ho.source_account,
-            ho.details->>'amount' as amount,
-            ho.details->>'source_amount' as source_amount,
-            ho.details->>'asset_type' as dest_asset_type,
-            ho.details->>'source_asset_type' as src_asset_type,
-            COALESCE(ho.details->>'fee', '0')::float as fee,
-            CASE
-                WHEN ho.details->>'asset_type' = 'credit_alphanum4' THEN ho.details->>'asset_code'
-                WHEN ho.details->>'source_asset_type' = 'credit_alphanum4' THEN ho.details->>'source_asset_code'
-                ELSE 'UNKNOWN'
-            END as asset_code
+            ht.created_at,
+            ho.details
         FROM history_operations ho
         JOIN history_transactions ht ON ho.transaction_id = ht.id
         WHERE 
-            ho.type = 13  -- PathPaymentStrictSend
+            ho.type IN (2, 13)  -- Payment, PathPaymentStrictSend
             AND ht.successful = true
             AND ht.created_at >= %s
+            AND ht.created_at < COALESCE(%s::timestamptz, 'infinity')
             AND ho.source_account LIKE 'G%%' ESCAPE ''
-            AND ({asset_conditions})
-        ORDER BY ho.transaction_id, ho.id DESC
+            AND {TARGET_ASSET_FILTER}
+    ),
+    path_payment_ops AS (
+        SELECT DISTINCT ON (transaction_id)
+            transaction_id,
+            source_account,
+            created_at,
+            details->>'amount' as amount,
+            details->>'source_amount' as source_amount,
+            details->>'asset_type' as dest_asset_type,
+            details->>'source_asset_type' as src_asset_type,
+            COALESCE(details->>'fee', '0')::float as fee,
+            details->>'asset_code' as dest_asset_code,
+            details->>'asset_issuer' as dest_asset_issuer,
+            details->>'source_asset_code' as src_asset_code,
+            details->>'source_asset_issuer' as src_asset_issuer
+        FROM target_ops
+        WHERE type = 13  -- PathPaymentStrictSend
+        ORDER BY transaction_id, id DESC
     ),
     payment_ops AS (
         SELECT 
-            ho.transaction_id,
-            ho.source_account,
-            ho.details->>'amount' as amount,
-            ho.details->>'source_amount' as source_amount,
-            ho.details->>'asset_type' as dest_asset_type,
-            ho.details->>'source_asset_type' as src_asset_type,
+            transaction_id,
+            source_account,
+            created_at,
+            details->>'amount' as amount,
+            details->>'source_amount' as source_amount,
+            details->>'asset_type' as dest_asset_type,
+            details->>'source_asset_type' as src_asset_type,
             0 as fee,
-            CASE
-                WHEN ho.details->>'asset_type' = 'credit_alphanum4' THEN ho.details->>'asset_code'
-                WHEN ho.details->>'source_asset_type' = 'credit_alphanum4' THEN ho.details->>'source_asset_code'
-                ELSE 'UNKNOWN'
-            END as asset_code
-        FROM history_operations ho
-        JOIN history_transactions ht ON ho.transaction_id = ht.id
-        WHERE 
-            ho.type = 2  -- Payment
-            AND ht.successful = true
-            AND ht.created_at >= %s
-            AND ho.source_account LIKE 'G%%' ESCAPE ''
-            AND ({asset_conditions})
+            details->>'asset_code' as dest_asset_code,
+            details->>'asset_issuer' as dest_asset_issuer,
+            details->>'source_asset_code' as src_asset_code,
+            details->>'source_asset_issuer' as src_asset_issuer
+        FROM target_ops
+        WHERE type = 2  -- Payment
     ),
     all_ops AS (
         SELECT * FROM path_payment_ops
@@ -139,62 +128,194 @@ def fetch_swaps_for_domains(domains):
             WHEN src_asset_type = 'native' THEN (source_amount)::float + fee
             ELSE 0
         END) as xlm_outflows,
-        asset_code
+        dest_asset_code,
+        dest_asset_issuer,
+        src_asset_code,
+        src_asset_issuer{bucket_column}
     FROM all_ops
-    GROUP BY source_account, asset_code
+    GROUP BY source_account, dest_asset_code, dest_asset_issuer, src_asset_code, src_asset_issuer{bucket_group}
     HAVING COUNT(*) >= 1
     ORDER BY num_swaps DESC;
     """
-    # Construct the full params list
-    params = [start_time] + asset_params + [start_time] + asset_params
-    cursor.execute("SET statement_timeout = '300s';")  # 5-minute timeout
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    for row in results:
-        wallet = row[0]
-        asset_code = row[4] if row[4] else "UNKNOWN"
-        if wallet not in swaps_by_wallet:
-            swaps_by_wallet[wallet] = {
-                "num_swaps": 0,
-                "xlm_inflows": 0.0,
-                "xlm_outflows": 0.0,
-                "assets_traded": {}
-            }
-        swaps_by_wallet[wallet]["num_swaps"] += row[1]
-        swaps_by_wallet[wallet]["xlm_inflows"] += row[2] or 0.0
-        swaps_by_wallet[wallet]["xlm_outflows"] += row[3] or 0.0
-        if asset_code not in swaps_by_wallet[wallet]["assets_traded"]:
-            swaps_by_wallet[wallet]["assets_traded"][asset_code] = {
-                "num_swaps": 0,
-                "xlm_inflows": 0.0,
-                "xlm_outflows": 0.0
-            }
-        swaps_by_wallet[wallet]["assets_traded"][asset_code]["num_swaps"] += row[1]
-        swaps_by_wallet[wallet]["assets_traded"][asset_code]["xlm_inflows"] += row[2] or 0.0
-        swaps_by_wallet[wallet]["assets_traded"][asset_code]["xlm_outflows"] += row[3] or 0.0
-
-    return swaps_by_wallet
+
+# Parameters of the domain swap query: the target (code, issuer) pairs as two parallel arrays,
+# then (start, end); end may be None for an open-ended range
+def domain_query_params(target_assets, start, end):
+    codes = [code for code, _ in target_assets]
+    issuers = [issuer for _, issuer in target_assets]
+    return [codes, issuers, start, end]
+
+# Domain swap query statement for horizon_db under the selected extraction backend
+# (column types select binary COPY)
+def domain_statement(query, params, column_types, extract="cursor"):
+    if extract == "copy":
+        return (query, params, column_types)
+    return (query, params)
+
+# Cache-first domain aggregation: whole past hours are read from per-hour aggregate partitions
+# in the local swap cache, missing hour ranges are queried grouped by hour and stored, and the
+# partial hours at the window edges are queried directly, all ranges concurrently. Returns rows in the
+# DOMAIN_CACHE_SCHEMA layout, possibly several per (wallet, destination asset, source asset).
+def fetch_domain_rows_cached(cache, target_assets, start_time, extract="cursor"):
+    end_time = datetime.now(timezone.utc)
+    # The partition layout and asset filter are part of the key, so partitions written by an
+    # older layout or filter are never read
+    assets_key = hashlib.sha1(json.dumps([sorted(target_assets), DOMAIN_CACHE_SCHEMA,
+                                          TARGET_ASSET_FILTER]).encode()).hexdigest()[:16]
+    namespace = f"domain_swaps_{assets_key}"
+    hours, edges = split_window(start_time, end_time)
+    rows = []
+
+    missing_hours = []
+    for hour in hours:
+        partition = cache.get(namespace, hour)
+        if partition is None:
+            missing_hours.append(hour)
+        else:
+            rows.extend(columns_to_rows(partition, DOMAIN_CACHE_SCHEMA))
+    if missing_hours:
+        print(f"Swap cache: {len(hours) - len(missing_hours)}/{len(hours)} hours cached, querying the rest")
+
+    hourly_query = build_domain_swaps_query(by_hour=True)
+    query = build_domain_swaps_query()
+    runs = contiguous_runs(missing_hours)
+    statements = []
+    for first_hour, last_hour in runs:
+        range_start, range_end = hour_start(first_hour), hour_start(last_hour + 1)
+        params = domain_query_params(target_assets, range_start, range_end)
+        statements.append(domain_statement(hourly_query, params,
+                                           DOMAIN_SWAP_COLUMN_TYPES + [("bucket", "timestamptz")], extract))
+    for edge_start, edge_end in edges:
+        params = domain_query_params(target_assets, edge_start, edge_end)
+        statements.append(domain_statement(query, params, DOMAIN_SWAP_COLUMN_TYPES, extract))
+    fetched_ranges = run_queries(statements)
+
+    for (first_hour, last_hour), fetched in zip(runs, fetched_ranges):
+        fetched_by_hour = {hour: [] for hour in range(first_hour, last_hour + 1)}
+        for row in fetched:
+            fetched_by_hour[hour_number(row[NUM_ROW_COLUMNS])].append(row[:NUM_ROW_COLUMNS])
+        for hour, hour_rows in fetched_by_hour.items():
+            cache.put(namespace, hour, rows_to_columns(hour_rows, DOMAIN_CACHE_SCHEMA))
+            rows.extend(hour_rows)
+    for fetched in fetched_ranges[len(runs):]:
+        rows.extend(fetched)
+    return rows
+
+# Add one aggregated row to a {wallet: totals} mapping
+def add_wallet_row(swaps_by_wallet, wallet, asset_code, num_swaps, xlm_inflows, xlm_outflows):
+    if wallet not in swaps_by_wallet:
+        swaps_by_wallet[wallet] = {
+            "num_swaps": 0,
+            "xlm_inflows": 0.0,
+            "xlm_outflows": 0.0,
+            "assets_traded": {}
+        }
+    swaps_by_wallet[wallet]["num_swaps"] += num_swaps
+    swaps_by_wallet[wallet]["xlm_inflows"] += xlm_inflows
+    swaps_by_wallet[wallet]["xlm_outflows"] += xlm_outflows
+    if asset_code not in swaps_by_wallet[wallet]["assets_traded"]:
+        swaps_by_wallet[wallet]["assets_traded"][asset_code] = {
+            "num_swaps": 0,
+            "xlm_inflows": 0.0,
+            "xlm_outflows": 0.0
+        }
+    swaps_by_wallet[wallet]["assets_traded"][asset_code]["num_swaps"] += num_swaps
+    swaps_by_wallet[wallet]["assets_traded"][asset_code]["xlm_inflows"] += xlm_inflows
+    swaps_by_wallet[wallet]["assets_traded"][asset_code]["xlm_outflows"] += xlm_outflows
+
+# Aggregate query rows per wallet, over all domains and per domain. Each row is attributed
+# through the (code, issuer) -> [domains] lookup to the domains issuing its traded asset: the
+# destination leg if that is a tracked asset, else the source leg.
+# Returns (combined {wallet: totals}, {domain: {wallet: totals}}).
+def aggregate_domain_rows(rows, domains_by_asset):
+    swaps_by_wallet = {}
+    swaps_by_domain = {}
+    for row in rows:
+        wallet, num_swaps = row[0], row[1]
+        xlm_inflows, xlm_outflows = row[2] or 0.0, row[3] or 0.0
+        asset = (row[4], row[5])
+        if asset not in domains_by_asset:
+            asset = (row[6], row[7])
+        asset_code = asset[0] or "UNKNOWN"
+        add_wallet_row(swaps_by_wallet, wallet, asset_code, num_swaps, xlm_inflows, xlm_outflows)
+        for domain in domains_by_asset.get(asset, ()):
+            add_wallet_row(swaps_by_domain.setdefault(domain, {}), wallet, asset_code, num_swaps, xlm_inflows,
+                           xlm_outflows)
+    return swaps_by_wallet, swaps_by_domain
+
+# Fetch swaps for assets issued by specified domains, all domains in one scan
+# (extract: "cursor" for the regular row protocol, "copy" for binary COPY;
+#  cache: optional SwapCache consulted before Postgres).
+# Returns (combined {wallet: totals}, {domain: {wallet: totals}}), see aggregate_domain_rows().
+def fetch_swaps_for_domains(domains, extract="cursor", cache=None):
+    start_time = datetime.now(timezone.utc) - timedelta(hours=36)
+
+    # Get assets for each domain (fetched concurrently, cached on disk; see stellar_toml.py).
+    # An asset listed by several domains counts for each of them.
+    domains_by_asset = {}
+    for domain, assets in resolve_domain_assets(domains).items():
+        for asset in assets:
+            domains_by_asset.setdefault(asset, []).append(domain)
+    target_assets = list(domains_by_asset)
+
+    if not target_assets:
+        print("No assets found for the specified domains.")
+        return {}, {}
+
+    print(f"Processing swaps for {len(target_assets)} assets of {len(domains)} domains...")
+
+    if cache is not None:
+        results = fetch_domain_rows_cached(cache, target_assets, start_time, extract)
+    else:
+        # Single query to fetch swaps for all assets
+        query = build_domain_swaps_query()
+        params = domain_query_params(target_assets, start_time, None)
+        results = run_queries([domain_statement(query, params, DOMAIN_SWAP_COLUMN_TYPES, extract)])[0]
+
+    return aggregate_domain_rows(results, domains_by_asset)
+
+# domain_wallet_rankings.json records from {wallet: totals}, most active wallets first
+def rankings_from_totals(swaps_by_wallet):
+    wallet_rankings = []
+    for wallet, data in swaps_by_wallet.items():
+        wallet_rankings.append({
+            "source_account": wallet,
+            "num_swaps": data["num_swaps"],
+            "xlm_inflows": data["xlm_inflows"],
+            "xlm_outflows": data["xlm_outflows"],
+            "net_xlm_flow": data["xlm_inflows"] - data["xlm_outflows"],
+            "assets_traded": data["assets_traded"]
+        })
+
+    wallet_rankings.sort(key=lambda x: x["num_swaps"], reverse=True)
+    return wallet_rankings
+
+# Build the domain rankings from one scan over all domains' assets: {"rankings": per-wallet
+# totals over every domain (domain_wallet_rankings.json), "by_domain": {domain: the same records
+# over that domain's assets only}}. Domains without swaps in the window get an empty list.
+def build_domain_rankings(domains=DOMAINS, extract="cursor", cache=None):
+    swaps_by_wallet, swaps_by_domain = fetch_swaps_for_domains(domains, extract=extract, cache=cache)
+    return {
+        "rankings": rankings_from_totals(swaps_by_wallet),
+        "by_domain": {domain: rankings_from_totals(swaps_by_domain.get(domain, {})) for domain in domains},
+    }
 
 # Main script logic
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank wallets trading assets issued by specific domains")
+    parser.add_argument("--extract", choices=["cursor", "copy"], default="cursor",
+                        help="swap extraction backend: regular cursor or binary COPY")
+    parser.add_argument("--cache", action="store_true",
+                        help="read whole past hours from the local swap cache and only query missing ranges")
+    parser.add_argument("--domains", default=",".join(DOMAINS),
+                        help="comma-separated issuer domains to rank (default: RANKING_DOMAINS or lu.meme)")
+    args = parser.parse_args()
+    domains = [domain.strip() for domain in args.domains.split(",") if domain.strip()]
+
     print("Fetching swaps for assets issued by specified domains...")
     try:
-        domains = ["lu.meme"]
-        swaps_by_wallet = fetch_swaps_for_domains(domains)
-
-        wallet_rankings = []
-        for wallet, data in swaps_by_wallet.items():
-            wallet_rankings.append({
-                "source_account": wallet,
-                "num_swaps": data["num_swaps"],
-                "xlm_inflows": data["xlm_inflows"],
-                "xlm_outflows": data["xlm_outflows"],
-                "net_xlm_flow": data["xlm_inflows"] - data["xlm_outflows"],
-                "assets_traded": data["assets_traded"]
-            })
-
-        wallet_rankings.sort(key=lambda x: x["num_swaps"], reverse=True)
+        result = build_domain_rankings(domains, extract=args.extract, cache=SwapCache() if args.cache else None)
+        wallet_rankings = result["rankings"]
 
         # Archive the current domain_wallet_rankings.json with a timestamp
         if os.path.exists("domain_wallet_rankings.json"):
@@ -203,11 +324,10 @@ if __name__ == "__main__":
 
         with open("domain_wallet_rankings.json", "w") as f:
             json.dump(wallet_rankings, f, indent=2)
+        with open("domain_wallet_rankings_by_domain.json", "w") as f:
+            json.dump(result["by_domain"], f, indent=2)
 
         print(f"Saved {len(wallet_rankings)} wallet rankings to domain_wallet_rankings.json")
+        print(f"Saved rankings of {len(result['by_domain'])} domains to domain_wallet_rankings_by_domain.json")
     except Exception as e:
         print(f"Error occurred: {e}")
-    finally:
-        # Clean up
-        cursor.close()
-        conn.close()
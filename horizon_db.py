@@ -0,0 +1,148 @@
+import asyncio
+import os
+import queue
+import threading
+from contextlib import asynccontextmanager
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+from copy_extract import build_copy_statement
+
+# Shared Horizon data-access layer used by every script that reads the Horizon database.
+# Credentials, pool sizing, timeouts and retry policy live here only; each can be overridden
+# with the matching HORIZON_DB_* environment variable.
+DB_HOST = os.getenv("HORIZON_DB_HOST", "horizon.cz2imkksk7b4.us-west-1.rds.amazonaws.com")
+DB_PORT = int(os.getenv("HORIZON_DB_PORT", "5434"))
+DB_NAME = os.getenv("HORIZON_DB_NAME", "horizon")
+DB_USER = os.getenv("HORIZON_DB_USER", "stellar")
+DB_PASS = os.getenv("HORIZON_DB_PASS", "new_stellar_pass")
+DB_SSLMODE = os.getenv("HORIZON_DB_SSLMODE", "require")
+
+CONNECT_TIMEOUT = 300  # Seconds to establish a connection
+STATEMENT_TIMEOUT = "300s"  # Server-side limit per statement (5 minutes)
+POOL_MAX_SIZE = int(os.getenv("HORIZON_DB_POOL_SIZE", "8"))  # Max concurrent queries against Horizon
+POOL_OPEN_TIMEOUT = 60  # Seconds to wait for the first pooled connection before giving up
+POOL_TIMEOUT = 120  # Seconds a query may wait for a pooled connection (e.g. while one reconnects)
+QUERY_RETRIES = 3  # Attempts per query on connection-level failures
+RETRY_DELAY = 2.0  # Seconds before the first retry, doubled for each further attempt
+
+# libpq connection parameters shared by pooled and direct connections
+def connection_kwargs():
+    return {
+        "host": DB_HOST,
+        "port": DB_PORT,
+        "dbname": DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASS,
+        "connect_timeout": CONNECT_TIMEOUT,
+        "sslmode": DB_SSLMODE,
+        "options": f"-c statement_timeout={STATEMENT_TIMEOUT}",
+    }
+
+# Open a direct synchronous connection, for server-side cursors and other paths that keep
+# one session for a long stream of work
+def connect():
+    return psycopg.connect(**connection_kwargs())
+
+# Open an async pool of up to max_size connections (capped at POOL_MAX_SIZE) for the duration
+# of an `async with` block. Fails after POOL_OPEN_TIMEOUT if Horizon cannot be reached, rather
+# than letting every query wait for a connection that never comes.
+@asynccontextmanager
+async def open_pool(max_size=POOL_MAX_SIZE):
+    max_size = max(1, min(max_size, POOL_MAX_SIZE))
+    pool = AsyncConnectionPool(kwargs=connection_kwargs(), min_size=1, max_size=max_size,
+                               timeout=POOL_TIMEOUT, open=False)
+    await pool.open(wait=True, timeout=POOL_OPEN_TIMEOUT)
+    try:
+        yield pool
+    finally:
+        await pool.close()
+
+# Whether a failed query is worth retrying: lost or refused connections are, statement
+# timeouts and SQL errors are not
+def is_retryable(error):
+    return isinstance(error, psycopg.OperationalError) and not isinstance(error, psycopg.errors.QueryCanceled)
+
+# Run one statement on a pooled connection and return all rows, retrying connection failures.
+# A statement is (query, params) or (query, params, column_types); with column_types the rows
+# are extracted through binary COPY (see copy_extract.py) instead of the row protocol.
+async def fetch_all(pool, statement):
+    query, params = statement[0], statement[1]
+    column_types = statement[2] if len(statement) > 2 else None
+    for attempt in range(QUERY_RETRIES):
+        try:
+            async with pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    if column_types:
+                        rows = []
+                        async with cursor.copy(build_copy_statement(query, column_types), params) as copy:
+                            copy.set_types([pg_type for _, pg_type in column_types])
+                            async for row in copy.rows():
+                                rows.append(row)
+                        return rows
+                    await cursor.execute(query, params, prepare=True)
+                    return await cursor.fetchall()
+        except psycopg.Error as e:
+            if attempt == QUERY_RETRIES - 1 or not is_retryable(e):
+                raise
+            delay = RETRY_DELAY * 2 ** attempt
+            print(f"Query failed ({e}), retrying in {delay:.0f}s...")
+            await asyncio.sleep(delay)
+
+# Run independent statements concurrently on a pool; results are in statement order.
+# At most pool.max_size statements run at once, so queued ones never time out waiting for a
+# connection behind long-running queries.
+async def fetch_many(pool, statements, on_result=None):
+    slots = asyncio.Semaphore(pool.max_size)
+
+    async def run_one(index, statement):
+        async with slots:
+            rows = await fetch_all(pool, statement)
+        if on_result is not None:
+            on_result(index, rows)
+        return rows
+
+    return await asyncio.gather(*(run_one(index, statement) for index, statement in enumerate(statements)))
+
+# Synchronous entry point: run statements concurrently on a short-lived pool sized to the
+# work (capped at POOL_MAX_SIZE) and return their results in statement order
+def run_queries(statements):
+    async def run():
+        async with open_pool(len(statements)) as pool:
+            return await fetch_many(pool, statements)
+    return asyncio.run(run()) if statements else []
+
+# Run a single statement and return its rows
+def run_query(query, params=None):
+    return run_queries([(query, params)])[0]
+
+# Run statements concurrently and yield (index, rows) as each one completes, so callers can
+# start processing the first results while the rest are still running. The event loop runs
+# on a background thread; its errors are re-raised here.
+def iter_query_results(statements):
+    results = queue.Queue()
+    done = object()
+
+    async def run():
+        async with open_pool(len(statements)) as pool:
+            await fetch_many(pool, statements, on_result=lambda index, rows: results.put((index, rows)))
+
+    def run_loop():
+        try:
+            asyncio.run(run())
+        except BaseException as e:
+            results.put(e)
+        else:
+            results.put(done)
+
+    if not statements:
+        return
+    thread = threading.Thread(target=run_loop, daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is done:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
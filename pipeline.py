@@ -0,0 +1,264 @@
+import json
+import os
+import sys
+import argparse
+import fcntl
+import filecmp
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+import analyze_copy_trade_candidates
+import analyze_domain_copy_trade_candidates
+import copy_extract
+import dictionary_encoding
+import domain_wallet_rankings
+import horizon_db
+import pnl_engine
+import pnl_pool
+import stellar_toml
+import swap_cache
+import swap_records
+import wallet_profit_loss
+import wallet_rankings
+import window_aggregates
+from stage_memo import StageMemo, code_version, content_hash
+from swap_cache import SwapCache
+
+# In-process rankings pipeline (replaces running each script as its own process).
+# Stages form a DAG and hand their results to dependent stages in memory; stages whose inputs
+# are ready run concurrently, so the network branch (rankings -> P&L -> candidates) and the
+# domain branch (domain rankings -> domain candidates) overlap. Every JSON artifact is staged
+# as soon as its stage finishes and all of them are published together at the end.
+# Stages with a memo key are skipped when a StageMemo already holds the output for that key.
+LOCK_FILE = "pipeline.lock"
+BACKUP_DIR = "backups"
+
+# One pipeline step: run(inputs) receives {dependency name: result} and returns this stage's
+# JSON-shaped result; outputs(result) maps artifact file names to the JSON data to publish;
+# key(inputs) returns the memo key of the result, or None to always recompute
+class Stage:
+    def __init__(self, name, run, deps=(), outputs=None, key=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.outputs = outputs
+        self.key = key
+
+# Run one stage, through the memo when the stage has a key
+def execute_stage(stage, inputs, memo):
+    key = stage.key(inputs) if memo is not None and stage.key else None
+    if key is None:
+        return stage.run(inputs)
+    return memo.memoize(stage.name, key, lambda: stage.run(inputs))
+
+# Hold an exclusive non-blocking lock for the whole run; returns None if another run holds it
+def acquire_lock(path=LOCK_FILE):
+    lock_file = open(path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+    return lock_file
+
+# Write one artifact next to its final path; returns the staging path
+def stage_artifact(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    return tmp_path
+
+# Stages connected to `name` through dependencies in either direction (one pipeline branch)
+def branch_of(name, stages):
+    neighbours = {stage.name: set(stage.deps) for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            neighbours[dep].add(stage.name)
+    branch, todo = set(), [name]
+    while todo:
+        current = todo.pop()
+        if current not in branch:
+            branch.add(current)
+            todo.extend(neighbours[current])
+    return branch
+
+# Run the stage DAG. Returns ({stage name: result}, {stage name: error}); stages downstream of
+# a failure are skipped and reported with the upstream error. Artifacts are staged to .tmp files
+# when their stage completes, before any dependent stage can see (and mutate) the result.
+def run_stages(stages, max_workers=4, memo=None):
+    by_name = {stage.name: stage for stage in stages}
+    results, errors, staged = {}, {}, {}
+    pending = dict(by_name)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            # Skip stages below a failure, then start every stage whose inputs are ready
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    failed = [dep for dep in stage.deps if dep in errors]
+                    if failed:
+                        errors[name] = errors[failed[0]]
+                        print(f"[pipeline] Skipping {name}: {failed[0]} failed")
+                        del pending[name]
+                        progressed = True
+                    elif all(dep in results for dep in stage.deps):
+                        print(f"[pipeline] Starting {name}")
+                        inputs = {dep: results[dep] for dep in stage.deps}
+                        running[executor.submit(execute_stage, stage, inputs, memo)] = stage
+                        del pending[name]
+            if not running:
+                break  # Only unsatisfiable stages left (unknown dependency or cycle)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                    if stage.outputs:
+                        for path, data in stage.outputs(results[stage.name]).items():
+                            staged[path] = (stage.name, stage_artifact(path, data))
+                    print(f"[pipeline] Finished {stage.name}")
+                except Exception as e:
+                    errors[stage.name] = e
+                    print(f"[pipeline] {stage.name} failed: {e}")
+
+    for name in pending:
+        errors[name] = RuntimeError(f"unsatisfiable dependencies {by_name[name].deps}")
+    return results, errors, staged
+
+# Publish staged artifacts. A branch's artifacts are only published if every stage in that
+# branch succeeded, so the files published together always come from the same run; staged files
+# of failed branches are discarded. The previous version of each file is archived to backups/.
+# Returns the paths that were replaced.
+def publish(stages, errors, staged):
+    failed_stages = set()
+    for name in errors:
+        failed_stages |= branch_of(name, stages)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    published = []
+    for path, (stage_name, tmp_path) in staged.items():
+        # Unchanged artifacts (e.g. memoized stages) are left alone rather than re-archived
+        if stage_name in failed_stages or (os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False)):
+            os.remove(tmp_path)
+            continue
+        if os.path.exists(path):
+            name, ext = os.path.splitext(path)
+            os.rename(path, os.path.join(BACKUP_DIR, f"{name}_{timestamp}{ext}"))
+        os.replace(tmp_path, path)
+        published.append(path)
+    return published
+
+# End of the input window of the Horizon-reading stages, rounded down to the hour. Rankings, P&L
+# and domain rankings all cover a window ending now, so their memo keys use this hour plus the
+# stage parameters: runs within the same hour reuse the results (each stage recomputes at most
+# once an hour) instead of missing the memo on every new ledger. --no-memo forces a refresh.
+def window_end_hour():
+    return window_aggregates.hour_number(datetime.now(timezone.utc))
+
+# The rankings DAG. Memo keys cover each stage's input data, its parameters and the source of
+# the modules that compute it; stages reading Horizon also include window_end_hour (no memo
+# key, so always recomputed, when it is None).
+# The rankings come from wallet_rankings.fetch_swaps() (the last WINDOW_HOURS hours) unless
+# incremental is set; the incremental ring buffer answers an N-hour window with N to N+1 hours
+# of swaps (see wallet_rankings.rank_window) and is required for the extra windows.
+def build_stages(extract="cursor", cache=None, windows=(), domains=domain_wallet_rankings.DOMAINS, window_end=None,
+                 universe=False, incremental=False):
+    def compute_rankings(inputs):
+        rankings, extra_rankings = wallet_rankings.compute_rankings(incremental=incremental, extra_windows=windows,
+                                                                    universe=universe)
+        return {"rankings": rankings, "by_window": {str(hours): ranked for hours, ranked in extra_rankings.items()}}
+
+    def rankings_outputs(result):
+        outputs = {"wallet_rankings.json": result["rankings"]}
+        for hours, rankings in result["by_window"].items():
+            outputs[f"wallet_rankings_{hours}h.json"] = rankings
+        return outputs
+
+    # Every repository module each stage's output depends on, so editing any of them misses the memo
+    data_access = [horizon_db.__file__, copy_extract.__file__]
+    rankings_code = code_version(wallet_rankings.__file__, window_aggregates.__file__, *data_access)
+    pnl_code = code_version(wallet_profit_loss.__file__, pnl_engine.__file__, pnl_pool.__file__, swap_records.__file__,
+                            swap_cache.__file__, dictionary_encoding.__file__, window_aggregates.__file__,
+                            *data_access)
+    domain_code = code_version(domain_wallet_rankings.__file__, stellar_toml.__file__, swap_cache.__file__,
+                               dictionary_encoding.__file__, window_aggregates.__file__, *data_access)
+    return [
+        Stage("wallet_rankings", compute_rankings,
+              outputs=rankings_outputs,
+              key=lambda inputs: window_end and content_hash(window_end, sorted(windows), universe, incremental,
+                                                             rankings_code)),
+        Stage("wallet_pnl",
+              lambda inputs: wallet_profit_loss.analyze_wallet_pnl(inputs["wallet_rankings"]["rankings"],
+                                                                   extract=extract, cache=cache),
+              deps=["wallet_rankings"],
+              outputs=lambda result: {"wallet_pnl.json": result},
+              key=lambda inputs: window_end and content_hash(window_end, inputs["wallet_rankings"]["rankings"],
+                                                             pnl_code)),
+        Stage("copy_trade_candidates",
+              lambda inputs: analyze_copy_trade_candidates.find_copy_trade_candidates(inputs["wallet_pnl"]),
+              deps=["wallet_pnl"],
+              outputs=lambda result: {"copy_trade_candidates.json": result},
+              key=lambda inputs: analyze_copy_trade_candidates.candidates_memo_key(inputs["wallet_pnl"])),
+        Stage("domain_wallet_rankings",
+              lambda inputs: domain_wallet_rankings.build_domain_rankings(domains, extract=extract, cache=cache),
+              outputs=lambda result: {"domain_wallet_rankings.json": result["rankings"],
+                                      "domain_wallet_rankings_by_domain.json": result["by_domain"]},
+              key=lambda inputs: window_end and content_hash(window_end, sorted(domains), domain_code)),
+        Stage("domain_copy_trade_candidates",
+              lambda inputs: analyze_domain_copy_trade_candidates.find_domain_copy_trade_candidates(
+                  inputs["domain_wallet_rankings"]["rankings"]),
+              deps=["domain_wallet_rankings"],
+              outputs=lambda result: {"domain_copy_trade_candidates.json": result},
+              key=lambda inputs: analyze_domain_copy_trade_candidates.candidates_memo_key(
+                  inputs["domain_wallet_rankings"]["rankings"])),
+    ]
+
+# Main script logic
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full rankings pipeline in one process")
+    parser.add_argument("--extract", choices=["cursor", "copy"], default="cursor",
+                        help="swap extraction backend: regular cursor or binary COPY")
+    parser.add_argument("--cache", action="store_true",
+                        help="read whole past hours from the local swap cache and only query missing ranges")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"rank from the incremental hourly aggregates ({wallet_rankings.INGEST_STATE_FILE}) "
+                             "instead of scanning the whole window")
+    parser.add_argument("--windows", default="",
+                        help="extra comma-separated ranking windows in hours, published as wallet_rankings_<N>h.json "
+                             "(requires --incremental; each covers N to N+1 hours of swaps)")
+    parser.add_argument("--universe", action="store_true",
+                        help="rank and analyze every active account instead of the top 1000 by swap count")
+    parser.add_argument("--domains", default=",".join(domain_wallet_rankings.DOMAINS),
+                        help="comma-separated issuer domains for the domain rankings (default: RANKING_DOMAINS or lu.meme)")
+    parser.add_argument("--no-memo", action="store_true",
+                        help="recompute every stage instead of reusing outputs whose inputs did not change")
+    args = parser.parse_args()
+    windows = [int(hours) for hours in args.windows.split(",") if hours.strip()]
+    domains = [domain.strip() for domain in args.domains.split(",") if domain.strip()]
+    if windows and not args.incremental:
+        parser.error("--windows requires --incremental")
+
+    lock = acquire_lock()
+    if lock is None:
+        print(f"Another pipeline run holds {LOCK_FILE}; skipping this run.")
+        sys.exit(0)
+
+    try:
+        memo = None if args.no_memo else StageMemo()
+        window_end = None if args.no_memo else window_end_hour()
+        stages = build_stages(extract=args.extract, cache=SwapCache() if args.cache else None, windows=windows,
+                              domains=domains, window_end=window_end, universe=args.universe,
+                              incremental=args.incremental)
+        results, errors, staged = run_stages(stages, memo=memo)
+        published = publish(stages, errors, staged)
+        print(f"Published {len(published)} artifacts: {', '.join(published) or 'none'}")
+        if errors:
+            print(f"Failed stages: {', '.join(sorted(errors))}")
+            sys.exit(1)
+    finally:
+        lock.close()
@@ -0,0 +1,224 @@
+import math
+import numpy as np
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from dictionary_encoding import PAIRS
+from window_aggregates import as_utc
+
+# Columnar P&L engine: computes the same figures as wallet_profit_loss.estimate_pnl_for_wallet
+# for all wallets at once from flat arrays instead of walking a list of dicts per wallet.
+FEE_PER_SWAP = 0.00001  # 100 stroops per operation
+SLIPPAGE = 0.005  # 0.5% slippage per trade
+MATCH_TOLERANCE = 0.01  # Max asset amount difference for a buy/sell to count as a round trip
+MAX_MATRIX_CELLS = 4_000_000  # Bound on the padded per-wallet matrix used for exact running sums
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Columnar swap batch: one entry per swap, wallets referenced by index into the wallet list.
+# Asset keys and pair labels are run-wide dictionary ids (see dictionary_encoding.py).
+class SwapColumns:
+    def __init__(self, wallet_idx, closed_at, src_native, source_amount, amount, asset_key_id, pair_id):
+        self.wallet_idx = wallet_idx  # int64: index of the wallet in the input list
+        self.closed_at = closed_at  # int64: microseconds since the epoch
+        self.src_native = src_native  # bool: XLM was sold (buy of asset_key), else asset sold for XLM
+        self.source_amount = source_amount  # float64
+        self.amount = amount  # float64
+        self.asset_key_id = asset_key_id  # int64: ASSETS id of the traded asset ("CODE_ISSUER" / "XLM")
+        self.pair_id = pair_id  # int64: PAIRS id of the pair label ("XLM/CODE" / "CODE/XLM")
+
+    def __len__(self):
+        return len(self.wallet_idx)
+
+# Build SwapColumns from the {wallet: [SwapRecord, ...]} mapping produced by the fetch functions.
+# Swaps reference interned AssetRefs that already carry their dictionary ids, so no string is
+# hashed per swap.
+def swaps_to_columns(wallet_addresses, swaps_by_wallet):
+    wallet_idx, closed_at, src_native, source_amount, amount, asset_key_id, pair_id = [], [], [], [], [], [], []
+
+    for index, wallet_address in enumerate(wallet_addresses):
+        for swap in swaps_by_wallet.get(wallet_address, []):
+            is_buy = swap.source_asset.native
+            asset = swap.asset if is_buy else swap.source_asset
+            wallet_idx.append(index)
+            closed_at.append((as_utc(swap.closed_at) - EPOCH) // timedelta(microseconds=1))  # Naive = UTC
+            src_native.append(is_buy)
+            source_amount.append(swap.source_amount)
+            amount.append(swap.amount)
+            asset_key_id.append(asset.key_id)
+            pair_id.append(asset.buy_pair_id if is_buy else asset.sell_pair_id)
+
+    return SwapColumns(
+        np.array(wallet_idx, dtype=np.int64),
+        np.array(closed_at, dtype=np.int64),
+        np.array(src_native, dtype=bool),
+        np.array(source_amount, dtype=np.float64),
+        np.array(amount, dtype=np.float64),
+        np.array(asset_key_id, dtype=np.int64),
+        np.array(pair_id, dtype=np.int64),
+    )
+
+# Per-wallet running sums with exactly the same rounding as the sequential Python loop:
+# terms are laid out in a zero-padded (wallet, step) matrix and accumulated along each row,
+# which is a strict left-to-right sum (padding with +0.0 never changes the result).
+def sequential_row_sums(row_of, col_of, terms, num_rows):
+    totals = np.zeros(num_rows)
+    if len(terms) == 0:
+        return totals
+    width = int(col_of.max()) + 1
+    rows_per_chunk = max(1, MAX_MATRIX_CELLS // width)
+    for chunk_start in range(0, num_rows, rows_per_chunk):
+        chunk_end = min(chunk_start + rows_per_chunk, num_rows)
+        mask = (row_of >= chunk_start) & (row_of < chunk_end)
+        matrix = np.zeros((chunk_end - chunk_start, width))
+        matrix[row_of[mask] - chunk_start, col_of[mask]] = terms[mask]
+        totals[chunk_start:chunk_end] = np.add.accumulate(matrix, axis=1)[:, -1]
+    return totals
+
+# Pending buys of one asset, indexed for round-trip matching.
+# Buys are hashed into MATCH_TOLERANCE-wide amount buckets, each kept in insertion order, so a
+# sell only inspects the few buckets around its amount instead of scanning every pending buy.
+# match() returns exactly what the original first-fit scan returned: the earliest pending buy
+# whose asset amount is within MATCH_TOLERANCE of the sold amount.
+class RoundTripMatcher:
+    def __init__(self):
+        self.buckets = {}  # {bucket: deque([(seq, asset_amount, xlm_amount), ...])}
+        self.next_seq = 0
+
+    # Record a buy of `asset_amount` units paid with `xlm_amount` XLM
+    def add(self, asset_amount, xlm_amount):
+        bucket = math.floor(asset_amount / MATCH_TOLERANCE)
+        self.buckets.setdefault(bucket, deque()).append((self.next_seq, asset_amount, xlm_amount))
+        self.next_seq += 1
+
+    # Remove and return the XLM paid for the matching buy, or None if no pending buy matches.
+    # Two buckets either side are checked so float rounding at bucket edges cannot hide a match.
+    def match(self, sold_amount):
+        center = math.floor(sold_amount / MATCH_TOLERANCE)
+        best = None  # (seq, bucket, index, xlm_amount)
+        for bucket in range(center - 2, center + 3):
+            items = self.buckets.get(bucket)
+            if not items:
+                continue
+            for index, (seq, asset_amount, xlm_amount) in enumerate(items):
+                if best is not None and seq > best[0]:
+                    break  # Everything after this was added later than the current best
+                if abs(asset_amount - sold_amount) < MATCH_TOLERANCE:
+                    best = (seq, bucket, index, xlm_amount)
+                    break
+        if best is None:
+            return None
+        _, bucket, index, xlm_amount = best
+        items = self.buckets[bucket]
+        del items[index]
+        if not items:
+            del self.buckets[bucket]
+        return xlm_amount
+
+# First-fit matcher for one (wallet, asset) group; returns [(position, pnl_xlm), ...]
+def match_round_trips(positions, is_buy, source_amount, amount):
+    matcher = RoundTripMatcher()
+    round_trips = []
+    for position, buy, sold, received in zip(positions, is_buy, source_amount, amount):
+        if buy:
+            matcher.add(received, sold)
+        else:
+            prev_xlm = matcher.match(sold)
+            if prev_xlm is not None:
+                round_trips.append((position, (received - prev_xlm) * (1 - SLIPPAGE) - (2 * FEE_PER_SWAP)))
+    return round_trips
+
+# Compute the P&L figures of `num_wallets` wallets from a SwapColumns batch. Returns one
+# (total_pnl_xlm, num_round_trips, net_xlm_change, num_swaps_analyzed, pair_ids) tuple per wallet.
+# Only ids go in and out, so this is what pool workers run (see pnl_pool.py).
+def pnl_figures(num_wallets, columns):
+    # Sort by wallet, then by time; lexsort is stable so equal timestamps keep fetch order,
+    # like list.sort(key=closed_at) on each wallet's swaps
+    order = np.lexsort((columns.closed_at, columns.wallet_idx))
+    wallet_idx = columns.wallet_idx[order]
+    src_native = columns.src_native[order]
+    source_amount = columns.source_amount[order]
+    amount = columns.amount[order]
+    asset_key_id = columns.asset_key_id[order]
+    pair_id = columns.pair_id[order]
+
+    num_swaps_analyzed = np.bincount(wallet_idx, minlength=num_wallets)
+    wallet_starts = np.concatenate(([0], np.cumsum(num_swaps_analyzed)[:-1]))
+    step = np.arange(len(wallet_idx)) - wallet_starts[wallet_idx]
+
+    # Net XLM change: per swap, first the XLM leg, then the fee, summed in time order
+    xlm_leg = np.where(src_native, -source_amount, amount)
+    row_of = np.repeat(wallet_idx, 2)
+    col_of = np.empty(2 * len(step), dtype=np.int64)
+    col_of[0::2] = 2 * step
+    col_of[1::2] = 2 * step + 1
+    terms = np.empty(2 * len(step))
+    terms[0::2] = xlm_leg
+    terms[1::2] = -FEE_PER_SWAP
+    net_xlm_change = sequential_row_sums(row_of, col_of, terms, num_wallets)
+
+    # Asset pairs: distinct (wallet, pair) combinations in first-seen order
+    num_pairs = int(pair_id.max()) + 1 if len(pair_id) else 1
+    wallet_pair = wallet_idx * num_pairs + pair_id
+    _, first_seen = np.unique(wallet_pair, return_index=True)
+    first_seen.sort()
+    pair_ids = [[] for _ in range(num_wallets)]
+    for wallet, pair in zip(wallet_idx[first_seen].tolist(), pair_id[first_seen].tolist()):
+        pair_ids[wallet].append(pair)
+
+    # Round trips only exist in (wallet, asset) groups where a sell follows a buy
+    round_trips_by_wallet = [[] for _ in range(num_wallets)]
+    if len(step):
+        num_keys = int(asset_key_id.max()) + 1
+        group = wallet_idx * num_keys + asset_key_id
+        positions = np.arange(len(group))
+        group_order = np.argsort(group, kind="stable")
+        sorted_groups = group[group_order]
+        boundaries = np.flatnonzero(np.diff(sorted_groups)) + 1
+        big = len(group)
+        first_buy = np.minimum.reduceat(np.where(src_native[group_order], positions[group_order], big),
+                                        np.concatenate(([0], boundaries)))
+        last_sell = np.maximum.reduceat(np.where(src_native[group_order], -1, positions[group_order]),
+                                        np.concatenate(([0], boundaries)))
+        candidate_groups = np.flatnonzero(first_buy < last_sell)
+        group_bounds = np.concatenate(([0], boundaries, [len(group)]))
+        for g in candidate_groups:
+            members = group_order[group_bounds[g]:group_bounds[g + 1]]
+            wallet = int(wallet_idx[members[0]])
+            round_trips_by_wallet[wallet].extend(match_round_trips(
+                members.tolist(), src_native[members].tolist(),
+                source_amount[members].tolist(), amount[members].tolist()))
+
+    figures = []
+    for index in range(num_wallets):
+        # Sum in chronological order, as the per-wallet loop appends them
+        round_trips = [pnl for _, pnl in sorted(round_trips_by_wallet[index])]
+        total_pnl_xlm = sum(round_trips) if round_trips else 0.0
+        analyzed = int(num_swaps_analyzed[index])
+        figures.append((total_pnl_xlm, len(round_trips), float(net_xlm_change[index]) if analyzed else 0.0,
+                        analyzed, pair_ids[index]))
+    return figures
+
+# Result dicts in the wallet_pnl.json schema from pnl_figures() output, in the order of
+# `wallets`; pair ids are decoded back to labels here
+def pnl_records(wallets, figures):
+    results = []
+    for wallet, (total_pnl_xlm, num_round_trips, net_xlm_change, analyzed, pair_ids) in zip(wallets, figures):
+        results.append({
+            "source_account": wallet["source_account"],
+            "num_swaps": wallet["num_swaps"],
+            "total_volume_xlm": wallet["total_volume_xlm"],
+            "pnl": {
+                "total_pnl_xlm": total_pnl_xlm,
+                "num_round_trips": num_round_trips,
+                "avg_pnl_per_round_trip": total_pnl_xlm / num_round_trips if num_round_trips > 0 else 0.0,
+                "net_xlm_change": net_xlm_change,
+                "num_swaps_analyzed": analyzed,
+                "asset_pairs": PAIRS.decode_all(pair_ids)
+            }
+        })
+    return results
+
+# Compute P&L for every wallet from a SwapColumns batch.
+# Returns a list of result dicts in the wallet_pnl.json schema, in the order of `wallets`.
+def estimate_pnl_columnar(wallets, columns):
+    return pnl_records(wallets, pnl_figures(len(wallets), columns))
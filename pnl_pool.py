@@ -0,0 +1,139 @@
+import numpy as np
+from multiprocessing import cpu_count, get_context, resource_tracker, shared_memory
+import threading
+from pnl_engine import SwapColumns, estimate_pnl_columnar, pnl_figures, pnl_records, swaps_to_columns
+
+# Process-pool execution layer for the columnar P&L engine.
+# Each fetched batch of wallets is converted to SwapColumns once and copied into a single
+# shared-memory segment; workers receive only (segment name, row range, wallet range) and map
+# the columns straight out of shared memory instead of unpickling every wallet's swap list.
+# Workers send back numeric figures with dictionary-encoded pairs; the parent, which owns the
+# run-wide dictionaries, builds the result records.
+# Batches are submitted through imap_unordered as they come off the fetch generator, so the
+# workers start on the first batch while later batches are still being fetched.
+# The pool is created from a pipeline thread while other threads (psycopg pools, the asyncio
+# resolver loop) may hold locks, so workers come from a forkserver instead of forking this
+# process; the server preloads this module, so each worker starts with NumPy already imported.
+POOL_CONTEXT = get_context("forkserver")
+POOL_CONTEXT.set_forkserver_preload(["pnl_pool"])
+COLUMN_FIELDS = ("wallet_idx", "closed_at", "src_native", "source_amount", "amount", "asset_key_id", "pair_id")
+MIN_POOL_SWAPS = 100_000  # Smaller workloads run in-process; pool start-up would cost more than it saves
+MIN_TASK_SWAPS = 5_000  # Lower bound on swaps per task so per-task overhead stays negligible
+TASKS_PER_WORKER = 4  # Same target as Pool.map's default chunking: ~4 tasks per worker per batch
+
+# Estimated number of swaps the P&L run will analyze (each wallet is capped at limit_per_wallet)
+def estimate_workload(wallets, limit_per_wallet):
+    return sum(min(wallet["num_swaps"], limit_per_wallet) for wallet in wallets)
+
+# Copy a SwapColumns batch into one shared-memory segment.
+# Returns (segment, layout) where layout is [(field, dtype, offset, length), ...].
+def columns_to_shared_memory(columns):
+    layout = []
+    offset = 0
+    for field in COLUMN_FIELDS:
+        array = getattr(columns, field)
+        offset = -(-offset // 8) * 8  # Keep every column 8-byte aligned
+        layout.append((field, array.dtype.str, offset, len(array)))
+        offset += array.nbytes
+    segment = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for field, dtype, field_offset, length in layout:
+        np.ndarray(length, dtype=dtype, buffer=segment.buf, offset=field_offset)[:] = getattr(columns, field)
+    return segment, layout
+
+# Split a batch into tasks of whole wallets holding roughly `target_swaps` swaps each.
+# Columns are in wallet order, so every task is one contiguous row range.
+# Returns [(row_start, row_end, wallet_start, wallet_end), ...].
+def plan_tasks(wallet_idx, num_wallets, target_swaps):
+    wallet_rows = np.searchsorted(wallet_idx, np.arange(num_wallets + 1))
+    tasks = []
+    wallet_start = 0
+    while wallet_start < num_wallets:
+        wallet_end = int(np.searchsorted(wallet_rows, wallet_rows[wallet_start] + target_swaps, side="right")) - 1
+        wallet_end = min(max(wallet_end, wallet_start + 1), num_wallets)
+        tasks.append((int(wallet_rows[wallet_start]), int(wallet_rows[wallet_end]), wallet_start, wallet_end))
+        wallet_start = wallet_end
+    return tasks
+
+# Worker: run the columnar engine on one task's rows, read directly from shared memory.
+# Returns (segment name, wallet_start, pnl_figures() of the task's wallets).
+def analyze_shared_slice(task):
+    segment_name, layout, row_start, row_end, wallet_start, wallet_end = task
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        arrays = {field: np.ndarray(length, dtype=dtype, buffer=segment.buf, offset=offset)[row_start:row_end]
+                  for field, dtype, offset, length in layout}
+        arrays["wallet_idx"] = arrays["wallet_idx"] - wallet_start
+        columns = SwapColumns(*(arrays[field] for field in COLUMN_FIELDS))
+        figures = pnl_figures(wallet_end - wallet_start, columns)
+        del arrays, columns  # Drop the views into the segment before closing it
+    finally:
+        segment.close()
+    return segment_name, wallet_start, figures
+
+# Results in the order of `wallets`. Wallets that no batch delivered (no swaps in the window)
+# get the engine's result for an empty history.
+def ordered_results(wallets, results_by_address):
+    missing = [wallet for wallet in wallets if wallet["source_account"] not in results_by_address]
+    if missing:
+        addresses = [wallet["source_account"] for wallet in missing]
+        for result in estimate_pnl_columnar(missing, swaps_to_columns(addresses, {})):
+            results_by_address[result["source_account"]] = result
+    return [results_by_address[wallet["source_account"]] for wallet in wallets]
+
+# Analyze P&L for `wallets` from a stream of (batch_wallets, swaps_by_wallet) batches.
+# Workloads under MIN_POOL_SWAPS (or a single CPU) run in-process on the same engine.
+# Returns results in the order of `wallets`, like estimate_pnl_columnar.
+def analyze_wallet_batches(wallets, swap_batches, limit_per_wallet=200, processes=None):
+    wallets_by_address = {wallet["source_account"]: wallet for wallet in wallets}
+    processes = processes or cpu_count()
+    workload = estimate_workload(wallets, limit_per_wallet)
+    results_by_address = {}
+
+    if processes < 2 or workload < MIN_POOL_SWAPS:
+        print(f"Analyzing ~{workload} swaps in-process...")
+        for batch_wallets, swaps_by_wallet in swap_batches:
+            batch = [wallets_by_address[address] for address in batch_wallets]
+            for result in estimate_pnl_columnar(batch, swaps_to_columns(batch_wallets, swaps_by_wallet)):
+                results_by_address[result["source_account"]] = result
+        return ordered_results(wallets, results_by_address)
+
+    processes = min(processes, max(1, workload // MIN_TASK_SWAPS))
+    print(f"Analyzing ~{workload} swaps on {processes} worker processes...")
+    segments = {}  # segment name -> [SharedMemory, tasks still running, batch wallets]
+    segments_lock = threading.Lock()
+
+    # Runs in the pool's task-feeder thread: fetch, convert and publish one batch at a time
+    def task_stream():
+        for batch_wallets, swaps_by_wallet in swap_batches:
+            batch = [wallets_by_address[address] for address in batch_wallets]
+            columns = swaps_to_columns(batch_wallets, swaps_by_wallet)
+            del swaps_by_wallet  # The segment is now the only copy the workers need
+            segment, layout = columns_to_shared_memory(columns)
+            target_swaps = max(MIN_TASK_SWAPS, -(-len(columns) // (processes * TASKS_PER_WORKER)))
+            tasks = plan_tasks(columns.wallet_idx, len(batch), target_swaps)
+            with segments_lock:
+                segments[segment.name] = [segment, len(tasks), batch]
+            for row_start, row_end, wallet_start, wallet_end in tasks:
+                yield (segment.name, layout, row_start, row_end, wallet_start, wallet_end)
+
+    # Start the tracker before the forkserver so workers attaching to segments share it with us
+    resource_tracker.ensure_running()
+    try:
+        with POOL_CONTEXT.Pool(processes=processes) as pool:
+            for segment_name, wallet_start, figures in pool.imap_unordered(analyze_shared_slice, task_stream()):
+                # Free each batch's segment as soon as its last task is back
+                with segments_lock:
+                    entry = segments[segment_name]
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del segments[segment_name]
+                        entry[0].close()
+                        entry[0].unlink()
+                batch = entry[2][wallet_start:wallet_start + len(figures)]
+                for result in pnl_records(batch, figures):
+                    results_by_address[result["source_account"]] = result
+    finally:
+        for segment, _, _ in segments.values():
+            segment.close()
+            segment.unlink()
+    return ordered_results(wallets, results_by_address)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import numpy as np
+from aiohttp import web
+
+# Paginated JSON API over the ranking data served by the web app.
+# Every sortable column of every table gets its row order precomputed once per data version
+# (see Dataset in data_loader.py), so a request only filters and slices an index:
+#   /api/<table>?sort=<column>&order=asc|desc&offset=0&limit=50&min_<column>=..&max_<column>=..
+#   /api/domain_rankings/<domain>?...  (one ranked domain, same columns as domain_rankings)
+#   /api/domains  (the ranked domains with their wallet and swap counts)
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+CANDIDATE_COLUMNS = {
+    "source_account": "text",
+    "net_xlm_change": "number",
+    "num_swaps": "number",
+    "total_volume_xlm": "number",
+    "per_swap_profit": "number",
+    "daily_swaps": "number",
+    "pair_diversity": "number",
+    "asset_pairs": "text",
+    "score": "number",
+    "risk_level": "text",
+    "trade_type": "text",
+}
+
+# API table name -> (Dataset attribute, sortable columns {column: "number" | "text"})
+TABLES = {
+    "copy_trade_candidates": ("all_candidates", CANDIDATE_COLUMNS),
+    "domain_copy_trade_candidates": ("domain_copy_trade_all", CANDIDATE_COLUMNS),
+    "network_rankings": ("network_rankings", {
+        "source_account": "text",
+        "num_swaps": "number",
+        "total_volume_xlm": "number",
+    }),
+    "domain_rankings": ("domain_rankings", {
+        "source_account": "text",
+        "num_swaps": "number",
+        "xlm_inflows": "number",
+        "xlm_outflows": "number",
+        "net_xlm_flow": "number",
+    }),
+}
+
+# Shorthand filter names accepted in addition to min_<column> / max_<column>
+FILTER_ALIASES = {"min_swaps": "min_num_swaps", "max_swaps": "max_num_swaps"}
+
+# Numeric value of a cell for sorting and filtering; missing or non-numeric cells are NaN
+def as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+# Case-insensitive text value of a cell for sorting; lists (asset_pairs) sort by their joined text
+def as_text(value):
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    return "" if value is None else str(value).lower()
+
+# One table's rows with an ascending and a descending row order per sortable column.
+# Missing values sort last in both directions; ties keep the published order.
+class TableIndex:
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.values = {}  # Numeric column -> float array, for range filters
+        self.orders = {}  # (column, "asc" | "desc") -> array of row positions
+        for column, kind in columns.items():
+            if kind == "number":
+                values = np.array([as_number(row.get(column)) for row in rows], dtype=float)
+                self.values[column] = values
+                self.orders[(column, "asc")] = np.argsort(values, kind="stable")
+                self.orders[(column, "desc")] = np.argsort(-values, kind="stable")
+            else:
+                keys = [(row.get(column) is None, as_text(row.get(column))) for row in rows]
+                ascending = sorted(range(len(rows)), key=keys.__getitem__)
+                descending = sorted(range(len(rows)), key=lambda i: (not keys[i][0], keys[i][1]), reverse=True)
+                self.orders[(column, "asc")] = np.array(ascending, dtype=np.intp)
+                self.orders[(column, "desc")] = np.array(descending, dtype=np.intp)
+
+    # Rows matching every (column, low, high) range filter in the requested order;
+    # returns (total matching rows, rows[offset:offset + limit])
+    def page(self, sort=None, order="desc", offset=0, limit=DEFAULT_LIMIT, filters=()):
+        positions = self.orders[(sort, order)] if sort else np.arange(len(self.rows))
+        if filters:
+            mask = np.ones(len(self.rows), dtype=bool)
+            for column, low, high in filters:
+                values = self.values[column]
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            positions = positions[mask[positions]]
+        return len(positions), [self.rows[i] for i in positions[offset:offset + limit]]
+
+# Build the TableIndex of every API table from a Dataset
+def build_table_indexes(dataset):
+    return {name: TableIndex(getattr(dataset, attribute), columns) for name, (attribute, columns) in TABLES.items()}
+
+# Build the TableIndex of every ranked domain from a Dataset
+def build_domain_table_indexes(dataset):
+    columns = TABLES["domain_rankings"][1]
+    return {domain: TableIndex(rows, columns) for domain, rows in dataset.domain_rankings_by_domain.items()}
+
+# Validate API query parameters against a table's columns; raises ValueError with a message
+# fit for the client
+def parse_page_query(query, columns):
+    sort = query.get("sort") or None
+    if sort is not None and sort not in columns:
+        raise ValueError(f"cannot sort by {sort!r}; sortable columns: {', '.join(columns)}")
+    order = query.get("order", "desc" if sort and columns[sort] == "number" else "asc")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    try:
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"offset must be >= 0 and limit between 1 and {MAX_LIMIT}")
+
+    bounds = {}
+    for name, value in query.items():
+        name = FILTER_ALIASES.get(name, name)
+        bound, _, column = name.partition("_")
+        if bound not in ("min", "max") or not column:
+            continue
+        if columns.get(column) != "number":
+            raise ValueError(f"cannot filter on {column!r}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number")
+        low, high = bounds.get(column, (None, None))
+        bounds[column] = (number, high) if bound == "min" else (low, number)
+    filters = [(column, low, high) for column, (low, high) in bounds.items()]
+    return sort, order, offset, limit, filters
+
+# JSON response for a data version with ETag revalidation: the ETag combines the version and
+# the request path and query, so a client re-requesting unchanged data gets a 304. body() is
+# only called when the body is actually sent.
+def cached_json_response(request, version, body):
+    query_hash = hashlib.sha1(request.path_qs.encode()).hexdigest()[:12]
+    etag = f"{version}-{query_hash}"
+    if request.if_none_match is not None and any(tag.value in (etag, "*") for tag in request.if_none_match):
+        response = web.Response(status=304)
+    else:
+        response = web.json_response(body(), dumps=lambda data: json.dumps(data, default=str))
+        response.enable_compression()
+    response.etag = etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+# JSON page of one TableIndex
+def page_response(request, version, index, columns):
+    try:
+        sort, order, offset, limit, filters = parse_page_query(request.query, columns)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": str(e)}), content_type="application/json")
+
+    def body():
+        total, rows = index.page(sort, order, offset, limit, filters)
+        return {"version": version, "columns": columns, "sort": sort, "order": order, "total": total,
+                "offset": offset, "limit": limit, "rows": rows}
+    return cached_json_response(request, version, body)
+
+# JSON page of one table from a Dataset
+def api_response(request, dataset, table):
+    return page_response(request, dataset.version, dataset.tables[table], TABLES[table][1])
+
+# JSON page of one ranked domain's wallet rankings; 404 for domains that are not ranked
+def domain_api_response(request, dataset, domain):
+    index = dataset.domain_tables.get(domain)
+    if index is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": f"domain {domain!r} is not ranked"}),
+                               content_type="application/json")
+    return page_response(request, dataset.version, index, TABLES["domain_rankings"][1])
+
+# The ranked domains, most active wallets first
+def domains_response(request, dataset):
+    def body():
+        domains = [{"domain": domain, "wallets": len(rows), "num_swaps": sum(row["num_swaps"] for row in rows)}
+                   for domain, rows in dataset.domain_rankings_by_domain.items()]
+        domains.sort(key=lambda entry: (-entry["wallets"], entry["domain"]))
+        return {"version": dataset.version, "domains": domains}
+    return cached_json_response(request, dataset.version, body)
@@ -0,0 +1,91 @@
+import asyncio
+import gzip
+import hashlib
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:  # Optional: without it pages are served gzip-compressed only
+    brotli = None
+
+# Render cache for the web app pages.
+# The pages are static shells that load their data from the JSON API, so each route is rendered
+# once per process, in a worker thread, and kept with gzip and brotli encodings prepared up
+# front. Responses carry ETag/Last-Modified validators and conditional requests get 304s.
+# Concurrent first requests for a page all wait on the same render instead of starting their own.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# One rendered page with its precompressed encodings and validators. Each encoding is a
+# different representation of the page, so each gets its own strong ETag.
+class RenderedPage:
+    def __init__(self, html, last_modified):
+        self.body = html.encode("utf-8")
+        self.encoded = {"identity": self.body, "gzip": gzip.compress(self.body, compresslevel=GZIP_LEVEL)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+        digest = hashlib.sha1(self.body).hexdigest()[:20]
+        self.etags = {encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+                      for encoding in self.encoded}
+        self.last_modified = last_modified.replace(microsecond=0)
+
+# Content codings the client accepts (q > 0) from an Accept-Encoding header
+def accepted_encodings(header):
+    encodings = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+class RenderCache:
+    def __init__(self):
+        self.pages = {}  # route -> RenderedPage
+        self.renders = {}  # route -> in-flight render task
+
+    # Rendered page for route; render() builds the HTML and runs in a worker thread
+    async def get(self, route, last_modified, render):
+        page = self.pages.get(route)
+        if page is not None:
+            return page
+
+        task = self.renders.get(route)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(lambda: RenderedPage(render(), last_modified)))
+            self.renders[route] = task
+            task.add_done_callback(lambda _: self.renders.pop(route, None))
+        # Shielded so one client disconnecting does not cancel the render the others wait on
+        page = await asyncio.shield(task)
+        self.pages[route] = page
+        return page
+
+    # Serve route as an HTML response in the best precompressed encoding the client accepts, or
+    # a 304 when the client's copy of that encoding is current
+    async def respond(self, request, route, last_modified, render):
+        page = await self.get(route, last_modified, render)
+        encodings = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding = next((name for name in ("br", "gzip") if name in encodings and name in page.encoded), "identity")
+        etag = page.etags[encoding]
+
+        if request.if_none_match is not None:
+            not_modified = any(candidate.value in (etag, "*") for candidate in request.if_none_match)
+        else:
+            not_modified = request.if_modified_since is not None and request.if_modified_since >= page.last_modified
+        if not_modified:
+            response = web.Response(status=304)
+        else:
+            response = web.Response(body=page.encoded[encoding], content_type="text/html", charset="utf-8")
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.etag = etag
+        response.last_modified = page.last_modified
+        response.headers["Cache-Control"] = "no-cache"  # Always revalidate; a new deploy changes the pages
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -1,26 +1,13 @@
 import psycopg
-
-# Your database credentials
-db_params = {
-    'dbname': 'horizon',
-    'user': 'stellar',
-    'password': 'new_stellar_pass',
-    'host': 'horizon.cz2imkksk7b4.us-west-1.rds.amazonaws.com',
-    'port': '5434'
-}
+from horizon_db import run_query
 
 try:
-    # Connect to the database
-    conn = psycopg.connect(**db_params)
-    cur = conn.cursor()
-
     # Query to list all tables in the public schema
-    cur.execute("""
+    tables = run_query("""
         SELECT table_name 
         FROM information_schema.tables 
         WHERE table_schema = 'public';
     """)
-    tables = cur.fetchall()
 
     # Print the list of tables
     print("Tables in your Horizon database:")
@@ -29,8 +16,3 @@ try:
 
 except psycopg.Error as e:
     print(f"Database connection error: {e}")
-finally:
-    if 'cur' in locals():
-        cur.close()
-    if 'conn' in locals():
-        conn.close()
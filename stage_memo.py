@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+from swap_cache import evict_lru
+
+# Content-addressed memoization of pipeline stage outputs.
+# A stage's key is a hash of everything its output depends on (input data, parameters, the
+# source of the code that computes it); outputs are stored as JSON under
+# stage_memo/<stage>/<key>.json and the directory is kept under MAX_MEMO_BYTES by LRU eviction.
+MEMO_DIR = "stage_memo"
+MAX_MEMO_BYTES = 256 * 1024 ** 2  # Evict least recently used outputs beyond 256 MB
+
+MISSING = object()  # StageMemo.get() result when nothing is stored under a key
+
+# Stable SHA-256 of JSON-serializable parts (dict key order does not matter)
+def content_hash(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Hash of source files, so editing a stage's code invalidates its memoized outputs
+def code_version(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+# Size-bounded store of stage outputs keyed by (stage name, content hash)
+class StageMemo:
+    def __init__(self, root=MEMO_DIR, max_bytes=MAX_MEMO_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _path(self, stage, key):
+        return os.path.join(self.root, stage, f"{key}.json")
+
+    # Stored output for key, or MISSING
+    def get(self, stage, key):
+        path = self._path(stage, key)
+        try:
+            with open(path, "r") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return MISSING
+        os.utime(path)  # Mark as recently used for eviction
+        return value
+
+    # Store an output atomically, then enforce the size limit
+    def put(self, stage, key, value):
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+        evict_lru(self.root, self.max_bytes)
+
+    # Return the stored output for key, computing and storing it on a miss.
+    # Hits come back JSON-decoded, so compute() should return JSON-shaped data.
+    def memoize(self, stage, key, compute):
+        value = self.get(stage, key)
+        if value is not MISSING:
+            print(f"[memo] {stage}: inputs unchanged, reusing stored output")
+            return value
+        value = compute()
+        self.put(stage, key, value)
+        return value
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import quote
+import aiohttp
+import toml
+
+# Domain asset resolution: the live CURRENCIES of each domain's stellar.toml.
+# All domains are fetched concurrently on one session, each request under its own timeout, so a
+# slow or dead host only costs its own entry. Parsed results are cached on disk per domain
+# (toml_cache/<domain>.json): entries younger than CACHE_TTL_SECS are used without a request,
+# older ones are revalidated with If-None-Match / If-Modified-Since (a 304 only renews the
+# entry), and when a refresh fails the stale entry is used rather than dropping the domain.
+TOML_URL = "https://{domain}/.well-known/stellar.toml"
+CACHE_DIR = "toml_cache"
+CACHE_TTL_SECS = 6 * 3600  # Issuers rarely change CURRENCIES; revalidate a few times a day
+HOST_TIMEOUT_SECS = 10  # Per-domain limit for connecting to the host and reading its stellar.toml
+MAX_CONCURRENT_FETCHES = 32  # Requests in flight across all hosts
+
+# Live (code, issuer) pairs from the CURRENCIES of a stellar.toml document
+def parse_currencies(text):
+    toml_content = toml.loads(text)
+    assets = []
+    for currency in toml_content.get("CURRENCIES", []):
+        if "code" in currency and "issuer" in currency and currency.get("status") == "live":
+            assets.append((currency["code"], currency["issuer"]))
+    return assets
+
+# On-disk cache of parsed CURRENCIES, one JSON entry per domain:
+# {"fetched_at": unix time, "etag": ..., "last_modified": ..., "assets": [[code, issuer], ...]}
+class TomlCache:
+    def __init__(self, root=CACHE_DIR, ttl_secs=CACHE_TTL_SECS):
+        self.root = root
+        self.ttl_secs = ttl_secs
+
+    def _path(self, domain):
+        return os.path.join(self.root, f"{quote(domain, safe='')}.json")
+
+    # Cached entry of a domain, or None
+    def get(self, domain):
+        try:
+            with open(self._path(domain)) as f:
+                return json.load(f)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+    # Store an entry atomically
+    def put(self, domain, entry):
+        path = self._path(domain)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl_secs
+
+# Store a refreshed entry; a cache that cannot be written (full disk, read-only directory) only
+# costs the next run a request, so the resolved assets are still used
+def store_entry(cache, domain, entry):
+    try:
+        cache.put(domain, entry)
+    except OSError as e:
+        print(f"Error caching stellar.toml for {domain}: {e}")
+
+# GET one stellar.toml; returns (status, headers, text) where text is None for a 304.
+# Error statuses raise aiohttp.ClientResponseError.
+async def get_document(session, url, headers, timeout_secs):
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout_secs)) as response:
+        if response.status == 304:
+            return response.status, response.headers, None
+        response.raise_for_status()
+        return response.status, response.headers, await response.text()
+
+# Resolve one domain through the cache; returns (assets, outcome) where outcome is "cached",
+# "revalidated", "fetched", "stale" (refresh failed, cached entry used) or "failed".
+# The request waits for one of the `slots` first, so its timeout only runs while it is in flight.
+# A 304 is only trusted when there is a cached entry to renew: otherwise (no validators were
+# sent) the document is requested once more, unconditionally and past any intermediate cache,
+# and a second 304 counts as a failure. Nothing is cached from a 304 without an entry.
+async def resolve_domain(session, slots, cache, domain, url_template=TOML_URL, timeout_secs=HOST_TIMEOUT_SECS):
+    entry = cache.get(domain)
+    if entry is not None and cache.is_fresh(entry):
+        return [tuple(asset) for asset in entry["assets"]], "cached"
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    url = url_template.format(domain=domain)
+    try:
+        async with slots:
+            status, response_headers, text = await get_document(session, url, headers, timeout_secs)
+            if status == 304 and entry is not None:
+                entry["fetched_at"] = time.time()
+                store_entry(cache, domain, entry)
+                return [tuple(asset) for asset in entry["assets"]], "revalidated"
+            if status == 304:
+                status, response_headers, text = await get_document(session, url, {"Cache-Control": "no-cache"},
+                                                                    timeout_secs)
+                if status == 304:
+                    raise aiohttp.ClientError("304 Not Modified without a cached entry")
+        assets = parse_currencies(text)
+        store_entry(cache, domain, {
+            "fetched_at": time.time(),
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "assets": assets,
+        })
+        return assets, "fetched"
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, toml.TomlDecodeError) as e:
+        error = str(e) or type(e).__name__
+        if entry is not None:
+            print(f"Error refreshing stellar.toml for {domain}: {error}; using cached assets")
+            return [tuple(asset) for asset in entry["assets"]], "stale"
+        print(f"Error fetching or parsing stellar.toml for {domain}: {error}")
+        return [], "failed"
+
+# Resolve many domains concurrently; returns {domain: [(code, issuer), ...]} in input order
+async def resolve_domains(domains, cache, url_template=TOML_URL, timeout_secs=HOST_TIMEOUT_SECS,
+                          max_concurrent=MAX_CONCURRENT_FETCHES):
+    domains = list(dict.fromkeys(domains))
+    slots = asyncio.Semaphore(max_concurrent)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_concurrent)) as session:
+        resolved = await asyncio.gather(*(resolve_domain(session, slots, cache, domain, url_template, timeout_secs)
+                                          for domain in domains))
+    outcomes = {}
+    for _, outcome in resolved:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print(f"Resolved assets of {len(domains)} domains "
+          f"({', '.join(f'{count} {outcome}' for outcome, count in outcomes.items()) or 'none'})")
+    return {domain: assets for domain, (assets, _) in zip(domains, resolved)}
+
+# Synchronous entry point: resolve domains on a short-lived event loop
+def resolve_domain_assets(domains, cache=None, url_template=TOML_URL, timeout_secs=HOST_TIMEOUT_SECS):
+    cache = cache or TomlCache()
+    return asyncio.run(resolve_domains(domains, cache, url_template, timeout_secs)) if domains else {}
@@ -0,0 +1,200 @@
+import os
+import threading
+import zipfile
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from dictionary_encoding import decode_column, encode_column
+from window_aggregates import as_utc, hour_number, hour_start
+
+# Local on-disk columnar cache of extracted swap rows, partitioned by hour.
+# Each partition is one .npz file holding typed column arrays (no pickling), stored under
+# swap_cache/<namespace>/<hour number>.npz. Only hours that are fully in the past are cached;
+# the partial hours at both ends of a window are always read from Postgres.
+# Text columns (accounts, asset codes and issuers) are dictionary-encoded per partition: the
+# file stores int32 codes under the column name plus each distinct string once under
+# "<name>_dictionary"; readers map those strings to run-wide ids once per partition (see
+# text_column_ids), so filters such as "rows of these wallets" run on ints.
+CACHE_DIR = "swap_cache"
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # Evict least recently used partitions beyond 2 GB
+EVICT_TO_FRACTION = 0.9  # Evict down to 90% of the limit, so the next writes do not evict again
+SETTLE_TIME = timedelta(minutes=10)  # Give ingestion time to finish an hour before caching it
+
+# Column kinds understood by the cache and their numpy storage dtypes (text columns store codes
+# into a per-partition dictionary, see encode_column)
+COLUMN_DTYPES = {
+    "text": np.int32,
+    "int": np.int64,
+    "float": np.float64,
+    "timestamp": np.int64,  # Microseconds since the Unix epoch (UTC)
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Split [start_time, end_time) into cacheable whole hours and the uncached partial edges.
+# Returns (hours, edges) where edges is a list of (range_start, range_end) datetimes.
+def split_window(start_time, end_time, settle_time=SETTLE_TIME):
+    first_hour = hour_number(start_time)
+    if hour_start(first_hour) < start_time:
+        first_hour += 1
+    last_hour = hour_number(end_time - settle_time)  # Exclusive: this hour may still be filling
+    hours = list(range(first_hour, last_hour)) if last_hour > first_hour else []
+
+    edges = []
+    if not hours:
+        edges.append((start_time, end_time))
+    else:
+        if start_time < hour_start(first_hour):
+            edges.append((start_time, hour_start(first_hour)))
+        edges.append((hour_start(last_hour), end_time))
+    return hours, edges
+
+# Dictionary key of a text column in a partition
+def dictionary_name(name):
+    return f"{name}_dictionary"
+
+# Convert row tuples into typed column arrays according to schema [(name, kind), ...]
+def rows_to_columns(rows, schema):
+    columns = {}
+    for index, (name, kind) in enumerate(schema):
+        values = [row[index] for row in rows]
+        if kind == "text":
+            columns[name], columns[dictionary_name(name)] = encode_column(
+                ["" if value is None else value for value in values])
+            continue
+        elif kind == "timestamp":
+            values = [(as_utc(value) - EPOCH) // timedelta(microseconds=1) for value in values]
+        elif kind == "float":
+            values = [0.0 if value is None else float(value) for value in values]
+        elif kind == "int":
+            values = [0 if value is None else value for value in values]
+        columns[name] = np.array(values, dtype=COLUMN_DTYPES[kind])
+    return columns
+
+# Rows with the timestamp column at `index` converted to aware UTC, so rows fetched through
+# the cursor path compare and sort together with cached and COPY rows
+def rows_with_utc(rows, index):
+    return [row[:index] + (as_utc(row[index]),) + row[index + 1:] for row in rows]
+
+# Run-wide ids (a dictionary_encoding.Dictionary) of a text column's rows. Each distinct string
+# of the partition is looked up once and the ids are gathered through the partition's codes.
+def text_column_ids(columns, name, dictionary):
+    partition_dictionary = columns.get(dictionary_name(name))
+    if partition_dictionary is None:  # Partition written before text columns were dictionary-encoded
+        return dictionary.encode_all(columns[name].tolist())
+    if len(partition_dictionary) == 0:
+        return np.zeros(len(columns[name]), dtype=np.int64)
+    return dictionary.encode_all(partition_dictionary.tolist())[columns[name]]
+
+# Convert typed column arrays back into row tuples (empty strings become None again); `select`
+# is an optional boolean mask of the rows to decode
+def columns_to_rows(columns, schema, select=None):
+    decoded = []
+    for name, kind in schema:
+        values = columns[name] if select is None else columns[name][select]
+        dictionary = columns.get(dictionary_name(name))
+        if kind == "text" and dictionary is not None:
+            values = decode_column(values, dictionary)
+        else:
+            values = values.tolist()
+        if kind == "text":
+            values = [value if value else None for value in values]
+        elif kind == "timestamp":
+            values = [EPOCH + timedelta(microseconds=value) for value in values]
+        decoded.append(values)
+    return list(zip(*decoded))
+
+# Delete the least recently used files under root (by mtime; readers touch what they use)
+# until the directory tree fits in max_bytes; returns the bytes left
+def evict_lru(root, max_bytes):
+    entries = []
+    total_bytes = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+        os.remove(path)
+        total_bytes -= size
+    return total_bytes
+
+# Hour-partitioned columnar cache with size-based LRU eviction.
+# The size of the tree is measured by the first write and then tracked per write, so the tree is
+# only walked again when the cache outgrows max_bytes. The P&L and domain stages share one cache
+# from different threads, so the tracked size is updated under a lock.
+class SwapCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # Not measured yet
+        self.lock = threading.Lock()
+
+    def _path(self, namespace, hour):
+        return os.path.join(self.root, namespace, f"{hour}.npz")
+
+    # Load a partition as a dict of arrays, or None if it is not cached. A truncated or corrupt
+    # partition (e.g. left by a crash or a full disk) is deleted and reported as a miss, so the
+    # hour is fetched and cached again.
+    def get(self, namespace, hour):
+        path = self._path(namespace, hour)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                partition = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile) as e:
+            print(f"Swap cache: dropping unreadable partition {path}: {e}")
+            self._remove(path)
+            return None
+        os.utime(path)  # Mark as recently used for eviction
+        return partition
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes -= size
+
+    # Store a partition atomically, then enforce the size limit
+    def put(self, namespace, hour, arrays):
+        path = self._path(namespace, hour)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        new_size = os.path.getsize(tmp_path)
+        with self.lock:
+            try:
+                old_size = os.path.getsize(path)
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            if self.total_bytes is None:
+                self.total_bytes = evict_lru(self.root, self.max_bytes)
+            else:
+                self.total_bytes += new_size - old_size
+            if self.total_bytes > self.max_bytes:
+                self.total_bytes = evict_lru(self.root, int(self.max_bytes * EVICT_TO_FRACTION))
+
+    # Delete least recently used partitions until the cache fits in max_bytes
+    def evict(self):
+        with self.lock:
+            self.total_bytes = evict_lru(self.root, self.max_bytes)
+
+# Group a sorted list of hours into contiguous (first_hour, last_hour) runs
+def contiguous_runs(hours):
+    runs = []
+    for hour in hours:
+        if runs and runs[-1][1] == hour - 1:
+            runs[-1][1] = hour
+        else:
+            runs.append([hour, hour])
+    return [tuple(run) for run in runs]
+
@@ -0,0 +1,83 @@
+# Compact swap records for the P&L path.
+# A SwapRecord replaces the 10-key swap dict: fixed __slots__ instead of a per-swap dict, and
+# both legs point at shared, interned AssetRef objects instead of repeating code/issuer/type
+# strings. Because every swap of the same asset references the same AssetRef, pickle's memo
+# sends each asset once per task chunk instead of once per swap.
+# Each AssetRef also carries the run-wide dictionary ids of its key and pair labels
+# (dictionary_encoding.py), so the P&L engines group and match on ints.
+from dictionary_encoding import ASSETS, PAIRS
+
+# One asset leg (type, code, issuer) with its derived labels computed once
+class AssetRef:
+    __slots__ = ("asset_type", "code", "issuer", "native", "key", "buy_pair", "sell_pair", "key_id", "buy_pair_id",
+                 "sell_pair_id")
+
+    def __init__(self, asset_type, code, issuer):
+        self.asset_type = asset_type
+        self.native = asset_type == "native"
+        self.code = "XLM" if self.native else code
+        self.issuer = issuer
+        # Same formatting as the original f-strings in estimate_pnl_for_wallet
+        self.key = "XLM" if self.native else f"{self.code}_{issuer}"
+        self.buy_pair = f"XLM/{self.code}"
+        self.sell_pair = f"{self.code}/XLM"
+        # Ids are per process: __reduce__ sends the strings, so a worker interns its own ids
+        self.key_id = ASSETS.encode(self.key)
+        self.buy_pair_id = PAIRS.encode(self.buy_pair)
+        self.sell_pair_id = PAIRS.encode(self.sell_pair)
+
+    def __reduce__(self):
+        return (intern_asset, (self.asset_type, self.code if not self.native else None, self.issuer))
+
+# Process-wide table of interned assets
+_ASSETS = {}
+
+# Return the shared AssetRef for an asset, creating it on first use
+def intern_asset(asset_type, code, issuer):
+    ident = (asset_type, code, issuer)
+    asset = _ASSETS.get(ident)
+    if asset is None:
+        asset = _ASSETS[ident] = AssetRef(asset_type, code, issuer)
+    return asset
+
+# One swap operation: source leg sold, destination leg received
+class SwapRecord:
+    __slots__ = ("type", "source_asset", "source_amount", "asset", "amount", "closed_at")
+
+    def __init__(self, type, source_asset, source_amount, asset, amount, closed_at):
+        self.type = type
+        self.source_asset = source_asset
+        self.source_amount = source_amount
+        self.asset = asset
+        self.amount = amount
+        self.closed_at = closed_at
+
+    def __reduce__(self):
+        return (SwapRecord, (self.type, self.source_asset, self.source_amount, self.asset, self.amount,
+                             self.closed_at))
+
+    def __eq__(self, other):
+        return isinstance(other, SwapRecord) and self.__reduce__()[1] == other.__reduce__()[1]
+
+    def __repr__(self):
+        return (f"SwapRecord(type={self.type}, {self.source_amount} {self.source_asset.key} -> "
+                f"{self.amount} {self.asset.key}, closed_at={self.closed_at})")
+
+# Rebuild a SwapList from the parallel field tuples written by SwapList.__reduce__
+def _swap_list_from_fields(types, source_assets, source_amounts, assets, amounts, closed_ats):
+    return SwapList(map(SwapRecord, types, source_assets, source_amounts, assets, amounts, closed_ats))
+
+# One wallet's swaps. Pickles as six parallel field tuples instead of one reduce call per
+# record, which is what makes shipping SwapRecords to pool workers cheaper than the dicts.
+class SwapList(list):
+    __slots__ = ()
+
+    def __reduce__(self):
+        return (_swap_list_from_fields, (
+            tuple(swap.type for swap in self),
+            tuple(swap.source_asset for swap in self),
+            tuple(swap.source_amount for swap in self),
+            tuple(swap.asset for swap in self),
+            tuple(swap.amount for swap in self),
+            tuple(swap.closed_at for swap in self),
+        ))
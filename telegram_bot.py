@@ -6,7 +6,10 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, W
 from aiohttp import web
 from dotenv import load_dotenv
 import os
-from data_loader import load_data
+from datetime import datetime, timezone
+from data_loader import DataReloader
+from rankings_api import TABLES, api_response, domain_api_response, domains_response
+from render_cache import RenderCache
 from templates import get_copy_trade_template, get_domain_rankings_template, get_meme_trade_template, get_network_rankings_template, get_domain_copy_trade_template, get_landing_page_template
 
 # Load environment variables from .env file
@@ -22,47 +25,75 @@ if not BOT_TOKEN:
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 
-# Load data
-all_candidates, domain_rankings, network_rankings, domain_copy_trade_all = load_data()
+# Load data; the reloader swaps in new data when the pipeline publishes fresh files
+reloader = DataReloader()
+
+# Pages are rendered once and served precompressed with ETags; their rows come from the
+# paginated JSON API, which reads the current dataset
+render_cache = RenderCache()
+STARTED_AT = datetime.now(timezone.utc)
+
+# Serve a page whose HTML does not depend on the data
+async def serve_page(request, route, render):
+    return await render_cache.respond(request, route, STARTED_AT, render)
 
 # Web app route for copy trade candidates
 async def serve_webapp(request):
-    html = get_copy_trade_template(all_candidates)
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "webapp", get_copy_trade_template)
 
-# Web app route for domain wallet rankings
+# Web app route for domain wallet rankings, all ranked domains combined
 async def serve_domain_rankings(request):
-    html = get_domain_rankings_template(domain_rankings)
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "domain_rankings", get_domain_rankings_template)
+
+# Web app route for the wallet rankings of one domain; the page reads the domain from its URL
+async def serve_domain_rankings_for(request):
+    if request.match_info["domain"] not in reloader.dataset.domain_tables:
+        raise web.HTTPNotFound()
+    return await serve_page(request, "domain_rankings", get_domain_rankings_template)
 
 # Web app route for meme trade candidates (using domain_copy_trade_all)
 async def serve_meme_trade_candidates(request):
-    html = get_meme_trade_template(domain_copy_trade_all)
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "meme_trade_candidates", get_meme_trade_template)
 
 # Web app route for network-wide wallet rankings
 async def serve_network_rankings(request):
-    html = get_network_rankings_template(network_rankings)
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "network_rankings", get_network_rankings_template)
 
 # Web app route for domain-specific copy trade candidates
 async def serve_domain_copy_trade(request):
-    html = get_domain_copy_trade_template(domain_copy_trade_all)
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "domain_copy_trade", get_domain_copy_trade_template)
 
 # Landing page for selecting rankings
 async def serve_landing_page(request):
-    html = get_landing_page_template()
-    return web.Response(text=html, content_type='text/html')
+    return await serve_page(request, "landing", get_landing_page_template)
+
+# JSON API: one sorted, filtered page of a ranking table (see rankings_api.py)
+async def serve_api(request):
+    table = request.match_info["table"]
+    if table not in TABLES:
+        raise web.HTTPNotFound()
+    return api_response(request, reloader.dataset, table)
+
+# JSON API: one page of a single domain's wallet rankings
+async def serve_domain_api(request):
+    return domain_api_response(request, reloader.dataset, request.match_info["domain"])
+
+# JSON API: the ranked domains
+async def serve_domains_api(request):
+    return domains_response(request, reloader.dataset)
 
 # Set up aiohttp web server
 app = web.Application()
 app.router.add_get('/', serve_landing_page)
 app.router.add_get('/webapp', serve_webapp)
 app.router.add_get('/domain_rankings', serve_domain_rankings)
+app.router.add_get('/domain_rankings/{domain}', serve_domain_rankings_for)
 app.router.add_get('/meme_trade_candidates', serve_meme_trade_candidates)
 app.router.add_get('/network_rankings', serve_network_rankings)
 app.router.add_get('/domain_copy_trade', serve_domain_copy_trade)
+app.router.add_get('/api/domains', serve_domains_api)
+app.router.add_get('/api/domain_rankings/{domain}', serve_domain_api)
+app.router.add_get('/api/{table}', serve_api)
 
 async def start_web_server():
     runner = web.AppRunner(app)
@@ -80,8 +111,9 @@ async def start_command(message: Message):
 
 # Main function to run both the bot and the web server
 async def main():
-    # Start the web server in a separate task
+    # Start the web server and the data file watcher in separate tasks
     asyncio.create_task(start_web_server())
+    reloader.start()
     
     # Start the bot polling
     await dp.start_polling(bot)
@@ -1,55 +1,50 @@
-import json
-
-def get_copy_trade_template(all_candidates):
-    return f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Copy Trade Candidates - LumenBro</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            ::-webkit-scrollbar {{
+# Shared table component inlined into each table page (see rankings_api.py for the API).
+# virtualTable() keeps the rows it has fetched in a column model (numeric columns in
+# Float64Arrays, the display order in a Uint32Array) and only renders the rows in and near the
+# viewport, with spacer rows standing in for the rest. Rows are fetched a page at a time as the
+# user scrolls. Header clicks sort the model in place once every row is loaded and ask the
+# server for a sorted first page otherwise; [data-filter] inputs always re-query the server.
+TABLE_STYLE = """
+            ::-webkit-scrollbar {
                 width: 8px;
                 height: 8px;
-            }}
-            ::-webkit-scrollbar-track {{
+            }
+            ::-webkit-scrollbar-track {
                 background: #f1f1f1;
-            }}
-            ::-webkit-scrollbar-thumb {{
+            }
+            ::-webkit-scrollbar-thumb {
                 background: #4CAF50;
                 border-radius: 4px;
-            }}
-            ::-webkit-scrollbar-thumb:hover {{
+            }
+            ::-webkit-scrollbar-thumb:hover {
                 background: #45a049;
-            }}
-            .truncate {{
+            }
+            .truncate {
                 white-space: nowrap;
                 overflow: hidden;
                 text-overflow: ellipsis;
                 cursor: pointer;
-            }}
-            .expanded {{
+            }
+            .expanded {
                 white-space: normal;
                 overflow: visible;
                 text-overflow: clip;
-            }}
-            th, td {{
+            }
+            th, td {
                 padding: 8px 12px;
                 font-size: 0.875rem;
                 word-break: break-word;
-            }}
-            @media (max-width: 640px) {{
-                .hide-on-mobile {{
+            }
+            @media (max-width: 640px) {
+                .hide-on-mobile {
                     display: none;
-                }}
-                th, td {{
+                }
+                th, td {
                     padding: 6px 8px;
                     font-size: 0.75rem;
-                }}
-            }}
-            .copy-button {{
+                }
+            }
+            .copy-button {
                 margin-left: 8px;
                 padding: 2px 8px;
                 background-color: #4CAF50;
@@ -57,15 +52,224 @@ def get_copy_trade_template(all_candidates):
                 border-radius: 4px;
                 cursor: pointer;
                 font-size: 0.75rem;
-            }}
-            .copy-button:hover {{
+            }
+            .copy-button:hover {
                 background-color: #45a049;
-            }}
-        </style>
+            }
+            th.sort-asc::after {
+                content: " \\25B2";
+            }
+            th.sort-desc::after {
+                content: " \\25BC";
+            }
+            tr.spacer td {
+                padding: 0;
+                border: 0;
+            }
+"""
+
+TABLE_SCRIPT = """
+            function virtualTable(options) {
+                const pageSize = options.pageSize || 200;
+                const overscan = 10;  // Rows rendered beyond each edge of the viewport
+                const tbody = options.tbody;
+                const headers = tbody.closest('table').querySelectorAll('th');
+                const status = document.createElement('div');
+                status.className = 'py-4 text-center text-xs text-gray-500';
+                tbody.closest('table').parentNode.after(status);
+
+                let model, query, rowHeight = 40, rendered = null, frame = null;
+
+                // Empty model for one server query (sort, order and filters)
+                function resetModel() {
+                    model = {rows: [], numbers: {}, texts: {}, columns: null, order: new Uint32Array(0), total: null,
+                             loading: false, generation: model ? model.generation + 1 : 0};
+                    rendered = null;
+                }
+
+                function grow(array, size) {
+                    if (array.length >= size) return array;
+                    const grown = new array.constructor(Math.max(size, array.length * 2));
+                    grown.set(array);
+                    return grown;
+                }
+
+                function textKey(value) {
+                    if (Array.isArray(value)) value = value.join(', ');
+                    return value == null ? null : String(value).toLowerCase();
+                }
+
+                // Append a fetched page to the model; rows stay in the order the server sent them
+                function appendRows(page) {
+                    model.columns = page.columns;
+                    const start = model.rows.length, end = start + page.rows.length;
+                    model.order = grow(model.order, end);
+                    page.rows.forEach((row, i) => {
+                        model.rows.push(row);
+                        model.order[start + i] = start + i;
+                    });
+                    for (const [column, kind] of Object.entries(page.columns)) {
+                        if (kind === 'number') {
+                            const values = model.numbers[column] = grow(model.numbers[column] || new Float64Array(0), end);
+                            page.rows.forEach((row, i) => { values[start + i] = row[column] == null ? NaN : Number(row[column]); });
+                        } else {
+                            const values = model.texts[column] = model.texts[column] || [];
+                            page.rows.forEach(row => values.push(textKey(row[column])));
+                        }
+                    }
+                    model.total = page.total;
+                }
+
+                // Sort the loaded rows by reordering the index array; missing values go last
+                function sortModel(column, order) {
+                    const direction = order === 'desc' ? -1 : 1;
+                    const numbers = model.numbers[column], texts = model.texts[column];
+                    model.order.subarray(0, model.rows.length).sort((a, b) => {
+                        const x = numbers ? numbers[a] : texts[a], y = numbers ? numbers[b] : texts[b];
+                        const xMissing = numbers ? isNaN(x) : x === null, yMissing = numbers ? isNaN(y) : y === null;
+                        if (xMissing || yMissing) return (xMissing - yMissing) || a - b;
+                        const compared = numbers ? x - y : (x < y ? -1 : x > y ? 1 : 0);
+                        return compared * direction || a - b;
+                    });
+                }
+
+                function queryUrl(offset) {
+                    const params = new URLSearchParams({offset, limit: pageSize});
+                    if (query.sort) params.set('sort', query.sort);
+                    if (query.sort && query.order) params.set('order', query.order);
+                    for (const [name, value] of Object.entries(query.filters)) params.set(name, value);
+                    return `${options.api}?${params}`;
+                }
+
+                async function loadMore() {
+                    if (model.loading || (model.total !== null && model.rows.length >= model.total)) return;
+                    const generation = model.generation;
+                    model.loading = true;
+                    status.textContent = 'Loading...';
+                    try {
+                        const response = await fetch(queryUrl(model.rows.length));
+                        const page = await response.json();
+                        if (generation !== model.generation) return;  // A newer sort or filter took over
+                        if (!response.ok) throw new Error(page.error || response.statusText);
+                        query.order = page.order;
+                        appendRows(page);
+                        markSortedHeader();
+                        model.loading = false;
+                        rendered = null;
+                        render();
+                    } catch (error) {
+                        if (generation === model.generation) {
+                            model.loading = false;
+                            status.textContent = `Could not load rows: ${error.message}`;
+                        }
+                    }
+                }
+
+                function markSortedHeader() {
+                    headers.forEach(th => {
+                        th.classList.remove('sort-asc', 'sort-desc');
+                        if (th.dataset.sort && th.dataset.sort === query.sort) th.classList.add(`sort-${query.order}`);
+                    });
+                }
+
+                function spacer(height) {
+                    return height > 0 ? `<tr class="spacer" style="height: ${height}px"><td colspan="${headers.length}"></td></tr>` : '';
+                }
+
+                // Render only the rows in and near the viewport
+                function render() {
+                    frame = null;
+                    const count = model.rows.length;
+                    const top = tbody.getBoundingClientRect().top;
+                    const first = Math.max(0, Math.min(count, Math.floor(-top / rowHeight) - overscan));
+                    const last = Math.min(count, first + Math.ceil(window.innerHeight / rowHeight) + 2 * overscan);
+                    if (!rendered || rendered[0] !== first || rendered[1] !== last) {
+                        let html = spacer(first * rowHeight);
+                        for (let i = first; i < last; i++) {
+                            html += `<tr class="border-t border-gray-200 hover:bg-gray-50">${options.renderRow(model.rows[model.order[i]])}</tr>`;
+                        }
+                        tbody.innerHTML = html + spacer((count - last) * rowHeight);
+                        rendered = [first, last];
+                        // Rows can wrap, so keep the spacer height at the measured average row height
+                        const rows = tbody.querySelectorAll('tr:not(.spacer)');
+                        if (rows.length) {
+                            const measured = (rows[rows.length - 1].getBoundingClientRect().bottom - rows[0].getBoundingClientRect().top) / rows.length;
+                            if (measured > 0 && Math.abs(measured - rowHeight) > 1) {
+                                rowHeight = measured;
+                                rendered = null;
+                                scheduleRender();
+                            }
+                        }
+                    }
+                    if (model.total !== null) {
+                        status.textContent = model.rows.length < model.total ? `${model.rows.length} of ${model.total} rows loaded` : `${model.total} rows`;
+                    }
+                    if (last + overscan >= count) loadMore();
+                }
+
+                function scheduleRender() {
+                    if (frame === null) frame = requestAnimationFrame(render);
+                }
+
+                function requery() {
+                    resetModel();
+                    tbody.innerHTML = '';
+                    loadMore();
+                }
+
+                headers.forEach(header => {
+                    if (!header.dataset.sort) return;
+                    header.addEventListener('click', () => {
+                        const column = header.dataset.sort;
+                        if (query.sort === column) {
+                            query.order = query.order === 'desc' ? 'asc' : 'desc';
+                        } else {
+                            // First click on a column: numbers descending, text ascending
+                            query.sort = column;
+                            query.order = model.columns ? (model.columns[column] === 'number' ? 'desc' : 'asc') : null;
+                        }
+                        if (model.total !== null && model.rows.length >= model.total) {
+                            sortModel(query.sort, query.order);
+                            markSortedHeader();
+                            rendered = null;
+                            render();
+                        } else {
+                            requery();
+                        }
+                    });
+                });
+                document.querySelectorAll('[data-filter]').forEach(input => input.addEventListener('change', () => {
+                    query.filters = {};
+                    document.querySelectorAll('[data-filter]').forEach(field => {
+                        if (field.value !== '') query.filters[field.dataset.filter] = field.value;
+                    });
+                    requery();
+                }));
+                window.addEventListener('scroll', scheduleRender, {passive: true});
+                window.addEventListener('resize', scheduleRender);
+
+                query = {sort: null, order: null, filters: {}};
+                requery();
+            }
+"""
+
+def get_copy_trade_template():
+    return f"""
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Copy Trade Candidates - LumenBro</title>
+        <script src="https://cdn.tailwindcss.com"></script>
+        <style>{TABLE_STYLE}        </style>
     </head>
     <body class="bg-gray-100 font-sans">
         <div class="container mx-auto px-4 py-6">
             <h1 class="text-2xl font-bold text-center text-gray-800 mb-6">Copy Trade Candidates</h1>
+            <div class="flex justify-end mb-3">
+                <input type="number" min="0" data-filter="min_num_swaps" placeholder="Min swaps" class="w-32 py-1 px-2 text-xs border border-gray-300 rounded">
+            </div>
             <div class="overflow-x-auto shadow-lg rounded-lg">
                 <table id="candidates-table" class="min-w-full bg-white border border-gray-200">
                     <thead>
@@ -90,12 +294,13 @@ def get_copy_trade_template(all_candidates):
         </div>
 
         <script>
-            const candidates = {json.dumps(all_candidates)};
-            const tbody = document.getElementById('candidates-body');
-            candidates.forEach(candidate => {{
-                const row = document.createElement('tr');
-                row.className = 'border-t border-gray-200 hover:bg-gray-50';
-                row.innerHTML = `
+            {TABLE_SCRIPT}
+
+            virtualTable({{
+                api: '/api/copy_trade_candidates',
+                tbody: document.getElementById('candidates-body'),
+                renderRow: candidate => {{
+                    return `
                     <td class="py-2 px-3 text-xs truncate max-w-[150px]">
                         <span onclick="this.classList.toggle('expanded')">${{candidate.source_account}}</span>
                         <button class="copy-button" onclick="navigator.clipboard.writeText('${{candidate.source_account}}').then(() => alert('Copied to clipboard!'))">Copy</button>
@@ -112,56 +317,14 @@ def get_copy_trade_template(all_candidates):
                     <td class="py-2 px-3 text-xs hide-on-mobile">${{candidate.trade_type}}</td>
                     <td class="py-2 px-3 text-xs">${{candidate.recommendation}}</td>
                 `;
-                tbody.appendChild(row);
-            }});
-
-            document.querySelectorAll('th').forEach(header => {{
-                header.addEventListener('click', () => {{
-                    const table = header.closest('table');
-                    const tbody = table.querySelector('tbody');
-                    const rows = Array.from(tbody.querySelectorAll('tr'));
-                    const sortKey = header.getAttribute('data-sort');
-                    const isNumeric = ['net_xlm_change', 'num_swaps', 'total_volume_xlm', 'per_swap_profit', 'daily_swaps', 'pair_diversity', 'score'].includes(sortKey);
-                    if (!sortKey) return;
-
-                    const direction = header.classList.contains('sort-asc') ? -1 : 1;
-                    document.querySelectorAll('th').forEach(th => th.classList.remove('sort-asc', 'sort-desc'));
-                    header.classList.add(direction === 1 ? 'sort-asc' : 'sort-desc');
-
-                    rows.sort((a, b) => {{
-                        let aValue, bValue;
-                        switch (sortKey) {{
-                            case 'source_account': aValue = a.cells[0].textContent; bValue = b.cells[0].textContent; break;
-                            case 'net_xlm_change': aValue = parseFloat(a.cells[1].textContent); bValue = parseFloat(a.cells[1].textContent); break;
-                            case 'num_swaps': aValue = parseInt(a.cells[2].textContent); bValue = parseInt(a.cells[2].textContent); break;
-                            case 'total_volume_xlm': aValue = parseFloat(a.cells[3].textContent); bValue = parseFloat(a.cells[3].textContent); break;
-                            case 'per_swap_profit': aValue = parseFloat(a.cells[4].textContent); bValue = parseFloat(a.cells[4].textContent); break;
-                            case 'daily_swaps': aValue = parseFloat(a.cells[5].textContent); bValue = parseFloat(a.cells[5].textContent); break;
-                            case 'pair_diversity': aValue = parseInt(a.cells[6].textContent); bValue = parseInt(a.cells[6].textContent); break;
-                            case 'asset_pairs': aValue = a.cells[7].textContent; bValue = b.cells[7].textContent; break;
-                            case 'score': aValue = parseFloat(a.cells[8].textContent); bValue = parseFloat(a.cells[8].textContent); break;
-                            case 'risk_level': aValue = a.cells[9].textContent; bValue = b.cells[9].textContent; break;
-                            case 'trade_type': aValue = a.cells[10].textContent; bValue = b.cells[10].textContent; break;
-                        }}
-                        if (isNumeric) {{
-                            return (bValue - aValue) * direction;
-                        }} else {{
-                            return aValue.localeCompare(bValue) * direction;
-                        }}
-                    }});
-
-                    while (tbody.firstChild) {{
-                        tbody.removeChild(tbody.firstChild);
-                    }}
-                    rows.forEach(row => tbody.appendChild(row));
-                }});
+                }},
             }});
         </script>
     </body>
     </html>
     """
 
-def get_domain_rankings_template(domain_rankings):
+def get_domain_rankings_template():
     return f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -170,63 +333,17 @@ def get_domain_rankings_template(domain_rankings):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Domain Wallet Rankings - LumenBro</title>
         <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            ::-webkit-scrollbar {{
-                width: 8px;
-                height: 8px;
-            }}
-            ::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-            }}
-            ::-webkit-scrollbar-thumb {{
-                background: #4CAF50;
-                border-radius: 4px;
-            }}
-            ::-webkit-scrollbar-thumb:hover {{
-                background: #45a049;
-            }}
-            .truncate {{
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-                cursor: pointer;
-            }}
-            .expanded {{
-                white-space: normal;
-                overflow: visible;
-                text-overflow: clip;
-            }}
-            th, td {{
-                padding: 8px 12px;
-                font-size: 0.875rem;
-                word-break: break-word;
-            }}
-            @media (max-width: 640px) {{
-                .hide-on-mobile {{
-                    display: none;
-                }}
-                th, td {{
-                    padding: 6px 8px;
-                    font-size: 0.75rem;
-                }}
-            }}
-            .copy-button {{
-                margin-left: 8px;
-                padding: 2px 8px;
-                background-color: #4CAF50;
-                color: white;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 0.75rem;
-            }}
-            .copy-button:hover {{
-                background-color: #45a049;
-            }}
-        </style>
+        <style>{TABLE_STYLE}        </style>
     </head>
     <body class="bg-gray-100 font-sans">
         <div class="container mx-auto px-4 py-6">
-            <h1 class="text-2xl font-bold text-center text-gray-800 mb-6">Domain Wallet Rankings (Meme Assets)</h1>
+            <h1 id="rankings-title" class="text-2xl font-bold text-center text-gray-800 mb-6">Domain Wallet Rankings (Meme Assets)</h1>
+            <div class="flex justify-between mb-3">
+                <select id="domain-select" class="w-48 py-1 px-2 text-xs border border-gray-300 rounded">
+                    <option value="">All domains</option>
+                </select>
+                <input type="number" min="0" data-filter="min_num_swaps" placeholder="Min swaps" class="w-32 py-1 px-2 text-xs border border-gray-300 rounded">
+            </div>
             <div class="overflow-x-auto shadow-lg rounded-lg">
                 <table id="rankings-table" class="min-w-full bg-white border border-gray-200">
                     <thead>
@@ -245,15 +362,32 @@ def get_domain_rankings_template(domain_rankings):
         </div>
 
         <script>
-            const rankings = {json.dumps(domain_rankings)};
-            const tbody = document.getElementById('rankings-body');
-            rankings.forEach(ranking => {{
-                const assetsTraded = Object.entries(ranking.assets_traded).map(([asset, data]) => 
-                    `${{asset}}: ${{data.num_swaps}} swaps, In: ${{data.xlm_inflows.toFixed(2)}}, Out: ${{data.xlm_outflows.toFixed(2)}}`
-                ).join('\\n');
-                const row = document.createElement('tr');
-                row.className = 'border-t border-gray-200 hover:bg-gray-50';
-                row.innerHTML = `
+            {TABLE_SCRIPT}
+
+            // /domain_rankings shows every ranked domain combined, /domain_rankings/<domain> one domain
+            const domainMatch = location.pathname.match(/^\\/domain_rankings\\/([^/]+)$/);
+            const domain = domainMatch ? decodeURIComponent(domainMatch[1]) : '';
+            const domainSelect = document.getElementById('domain-select');
+            if (domain) document.getElementById('rankings-title').textContent = `Domain Wallet Rankings (${{domain}})`;
+            fetch('/api/domains').then(response => response.json()).then(data => {{
+                for (const entry of data.domains) {{
+                    const option = new Option(`${{entry.domain}} (${{entry.wallets}} wallets)`, entry.domain);
+                    domainSelect.add(option);
+                }}
+                domainSelect.value = domain;
+            }});
+            domainSelect.addEventListener('change', () => {{
+                location.href = domainSelect.value ? `/domain_rankings/${{encodeURIComponent(domainSelect.value)}}` : '/domain_rankings';
+            }});
+
+            virtualTable({{
+                api: domain ? `/api/domain_rankings/${{encodeURIComponent(domain)}}` : '/api/domain_rankings',
+                tbody: document.getElementById('rankings-body'),
+                renderRow: ranking => {{
+                    const assetsTraded = Object.entries(ranking.assets_traded).map(([asset, data]) =>
+                        `${{asset}}: ${{data.num_swaps}} swaps, In: ${{data.xlm_inflows.toFixed(2)}}, Out: ${{data.xlm_outflows.toFixed(2)}}`
+                    ).join('\\n');
+                    return `
                     <td class="py-2 px-3 text-xs truncate max-w-[150px]">
                         <span onclick="this.classList.toggle('expanded')">${{ranking.source_account}}</span>
                         <button class="copy-button" onclick="navigator.clipboard.writeText('${{ranking.source_account}}').then(() => alert('Copied to clipboard!'))">Copy</button>
@@ -264,50 +398,14 @@ def get_domain_rankings_template(domain_rankings):
                     <td class="py-2 px-3 text-xs">${{ranking.net_xlm_flow.toFixed(2)}}</td>
                     <td class="py-2 px-3 text-xs hide-on-mobile">${{assetsTraded}}</td>
                 `;
-                tbody.appendChild(row);
-            }});
-
-            document.querySelectorAll('th').forEach(header => {{
-                header.addEventListener('click', () => {{
-                    const table = header.closest('table');
-                    const tbody = table.querySelector('tbody');
-                    const rows = Array.from(tbody.querySelectorAll('tr'));
-                    const sortKey = header.getAttribute('data-sort');
-                    const isNumeric = ['num_swaps', 'xlm_inflows', 'xlm_outflows', 'net_xlm_flow'].includes(sortKey);
-                    if (!sortKey) return;
-
-                    const direction = header.classList.contains('sort-asc') ? -1 : 1;
-                    document.querySelectorAll('th').forEach(th => th.classList.remove('sort-asc', 'sort-desc'));
-                    header.classList.add(direction === 1 ? 'sort-asc' : 'sort-desc');
-
-                    rows.sort((a, b) => {{
-                        let aValue, bValue;
-                        switch (sortKey) {{
-                            case 'source_account': aValue = a.cells[0].textContent; bValue = b.cells[0].textContent; break;
-                            case 'num_swaps': aValue = parseInt(a.cells[1].textContent); bValue = parseInt(a.cells[1].textContent); break;
-                            case 'xlm_inflows': aValue = parseFloat(a.cells[2].textContent); bValue = parseFloat(a.cells[2].textContent); break;
-                            case 'xlm_outflows': aValue = parseFloat(a.cells[3].textContent); bValue = parseFloat(a.cells[3].textContent); break;
-                            case 'net_xlm_flow': aValue = parseFloat(a.cells[4].textContent); bValue = parseFloat(a.cells[4].textContent); break;
-                        }}
-                        if (isNumeric) {{
-                            return (bValue - aValue) * direction;
-                        }} else {{
-                            return aValue.localeCompare(bValue) * direction;
-                        }}
-                    }});
-
-                    while (tbody.firstChild) {{
-                        tbody.removeChild(tbody.firstChild);
-                    }}
-                    rows.forEach(row => tbody.appendChild(row));
-                }});
+                }},
             }});
         </script>
     </body>
     </html>
     """
 
-def get_meme_trade_template(domain_copy_trade_all):
+def get_meme_trade_template():
     return f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -316,63 +414,14 @@ def get_meme_trade_template(domain_copy_trade_all):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Meme Trade Candidates - LumenBro</title>
         <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            ::-webkit-scrollbar {{
-                width: 8px;
-                height: 8px;
-            }}
-            ::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-            }}
-            ::-webkit-scrollbar-thumb {{
-                background: #4CAF50;
-                border-radius: 4px;
-            }}
-            ::-webkit-scrollbar-thumb:hover {{
-                background: #45a049;
-            }}
-            .truncate {{
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-                cursor: pointer;
-            }}
-            .expanded {{
-                white-space: normal;
-                overflow: visible;
-                text-overflow: clip;
-            }}
-            th, td {{
-                padding: 8px 12px;
-                font-size: 0.875rem;
-                word-break: break-word;
-            }}
-            @media (max-width: 640px) {{
-                .hide-on-mobile {{
-                    display: none;
-                }}
-                th, td {{
-                    padding: 6px 8px;
-                    font-size: 0.75rem;
-                }}
-            }}
-            .copy-button {{
-                margin-left: 8px;
-                padding: 2px 8px;
-                background-color: #4CAF50;
-                color: white;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 0.75rem;
-            }}
-            .copy-button:hover {{
-                background-color: #45a049;
-            }}
-        </style>
+        <style>{TABLE_STYLE}        </style>
     </head>
     <body class="bg-gray-100 font-sans">
         <div class="container mx-auto px-4 py-6">
             <h1 class="text-2xl font-bold text-center text-gray-800 mb-6">Meme Trade Candidates (lu.meme)</h1>
+            <div class="flex justify-end mb-3">
+                <input type="number" min="0" data-filter="min_num_swaps" placeholder="Min swaps" class="w-32 py-1 px-2 text-xs border border-gray-300 rounded">
+            </div>
             <div class="overflow-x-auto shadow-lg rounded-lg">
                 <table id="candidates-table" class="min-w-full bg-white border border-gray-200">
                     <thead>
@@ -380,8 +429,8 @@ def get_meme_trade_template(domain_copy_trade_all):
                             <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="source_account">Source Account</th>
                             <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="num_swaps">Num Swaps</th>
                             <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="daily_swaps">Daily Swaps</th>
-                            <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="net_xlm_flow">Net XLM Flow</th>
-                            <th class="py-2 px-3 text-left text-xs font-semibold hide-on-mobile">Assets Traded</th>
+                            <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="net_xlm_change">Net XLM Flow</th>
+                            <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer hide-on-mobile" data-sort="asset_pairs">Assets Traded</th>
                             <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer" data-sort="score">Score</th>
                             <th class="py-2 px-3 text-left text-xs font-semibold cursor-pointer hide-on-mobile" data-sort="risk_level">Risk Level</th>
                             <th class="py-2 px-3 text-left text-xs font-semibold">Recommendation</th>
@@ -393,72 +442,33 @@ def get_meme_trade_template(domain_copy_trade_all):
         </div>
 
         <script>
-            const candidates = {json.dumps(domain_copy_trade_all)};
-            const tbody = document.getElementById('candidates-body');
-            candidates.forEach(candidate => {{
-                const assetsTraded = Object.entries(candidate.assets_traded).map(([asset, data]) => 
-                    `${{asset}}: ${{data.num_swaps}} swaps, In: ${{data.xlm_inflows.toFixed(2)}}, Out: ${{data.xlm_outflows.toFixed(2)}}`
-                ).join('\\n');
-                const row = document.createElement('tr');
-                row.className = 'border-t border-gray-200 hover:bg-gray-50';
-                row.innerHTML = `
+            {TABLE_SCRIPT}
+
+            virtualTable({{
+                api: '/api/domain_copy_trade_candidates',
+                tbody: document.getElementById('candidates-body'),
+                renderRow: candidate => {{
+                    return `
                     <td class="py-2 px-3 text-xs truncate max-w-[150px]">
                         <span onclick="this.classList.toggle('expanded')">${{candidate.source_account}}</span>
                         <button class="copy-button" onclick="navigator.clipboard.writeText('${{candidate.source_account}}').then(() => alert('Copied to clipboard!'))">Copy</button>
                     </td>
                     <td class="py-2 px-3 text-xs">${{candidate.num_swaps}}</td>
                     <td class="py-2 px-3 text-xs">${{candidate.daily_swaps.toFixed(2)}}</td>
-                    <td class="py-2 px-3 text-xs">${{candidate.net_xlm_flow.toFixed(2)}}</td>
-                    <td class="py-2 px-3 text-xs hide-on-mobile">${{assetsTraded}}</td>
+                    <td class="py-2 px-3 text-xs">${{candidate.net_xlm_change.toFixed(2)}}</td>
+                    <td class="py-2 px-3 text-xs truncate max-w-[150px] hide-on-mobile" onclick="this.classList.toggle('expanded')">${{candidate.asset_pairs.join(', ')}}</td>
                     <td class="py-2 px-3 text-xs">${{candidate.score.toFixed(4)}}</td>
                     <td class="py-2 px-3 text-xs hide-on-mobile">${{candidate.risk_level}}</td>
                     <td class="py-2 px-3 text-xs">${{candidate.recommendation}}</td>
                 `;
-                tbody.appendChild(row);
-            }});
-
-            document.querySelectorAll('th').forEach(header => {{
-                header.addEventListener('click', () => {{
-                    const table = header.closest('table');
-                    const tbody = table.querySelector('tbody');
-                    const rows = Array.from(tbody.querySelectorAll('tr'));
-                    const sortKey = header.getAttribute('data-sort');
-                    const isNumeric = ['num_swaps', 'daily_swaps', 'net_xlm_flow', 'score'].includes(sortKey);
-                    if (!sortKey) return;
-
-                    const direction = header.classList.contains('sort-asc') ? -1 : 1;
-                    document.querySelectorAll('th').forEach(th => th.classList.remove('sort-asc', 'sort-desc'));
-                    header.classList.add(direction === 1 ? 'sort-asc' : 'sort-desc');
-
-                    rows.sort((a, b) => {{
-                        let aValue, bValue;
-                        switch (sortKey) {{
-                            case 'source_account': aValue = a.cells[0].textContent; bValue = b.cells[0].textContent; break;
-                            case 'num_swaps': aValue = parseInt(a.cells[1].textContent); bValue = parseInt(a.cells[1].textContent); break;
-                            case 'daily_swaps': aValue = parseFloat(a.cells[2].textContent); bValue = parseFloat(a.cells[2].textContent); break;
-                            case 'net_xlm_flow': aValue = parseFloat(a.cells[3].textContent); bValue = parseFloat(a.cells[3].textContent); break;
-                            case 'score': aValue = parseFloat(a.cells[5].textContent); bValue = parseFloat(a.cells[5].textContent); break;
-                            case 'risk_level': aValue = a.cells[6].textContent; bValue = b.cells[6].textContent; break;
-                        }}
-                        if (isNumeric) {{
-                            return (bValue - aValue) * direction;
-                        }} else {{
-                            return aValue.localeCompare(bValue) * direction;
-                        }}
-                    }});
-
-                    while (tbody.firstChild) {{
-                        tbody.removeChild(tbody.firstChild);
-                    }}
-                    rows.forEach(row => tbody.appendChild(row));
-                }});
+                }},
             }});
         </script>
     </body>
     </html>
     """
 
-def get_network_rankings_template(network_rankings):
+def get_network_rankings_template():
     return f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -467,63 +477,14 @@ def get_network_rankings_template(network_rankings):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Network-Wide Wallet Rankings - LumenBro</title>
         <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            ::-webkit-scrollbar {{
-                width: 8px;
-                height: 8px;
-            }}
-            ::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-            }}
-            ::-webkit-scrollbar-thumb {{
-                background: #4CAF50;
-                border-radius: 4px;
-            }}
-            ::-webkit-scrollbar-thumb:hover {{
-                background: #45a049;
-            }}
-            .truncate {{
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-                cursor: pointer;
-            }}
-            .expanded {{
-                white-space: normal;
-                overflow: visible;
-                text-overflow: clip;
-            }}
-            th, td {{
-                padding: 8px 12px;
-                font-size: 0.875rem;
-                word-break: break-word;
-            }}
-            @media (max-width: 640px) {{
-                .hide-on-mobile {{
-                    display: none;
-                }}
-                th, td {{
-                    padding: 6px 8px;
-                    font-size: 0.75rem;
-                }}
-            }}
-            .copy-button {{
-                margin-left: 8px;
-                padding: 2px 8px;
-                background-color: #4CAF50;
-                color: white;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 0.75rem;
-            }}
-            .copy-button:hover {{
-                background-color: #45a049;
-            }}
-        </style>
+        <style>{TABLE_STYLE}        </style>
     </head>
     <body class="bg-gray-100 font-sans">
         <div class="container mx-auto px-4 py-6">
             <h1 class="text-2xl font-bold text-center text-gray-800 mb-6">Network-Wide Wallet Rankings</h1>
+            <div class="flex justify-end mb-3">
+                <input type="number" min="0" data-filter="min_num_swaps" placeholder="Min swaps" class="w-32 py-1 px-2 text-xs border border-gray-300 rounded">
+            </div>
             <div class="overflow-x-auto shadow-lg rounded-lg">
                 <table id="rankings-table" class="min-w-full bg-white border border-gray-200">
                     <thead>
@@ -539,12 +500,13 @@ def get_network_rankings_template(network_rankings):
         </div>
 
         <script>
-            const rankings = {json.dumps(network_rankings)};
-            const tbody = document.getElementById('rankings-body');
-            rankings.forEach(ranking => {{
-                const row = document.createElement('tr');
-                row.className = 'border-t border-gray-200 hover:bg-gray-50';
-                row.innerHTML = `
+            {TABLE_SCRIPT}
+
+            virtualTable({{
+                api: '/api/network_rankings',
+                tbody: document.getElementById('rankings-body'),
+                renderRow: ranking => {{
+                    return `
                     <td class="py-2 px-3 text-xs truncate max-w-[150px]">
                         <span onclick="this.classList.toggle('expanded')">${{ranking.source_account}}</span>
                         <button class="copy-button" onclick="navigator.clipboard.writeText('${{ranking.source_account}}').then(() => alert('Copied to clipboard!'))">Copy</button>
@@ -552,48 +514,14 @@ def get_network_rankings_template(network_rankings):
                     <td class="py-2 px-3 text-xs">${{ranking.num_swaps}}</td>
                     <td class="py-2 px-3 text-xs">${{ranking.total_volume_xlm.toFixed(2)}}</td>
                 `;
-                tbody.appendChild(row);
-            }});
-
-            document.querySelectorAll('th').forEach(header => {{
-                header.addEventListener('click', () => {{
-                    const table = header.closest('table');
-                    const tbody = table.querySelector('tbody');
-                    const rows = Array.from(tbody.querySelectorAll('tr'));
-                    const sortKey = header.getAttribute('data-sort');
-                    const isNumeric = ['num_swaps', 'total_volume_xlm'].includes(sortKey);
-                    if (!sortKey) return;
-
-                    const direction = header.classList.contains('sort-asc') ? -1 : 1;
-                    document.querySelectorAll('th').forEach(th => th.classList.remove('sort-asc', 'sort-desc'));
-                    header.classList.add(direction === 1 ? 'sort-asc' : 'sort-desc');
-
-                    rows.sort((a, b) => {{
-                        let aValue, bValue;
-                        switch (sortKey) {{
-                            case 'source_account': aValue = a.cells[0].textContent; bValue = b.cells[0].textContent; break;
-                            case 'num_swaps': aValue = parseInt(a.cells[1].textContent); bValue = parseInt(a.cells[1].textContent); break;
-                            case 'total_volume_xlm': aValue = parseFloat(a.cells[2].textContent); bValue = parseFloat(a.cells[2].textContent); break;
-                        }}
-                        if (isNumeric) {{
-                            return (bValue - aValue) * direction;
-                        }} else {{
-                            return aValue.localeCompare(bValue) * direction;
-                        }}
-                    }});
-
-                    while (tbody.firstChild) {{
-                        tbody.removeChild(tbody.firstChild);
-                    }}
-                    rows.forEach(row => tbody.appendChild(row));
-                }});
+                }},
             }});
         </script>
     </body>
     </html>
     """
 
-def get_domain_copy_trade_template(domain_copy_trade_all):
+def get_domain_copy_trade_template():
     return f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -602,63 +530,14 @@ def get_domain_copy_trade_template(domain_copy_trade_all):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Domain-Specific Copy Trade Candidates - LumenBro</title>
         <script src="https://cdn.tailwindcss.com"></script>
-        <style>
-            ::-webkit-scrollbar {{
-                width: 8px;
-                height: 8px;
-            }}
-            ::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-            }}
-            ::-webkit-scrollbar-thumb {{
-                background: #4CAF50;
-                border-radius: 4px;
-            }}
-            ::-webkit-scrollbar-thumb:hover {{
-                background: #45a049;
-            }}
-            .truncate {{
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-                cursor: pointer;
-            }}
-            .expanded {{
-                white-space: normal;
-                overflow: visible;
-                text-overflow: clip;
-            }}
-            th, td {{
-                padding: 8px 12px;
-                font-size: 0.875rem;
-                word-break: break-word;
-            }}
-            @media (max-width: 640px) {{
-                .hide-on-mobile {{
-                    display: none;
-                }}
-                th, td {{
-                    padding: 6px 8px;
-                    font-size: 0.75rem;
-                }}
-            }}
-            .copy-button {{
-                margin-left: 8px;
-                padding: 2px 8px;
-                background-color: #4CAF50;
-                color: white;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 0.75rem;
-            }}
-            .copy-button:hover {{
-                background-color: #45a049;
-            }}
-        </style>
+        <style>{TABLE_STYLE}        </style>
     </head>
     <body class="bg-gray-100 font-sans">
         <div class="container mx-auto px-4 py-6">
             <h1 class="text-2xl font-bold text-center text-gray-800 mb-6">Domain-Specific Copy Trade Candidates (lu.meme)</h1>
+            <div class="flex justify-end mb-3">
+                <input type="number" min="0" data-filter="min_num_swaps" placeholder="Min swaps" class="w-32 py-1 px-2 text-xs border border-gray-300 rounded">
+            </div>
             <div class="overflow-x-auto shadow-lg rounded-lg">
                 <table id="candidates-table" class="min-w-full bg-white border border-gray-200">
                     <thead>
@@ -683,12 +562,13 @@ def get_domain_copy_trade_template(domain_copy_trade_all):
         </div>
 
         <script>
-            const candidates = {json.dumps(domain_copy_trade_all)};
-            const tbody = document.getElementById('candidates-body');
-            candidates.forEach(candidate => {{
-                const row = document.createElement('tr');
-                row.className = 'border-t border-gray-200 hover:bg-gray-50';
-                row.innerHTML = `
+            {TABLE_SCRIPT}
+
+            virtualTable({{
+                api: '/api/domain_copy_trade_candidates',
+                tbody: document.getElementById('candidates-body'),
+                renderRow: candidate => {{
+                    return `
                     <td class="py-2 px-3 text-xs truncate max-w-[150px]">
                         <span onclick="this.classList.toggle('expanded')">${{candidate.source_account}}</span>
                         <button class="copy-button" onclick="navigator.clipboard.writeText('${{candidate.source_account}}').then(() => alert('Copied to clipboard!'))">Copy</button>
@@ -705,49 +585,7 @@ def get_domain_copy_trade_template(domain_copy_trade_all):
                     <td class="py-2 px-3 text-xs hide-on-mobile">${{candidate.trade_type}}</td>
                     <td class="py-2 px-3 text-xs">${{candidate.recommendation}}</td>
                 `;
-                tbody.appendChild(row);
-            }});
-
-            document.querySelectorAll('th').forEach(header => {{
-                header.addEventListener('click', () => {{
-                    const table = header.closest('table');
-                    const tbody = table.querySelector('tbody');
-                    const rows = Array.from(tbody.querySelectorAll('tr'));
-                    const sortKey = header.getAttribute('data-sort');
-                    const isNumeric = ['net_xlm_change', 'num_swaps', 'total_volume_xlm', 'per_swap_profit', 'daily_swaps', 'pair_diversity', 'score'].includes(sortKey);
-                    if (!sortKey) return;
-
-                    const direction = header.classList.contains('sort-asc') ? -1 : 1;
-                    document.querySelectorAll('th').forEach(th => th.classList.remove('sort-asc', 'sort-desc'));
-                    header.classList.add(direction === 1 ? 'sort-asc' : 'sort-desc');
-
-                    rows.sort((a, b) => {{
-                        let aValue, bValue;
-                        switch (sortKey) {{
-                            case 'source_account': aValue = a.cells[0].textContent; bValue = b.cells[0].textContent; break;
-                            case 'net_xlm_change': aValue = parseFloat(a.cells[1].textContent); bValue = parseFloat(a.cells[1].textContent); break;
-                            case 'num_swaps': aValue = parseInt(a.cells[2].textContent); bValue = parseInt(a.cells[2].textContent); break;
-                            case 'total_volume_xlm': aValue = parseFloat(a.cells[3].textContent); bValue = parseFloat(a.cells[3].textContent); break;
-                            case 'per_swap_profit': aValue = parseFloat(a.cells[4].textContent); bValue = parseFloat(a.cells[4].textContent); break;
-                            case 'daily_swaps': aValue = parseFloat(a.cells[5].textContent); bValue = parseFloat(a.cells[5].textContent); break;
-                            case 'pair_diversity': aValue = parseInt(a.cells[6].textContent); bValue = parseInt(a.cells[6].textContent); break;
-                            case 'asset_pairs': aValue = a.cells[7].textContent; bValue = b.cells[7].textContent; break;
-                            case 'score': aValue = parseFloat(a.cells[8].textContent); bValue = parseFloat(a.cells[8].textContent); break;
-                            case 'risk_level': aValue = a.cells[9].textContent; bValue = b.cells[9].textContent; break;
-                            case 'trade_type': aValue = a.cells[10].textContent; bValue = b.cells[10].textContent; break;
-                        }}
-                        if (isNumeric) {{
-                            return (bValue - aValue) * direction;
-                        }} else {{
-                            return aValue.localeCompare(bValue) * direction;
-                        }}
-                    }});
-
-                    while (tbody.firstChild) {{
-                        tbody.removeChild(tbody.firstChild);
-                    }}
-                    rows.forEach(row => tbody.appendChild(row));
-                }});
+                }},
             }});
         </script>
     </body>
@@ -782,7 +620,7 @@ def get_landing_page_template():
             <div class="flex flex-col items-center space-y-4">
                 <a href="/webapp" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Copy Trade Candidates</a>
                 <a href="/network_rankings" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Network-Wide Rankings</a>
-                <a href="/domain_rankings" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Domain Rankings (lu.meme)</a>
+                <a href="/domain_rankings" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Domain Rankings</a>
                 <a href="/domain_copy_trade" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Domain Copy Trade Candidates (lu.meme)</a>
                 <a href="/meme_trade_candidates" class="w-full max-w-xs py-3 px-4 bg-green-500 text-white text-center rounded-lg hover:bg-green-600 transition duration-300">View Meme Trade Candidates (lu.meme)</a>
             </div>
@@ -0,0 +1,29 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dictionary_encoding import Dictionary
+
+
+# A string key whose hash yields the GIL, so threads interleave inside encode()'s check-and-insert
+class YieldingKey(str):
+    def __hash__(self):
+        time.sleep(0)
+        return str.__hash__(self)
+
+
+def test_concurrent_encode_assigns_one_id_per_value():
+    dictionary = Dictionary()
+    values = [YieldingKey(f"PAIR{i % 50}") for i in range(2000)]
+    chunks = [values[i::8] for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        chunk_ids = list(executor.map(lambda chunk: [dictionary.encode(value) for value in chunk], chunks))
+    assert len(dictionary) == len(dictionary.ids) == 50
+    for chunk, ids in zip(chunks, chunk_ids):
+        assert dictionary.decode_all(ids) == chunk
+
+
+def test_encode_lists_assigns_new_ids_in_first_seen_order():
+    dictionary = Dictionary(["XLM/AQUA"])
+    ids, owners = dictionary.encode_lists([["XLM/AQUA", "XLM/USDC"], [], ["XLM/USDC", "AQUA/XLM"]])
+    assert ids.tolist() == [0, 1, 1, 2]
+    assert owners.tolist() == [0, 0, 2, 2]
+    assert dictionary.decode_all(ids) == ["XLM/AQUA", "XLM/USDC", "XLM/USDC", "AQUA/XLM"]
@@ -0,0 +1,87 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pnl_engine import MATCH_TOLERANCE, RoundTripMatcher, estimate_pnl_columnar, swaps_to_columns
+from wallet_profit_loss import estimate_pnl_for_wallet, row_to_swap
+
+ISSUER = "GA5ZSEJYB37JRC5AVCIA5MOP4RHTM335X2KGX3IHOJAPP5RE34K4KZVN"
+START = datetime(2026, 10, 18, 0, 0)  # Naive, as the cursor path returns Horizon's created_at
+
+
+# SWAPS_QUERY rows for one wallet: buys of USDC with XLM, each sold back an hour later
+def swap_rows(wallet, closed_at):
+    rows = []
+    for i in range(3):
+        bought = 10.0 + i
+        rows.append((wallet, 13, "native", None, None, f"{20.0 + i}", "credit_alphanum4", "USDC", ISSUER,
+                     f"{bought}", closed_at(i * 2)))
+        rows.append((wallet, 13, "credit_alphanum4", "USDC", ISSUER, f"{bought}", "native", None, None,
+                     f"{21.0 + i}", closed_at(i * 2 + 1)))
+    return rows
+
+
+def wallet_record(wallet):
+    return {"source_account": wallet, "num_swaps": 6, "total_volume_xlm": 63.0}
+
+
+def test_columnar_engine_accepts_naive_timestamps():
+    naive = [row_to_swap(row) for row in swap_rows("GNAIVE", lambda h: START + timedelta(hours=h))]
+    aware = [row_to_swap(row) for row in swap_rows("GAWARE", lambda h: (START + timedelta(hours=h)).replace(
+        tzinfo=timezone.utc))]
+    columns = swaps_to_columns(["GNAIVE", "GAWARE"], {"GNAIVE": naive, "GAWARE": aware})
+    assert columns.closed_at[:6].tolist() == columns.closed_at[6:].tolist()
+
+    results = estimate_pnl_columnar([wallet_record("GNAIVE"), wallet_record("GAWARE")], columns)
+    assert results[0]["pnl"] == results[1]["pnl"]
+    assert results[0]["pnl"]["num_round_trips"] == 3
+
+    expected = estimate_pnl_for_wallet(dict(wallet_record("GNAIVE"), swaps=list(naive)))
+    assert results[0] == expected
+
+
+# The original first-fit scan: the earliest pending buy within MATCH_TOLERANCE of the sold amount
+def linear_match(pending, sold_amount):
+    for i, (asset_amount, xlm_amount) in enumerate(pending):
+        if abs(asset_amount - sold_amount) < MATCH_TOLERANCE:
+            return pending.pop(i)[1]
+    return None
+
+
+# Asset amounts on and next to bucket edges (k * MATCH_TOLERANCE, where float division rounds
+# either way), plus arbitrary ones
+def edge_amount(rng):
+    edge = rng.randrange(1, 3000) * MATCH_TOLERANCE
+    return rng.choice([edge, math.nextafter(edge, 0), math.nextafter(edge, math.inf),
+                       edge + MATCH_TOLERANCE / 2, round(rng.uniform(0, 30), 7)])
+
+
+# A sold amount near a pending buy: exactly at the tolerance (never a match), one ulp inside it,
+# tiny and mid-range offsets, or unrelated
+def sold_near(asset_amount, rng):
+    offset = rng.choice([MATCH_TOLERANCE, math.nextafter(MATCH_TOLERANCE, 0), MATCH_TOLERANCE / 2, 1e-12, 0.0])
+    return rng.choice([asset_amount + offset, asset_amount - offset, edge_amount(rng)])
+
+
+def test_round_trip_matcher_picks_the_linear_scans_counterpart():
+    rng = random.Random(7)
+    for _ in range(200):
+        matcher, pending, bought = RoundTripMatcher(), [], []
+        for step in range(rng.randrange(1, 300)):
+            if not bought or rng.random() < 0.5:
+                # Repeated amounts make several buys match, so the earliest one must win
+                asset_amount = rng.choice(bought) if bought and rng.random() < 0.3 else edge_amount(rng)
+                bought.append(asset_amount)
+                matcher.add(asset_amount, float(step))  # The XLM amount identifies the buy
+                pending.append((asset_amount, float(step)))
+            else:
+                sold_amount = sold_near(rng.choice(bought), rng)
+                assert matcher.match(sold_amount) == linear_match(pending, sold_amount)
+
+
+def test_round_trip_matcher_tolerance_is_exclusive():
+    matcher = RoundTripMatcher()
+    matcher.add(0.29, 1.0)  # 0.29 / 0.01 rounds down to 28.999999999999996
+    matcher.add(0.30, 2.0)
+    assert matcher.match(0.29 + MATCH_TOLERANCE) == 2.0  # Within tolerance of 0.30 only, at it for 0.29
+    assert matcher.match(math.nextafter(0.29 - MATCH_TOLERANCE, math.inf)) == 1.0
+    assert matcher.match(0.29) is None
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+import pnl_pool
+from pnl_pool import analyze_wallet_batches
+from wallet_profit_loss import estimate_pnl_for_wallet, row_to_swap
+
+ISSUER = "GA5ZSEJYB37JRC5AVCIA5MOP4RHTM335X2KGX3IHOJAPP5RE34K4KZVN"
+START = datetime(2026, 10, 18, 0, 0)
+
+
+# SWAPS_QUERY rows for one wallet: `count` buys of USDC with XLM, each sold back an hour later
+def swap_rows(wallet, count):
+    rows = []
+    for i in range(count):
+        bought = 10.0 + i % 7
+        rows.append((wallet, 13, "native", None, None, f"{20.0 + i % 5}", "credit_alphanum4", "USDC", ISSUER,
+                     f"{bought}", START + timedelta(hours=2 * i)))
+        rows.append((wallet, 13, "credit_alphanum4", "USDC", ISSUER, f"{bought}", "native", None, None,
+                     f"{21.0 + i % 3}", START + timedelta(hours=2 * i + 1)))
+    return rows
+
+
+def wallets_and_batches(num_wallets, swaps_per_wallet):
+    wallets = [{"source_account": f"G{i:055d}", "num_swaps": 2 * swaps_per_wallet, "total_volume_xlm": 1.0}
+               for i in range(num_wallets)]
+    swaps = {wallet["source_account"]: [row_to_swap(row) for row in swap_rows(wallet["source_account"],
+                                                                              swaps_per_wallet)]
+             for wallet in wallets}
+    # The first wallet had no swaps in the window, so no batch delivers it
+    delivered = [wallet["source_account"] for wallet in wallets[1:]]
+    batches = [(delivered[i:i + 3], {address: swaps[address] for address in delivered[i:i + 3]})
+               for i in range(0, len(delivered), 3)]
+    return wallets, swaps, batches
+
+
+def expected_results(wallets, swaps, missing):
+    return [estimate_pnl_for_wallet(dict(wallet, swaps=[] if wallet["source_account"] in missing
+                                         else list(swaps[wallet["source_account"]])))
+            for wallet in wallets]
+
+
+def test_undelivered_wallets_get_empty_results_in_process():
+    wallets, swaps, batches = wallets_and_batches(7, 4)
+    results = analyze_wallet_batches(wallets, iter(batches), processes=1)
+    assert results == expected_results(wallets, swaps, {wallets[0]["source_account"]})
+    assert results[0]["pnl"]["num_swaps_analyzed"] == 0
+
+
+def test_forkserver_pool_matches_the_per_wallet_engine(monkeypatch):
+    monkeypatch.setattr(pnl_pool, "MIN_POOL_SWAPS", 1)
+    monkeypatch.setattr(pnl_pool, "MIN_TASK_SWAPS", 8)
+    wallets, swaps, batches = wallets_and_batches(10, 6)
+    results = analyze_wallet_batches(wallets, iter(batches), processes=2)
+    assert results == expected_results(wallets, swaps, {wallets[0]["source_account"]})
@@ -0,0 +1,121 @@
+import asyncio
+from collections import Counter
+import aiohttp
+import pytest
+from bench_toml_resolver import make_app, start_server, toml_document
+from stellar_toml import TomlCache, parse_currencies, resolve_domain, resolve_domains
+
+GOOD = ["issuer0.example", "issuer1.example", "issuer2.example"]
+FAILING = ["hang-1.example", "missing-1.example", "broken-1.example"]
+TIMEOUT_SECS = 0.5
+
+
+# The stand-in issuer hosts of bench_toml_resolver; "hang-*" answers well after TIMEOUT_SECS
+@pytest.fixture
+def server():
+    app, requests_by_status = make_app(latency_secs=0, hang_secs=TIMEOUT_SECS * 4)
+    port, stop = start_server(app)
+    running = {"stop": stop}
+
+    def stop_once():
+        running.pop("stop", lambda: None)()
+
+    yield f"http://127.0.0.1:{port}/{{domain}}/.well-known/stellar.toml", requests_by_status, stop_once
+    stop_once()
+
+
+# Resolve domains through one session like resolve_domains; returns {domain: (assets, outcome)}
+def resolve(domains, cache, url_template):
+    async def run():
+        slots = asyncio.Semaphore(8)
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(*(resolve_domain(session, slots, cache, domain, url_template, TIMEOUT_SECS)
+                                          for domain in domains))
+    return dict(zip(domains, asyncio.run(run())))
+
+
+# Requests the server answered while `action` ran, by status
+def requests_during(requests_by_status, action):
+    before = Counter(requests_by_status)
+    result = action()
+    return result, requests_by_status - before
+
+
+def expected_assets(domain):
+    return parse_currencies(toml_document(domain))
+
+
+def test_cold_run_fetches_and_fails_without_cache(server, tmp_path):
+    url_template, requests_by_status, _ = server
+    resolved, requests = requests_during(requests_by_status,
+                                         lambda: resolve(GOOD + FAILING, TomlCache(str(tmp_path)), url_template))
+    for domain in GOOD:
+        assert resolved[domain] == (expected_assets(domain), "fetched")
+        assert len(resolved[domain][0]) == 3  # The dead currency is dropped
+    for domain in FAILING:
+        assert resolved[domain] == ([], "failed")
+    assert requests == Counter({200: len(GOOD) + 1, 404: 1})  # broken-1 is a 200 that fails to parse
+
+
+def test_warm_run_makes_no_requests(server, tmp_path):
+    url_template, requests_by_status, _ = server
+    cold = resolve(GOOD, TomlCache(str(tmp_path)), url_template)
+    warm, requests = requests_during(requests_by_status, lambda: resolve(GOOD, TomlCache(str(tmp_path)), url_template))
+    assert not requests
+    assert warm == {domain: (assets, "cached") for domain, (assets, _) in cold.items()}
+
+
+def test_expired_entries_are_revalidated_with_304(server, tmp_path):
+    url_template, requests_by_status, _ = server
+    cold = resolve(GOOD, TomlCache(str(tmp_path)), url_template)
+    revalidated, requests = requests_during(requests_by_status,
+                                            lambda: resolve(GOOD, TomlCache(str(tmp_path), ttl_secs=0), url_template))
+    assert requests == Counter({304: len(GOOD)})
+    assert revalidated == {domain: (assets, "revalidated") for domain, (assets, _) in cold.items()}
+    # A 304 renews the entry, so the next run within the TTL is served from the cache
+    assert {outcome for _, outcome in resolve(GOOD, TomlCache(str(tmp_path)), url_template).values()} == {"cached"}
+
+
+def test_failed_refresh_uses_stale_entry_only_when_cached(server, tmp_path):
+    url_template, requests_by_status, stop = server
+    cache = TomlCache(str(tmp_path), ttl_secs=0)
+    cold = resolve(GOOD, cache, url_template)
+    # broken-1 had valid CURRENCIES once; its unparseable document now falls back to that entry
+    cache.put("broken-1.example", {"fetched_at": 0, "etag": None, "last_modified": None, "assets": [["OLD", "GOLD"]]})
+    resolved = resolve(["broken-1.example", "missing-1.example"], cache, url_template)
+    assert resolved == {"broken-1.example": ([("OLD", "GOLD")], "stale"), "missing-1.example": ([], "failed")}
+
+    stop()
+    host_down = resolve(GOOD + ["issuer9.example"], cache, url_template)
+    assert host_down == {**{domain: (assets, "stale") for domain, (assets, _) in cold.items()},
+                         "issuer9.example": ([], "failed")}
+
+
+# A cache whose directory cannot be written
+class ReadOnlyCache(TomlCache):
+    def put(self, domain, entry):
+        raise PermissionError(13, "Permission denied", self._path(domain))
+
+
+def test_unwritable_cache_does_not_abort_resolution(server, tmp_path):
+    url_template, requests_by_status, _ = server
+    cache = TomlCache(str(tmp_path), ttl_secs=0)
+    resolve(GOOD[:1], cache, url_template)
+    read_only = ReadOnlyCache(str(tmp_path), ttl_secs=0)
+    resolved = asyncio.run(resolve_domains(GOOD, read_only, url_template, TIMEOUT_SECS))
+    assert resolved == {domain: expected_assets(domain) for domain in GOOD}
+    assert resolve(GOOD[:1], read_only, url_template) == {GOOD[0]: (expected_assets(GOOD[0]), "revalidated")}
+
+
+def test_unsolicited_304_is_refetched_and_never_cached(server, tmp_path):
+    url_template, requests_by_status, _ = server
+    cache = TomlCache(str(tmp_path))
+    resolved, requests = requests_during(requests_by_status,
+                                         lambda: resolve(["once304-1.example", "always304-1.example"], cache,
+                                                         url_template))
+    # once304 answers the unconditional refetch with its document; always304 never sends one
+    assert resolved == {"once304-1.example": (expected_assets("once304-1.example"), "fetched"),
+                        "always304-1.example": ([], "failed")}
+    assert requests == Counter({304: 3, 200: 1})
+    assert cache.get("always304-1.example") is None
+    assert cache.get("once304-1.example")["assets"] == [list(asset) for asset in expected_assets("once304-1.example")]
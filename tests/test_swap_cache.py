@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import swap_cache
+from dictionary_encoding import Dictionary
+from swap_cache import SwapCache, columns_to_rows, evict_lru, rows_to_columns, rows_with_utc, text_column_ids
+from window_aggregates import as_utc, hour_number
+
+SCHEMA = [("source_account", "text"), ("amount", "float"), ("created_at", "timestamp")]
+AWARE = datetime(2026, 10, 18, 8, 24, 35, 838529, tzinfo=timezone.utc)
+NAIVE = AWARE.replace(tzinfo=None)  # Horizon's created_at is timestamp without time zone (UTC)
+
+
+def test_as_utc_treats_naive_as_utc():
+    assert as_utc(NAIVE) == AWARE
+    assert as_utc(AWARE.astimezone(timezone(timedelta(hours=-7)))) == AWARE
+    assert hour_number(NAIVE) == hour_number(AWARE)
+
+
+def test_naive_and_aware_rows_encode_the_same():
+    naive_columns = rows_to_columns([("GA", 1.5, NAIVE)], SCHEMA)
+    aware_columns = rows_to_columns([("GA", 1.5, AWARE)], SCHEMA)
+    assert naive_columns["created_at"].tolist() == aware_columns["created_at"].tolist()
+    assert columns_to_rows(naive_columns, SCHEMA) == [("GA", 1.5, AWARE)]
+
+
+def test_rows_with_utc_makes_fetched_rows_comparable():
+    rows = rows_with_utc([("GA", 1.5, NAIVE), ("GB", 2.0, AWARE - timedelta(hours=1))], 2)
+    assert all(row[2].tzinfo is not None for row in rows)
+    assert [row[0] for row in rows if row[2] >= AWARE - timedelta(minutes=1)] == ["GA"]
+
+
+
+def test_text_column_ids_map_partition_codes_to_run_wide_ids():
+    accounts = Dictionary(["GB", "GZ"])
+    columns = rows_to_columns([("GA", 1.0, AWARE), ("GB", 2.0, AWARE), ("GA", 3.0, AWARE)], SCHEMA)
+    ids = text_column_ids(columns, "source_account", accounts)
+    assert accounts.decode_all(ids) == ["GA", "GB", "GA"]
+    assert ids.tolist() == [2, 0, 2]
+    # Partitions from before dictionary encoding store the strings themselves
+    legacy = {"source_account": np.array(["GZ", "GC"])}
+    assert accounts.decode_all(text_column_ids(legacy, "source_account", accounts)) == ["GZ", "GC"]
+    assert len(text_column_ids(rows_to_columns([], SCHEMA), "source_account", accounts)) == 0
+
+
+def tree_bytes(root):
+    return sum(path.stat().st_size for path in root.rglob("*") if path.is_file())
+
+
+def partition(rows):
+    return rows_to_columns([(f"G{i:02d}", float(i), AWARE) for i in range(rows)], SCHEMA)
+
+
+def test_corrupt_partitions_are_dropped_as_misses(tmp_path):
+    for hour in (1, 2, 3):
+        SwapCache(str(tmp_path)).put("swaps", hour, partition(20))
+    cache = SwapCache(str(tmp_path))
+    truncated = tmp_path / "swaps" / "2.npz"
+    truncated.write_bytes(truncated.read_bytes()[:100])
+    (tmp_path / "swaps" / "3.npz").write_bytes(b"")
+    assert cache.get("swaps", 2) is None and cache.get("swaps", 3) is None
+    assert not truncated.exists() and not (tmp_path / "swaps" / "3.npz").exists()
+    assert cache.get("swaps", 1)["source_account"].size == 20
+    cache.put("swaps", 2, partition(20))
+    assert cache.get("swaps", 2)["source_account"].size == 20
+    assert cache.total_bytes == tree_bytes(tmp_path)
+
+
+def test_size_is_tracked_without_walking_the_tree(tmp_path, monkeypatch):
+    walks = []
+
+    def counting_evict_lru(root, max_bytes):
+        walks.append(max_bytes)
+        return evict_lru(root, max_bytes)
+
+    monkeypatch.setattr(swap_cache, "evict_lru", counting_evict_lru)
+    probe = SwapCache(str(tmp_path / "probe"))
+    probe.put("swaps", 0, partition(20))
+    walks.clear()
+
+    cache = SwapCache(str(tmp_path / "cache"), max_bytes=probe.total_bytes * 10)
+    for hour in range(9):
+        cache.put("swaps", hour, partition(20))
+    cache.put("swaps", 4, partition(20))  # Rewriting a partition replaces its size
+    assert walks == [cache.max_bytes]  # Only the first write measures the tree
+    assert cache.total_bytes == tree_bytes(tmp_path / "cache")
+
+    # Outgrowing the limit evicts the oldest partitions down to EVICT_TO_FRACTION of it, which
+    # leaves room for the next writes
+    cache.put("swaps", 9, partition(20))
+    cache.put("swaps", 10, partition(20))
+    assert walks[1:] == [int(cache.max_bytes * swap_cache.EVICT_TO_FRACTION)]
+    assert cache.total_bytes == tree_bytes(tmp_path / "cache") == 9 * probe.total_bytes
+    cache.put("swaps", 11, partition(20))
+    assert len(walks) == 2 and cache.total_bytes == tree_bytes(tmp_path / "cache")
+    assert cache.get("swaps", 0) is None and cache.get("swaps", 1) is None and cache.get("swaps", 4) is not None
@@ -0,0 +1,15 @@
+from wallet_profit_loss import RANGE_SWAPS_QUERY, SWAPS_QUERY, UNIVERSE_SWAPS_QUERY
+
+
+def placeholders(query):
+    return query.replace("%%", "").count("%s")
+
+
+def test_swap_query_variants_keep_their_filters_and_parameters():
+    assert placeholders(SWAPS_QUERY) == 3  # (wallets, start, limit)
+    assert "= ANY(%s)" in SWAPS_QUERY and "created_at < %s" not in SWAPS_QUERY
+    assert placeholders(RANGE_SWAPS_QUERY) == 4  # (wallets, start, end, limit)
+    assert "date_trunc('hour', ht.created_at)" in RANGE_SWAPS_QUERY and "ORDER BY ranked" not in RANGE_SWAPS_QUERY
+    assert placeholders(UNIVERSE_SWAPS_QUERY) == 3  # (slice start, slice end, limit)
+    assert "ANY(" not in UNIVERSE_SWAPS_QUERY and "LIKE 'G%%'" in UNIVERSE_SWAPS_QUERY
+    assert 'ORDER BY ranked.source_account COLLATE "C", ranked.swap_rank' in UNIVERSE_SWAPS_QUERY
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+import wallet_rankings
+from window_aggregates import HourlyRingBuffer, hour_number, hour_start
+
+NOW = datetime.now(timezone.utc)
+CURRENT_HOUR = hour_number(NOW)
+
+
+def totals_of(ring, hours, now=NOW):
+    return {account: tuple(totals) for account, totals in ring.window_totals(hours, now).items()}
+
+
+def test_slots_rotate_across_hour_gaps():
+    ring = HourlyRingBuffer(3)
+    for hour in (CURRENT_HOUR - 4, CURRENT_HOUR - 3, CURRENT_HOUR - 2):
+        ring.add(hour_start(hour), "GA", 1, 10.0)
+    # Hour CURRENT_HOUR - 1 had no swaps; the current hour recycles the slot of CURRENT_HOUR - 3
+    ring.add(NOW, "GB", 2, 5.0)
+    assert totals_of(ring, 3) == {"GA": (1, 10.0), "GB": (2, 5.0)}  # Only CURRENT_HOUR - 2 of GA's hours
+    assert totals_of(ring, 1) == {"GB": (2, 5.0)}
+    # Buckets are only summed for the hour they hold: a slot left over from a full lap ago is skipped
+    assert totals_of(ring, 3, now=NOW + timedelta(hours=3)) == {}
+
+
+def test_capacity_bounds_ingestion_and_windows():
+    ring = HourlyRingBuffer(169)
+    ring.add(hour_start(CURRENT_HOUR - 169), "GA", 1, 1.0, current_hour=CURRENT_HOUR)  # One hour too old
+    ring.add(hour_start(CURRENT_HOUR - 168), "GA", 2, 2.0, current_hour=CURRENT_HOUR)
+    ring.add(NOW, "GA", 3, 3.0, current_hour=CURRENT_HOUR)
+    ring.add(NOW, "GA", 4, None, current_hour=CURRENT_HOUR)  # NULL volume counts as 0
+    assert totals_of(ring, 169) == {"GA": (9, 5.0)}
+    assert totals_of(ring, 168) == {"GA": (7, 3.0)}
+    with pytest.raises(ValueError):
+        ring.window_totals(170)
+
+
+def test_ring_round_trips_through_dict():
+    ring = HourlyRingBuffer(5)
+    for offset in range(8):
+        ring.add(hour_start(CURRENT_HOUR - offset), f"G{offset % 3}", offset + 1, offset * 0.5)
+    restored = HourlyRingBuffer.from_dict(ring.to_dict())
+    assert restored.slot_hours == ring.slot_hours and restored.slots == ring.slots
+    # A smaller capacity keeps the newest hours
+    shrunk = HourlyRingBuffer.from_dict(ring.to_dict(), capacity=2)
+    assert totals_of(shrunk, 2) == totals_of(ring, 2)
+
+
+# Synthetic Horizon swaps: (operation id, account, created_at, volume); ids grow with time like TOIDs
+def swap_history(hours, start_id=1):
+    swaps = []
+    for i in range(hours * 12):
+        created_at = NOW - timedelta(minutes=5 * i)
+        swaps.append((start_id + hours * 12 - i, f"G{i * 7 % 11:02d}", created_at, (i % 9) * 0.5))
+    return swaps
+
+
+# Stand-in for horizon_db.run_query answering hourly_swaps_query() over `swaps`
+def hourly_aggregates(swaps):
+    def run_query(query, params):
+        if "ho.id > %s" in query:
+            last_operation_id, start = params
+            matches = [swap for swap in swaps if swap[0] > last_operation_id and swap[2] >= start]
+        else:
+            high_water_mark, start, end = params
+            matches = [swap for swap in swaps if swap[0] <= high_water_mark and start <= swap[2] < end]
+        groups = {}
+        for operation_id, account, created_at, volume in matches:
+            bucket = hour_start(hour_number(created_at))
+            group = groups.setdefault((account, bucket), [0, 0.0, 0])
+            group[0] += 1
+            group[1] += volume
+            group[2] = max(group[2], operation_id)
+        return sorted(((account, bucket, *group) for (account, bucket), group in groups.items()),
+                      key=lambda row: row[1])
+    return run_query
+
+
+# fetch_swaps()-style ranking of the same swaps over the N to N+1 hours rank_window() covers
+def reference_rankings(swaps, hours, min_swaps=1):
+    window_start = hour_start(CURRENT_HOUR - hours)
+    totals = {}
+    for _, account, created_at, volume in swaps:
+        if created_at >= window_start:
+            account_totals = totals.setdefault(account, [0, 0.0])
+            account_totals[0] += 1
+            account_totals[1] += volume
+    return sorted(({"source_account": account, "num_swaps": num_swaps, "total_volume_xlm": total_volume_xlm}
+                   for account, (num_swaps, total_volume_xlm) in totals.items() if num_swaps >= min_swaps),
+                  key=lambda x: (-x["num_swaps"], x["source_account"]))
+
+
+def test_incremental_runs_match_a_full_aggregation(tmp_path, monkeypatch):
+    state_path = str(tmp_path / "state.json")
+    swaps = swap_history(60)
+    monkeypatch.setattr(wallet_rankings, "run_query", hourly_aggregates(swaps))
+    windows = [wallet_rankings.WINDOW_HOURS, 6, 1]
+
+    # A cold run scans the ranking window, then backfills BACKFILL_HOURS_PER_RUN older hours
+    first = wallet_rankings.fetch_swaps_incremental(windows, state_path, min_swaps=1, limit=None)
+    assert first == {hours: reference_rankings(swaps, hours) for hours in windows}
+    state = wallet_rankings.load_ingest_state(state_path)
+    assert state["last_operation_id"] == max(swap[0] for swap in swaps)
+    backfilled_hours = wallet_rankings.WINDOW_HOURS + wallet_rankings.BACKFILL_HOURS_PER_RUN
+    assert state["covered_from_hour"] == CURRENT_HOUR - backfilled_hours
+
+    # New swaps past the high-water mark are added once, and the backfilled hours answer wider windows
+    swaps += [(state["last_operation_id"] + i, f"G{i:02d}", NOW, 1.5) for i in range(1, 4)]
+    windows.append(backfilled_hours)
+    second = wallet_rankings.fetch_swaps_incremental(windows, state_path, min_swaps=1, limit=None)
+    assert second == {hours: reference_rankings(swaps, hours) for hours in windows}
+
+    # The saved state reloads into the same rankings, and a run without new swaps changes nothing
+    reloaded = wallet_rankings.load_ingest_state(state_path)
+    for hours in windows:
+        assert wallet_rankings.rank_window(reloaded["ring"], hours, min_swaps=1, limit=None) == second[hours]
+    assert wallet_rankings.fetch_swaps_incremental(windows, state_path, min_swaps=1, limit=None) == second
+    assert wallet_rankings.load_ingest_state(state_path)["last_operation_id"] == reloaded["last_operation_id"]
+
+
+def test_gap_longer_than_the_window_starts_over(tmp_path, monkeypatch):
+    state_path = str(tmp_path / "state.json")
+    swaps = swap_history(60)
+    monkeypatch.setattr(wallet_rankings, "run_query", hourly_aggregates(swaps))
+    state = wallet_rankings.load_ingest_state(state_path)
+    state["ring"].add(hour_start(CURRENT_HOUR - 100), "GOLD", 50, 1.0)
+    state.update(last_operation_id=10**9, covered_from_hour=CURRENT_HOUR - 140, ingested_hour=CURRENT_HOUR - 100)
+    wallet_rankings.save_ingest_state(state, state_path)
+
+    rankings = wallet_rankings.fetch_swaps_incremental([wallet_rankings.WINDOW_HOURS], state_path, min_swaps=1,
+                                                       limit=None)
+    assert rankings[wallet_rankings.WINDOW_HOURS] == reference_rankings(swaps, wallet_rankings.WINDOW_HOURS)
+    ring = wallet_rankings.load_ingest_state(state_path)["ring"]
+    assert "GOLD" not in ring.window_totals(ring.capacity)
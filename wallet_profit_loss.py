@@ -1,103 +1,454 @@
 import json
-import psycopg
+import numpy as np
 from datetime import datetime, timedelta, timezone
 from multiprocessing import Pool, cpu_count
+import argparse
+import heapq
+import math
+from collections import deque
+from copy_extract import copy_rows
+from dictionary_encoding import ACCOUNTS, PAIRS
+from horizon_db import POOL_MAX_SIZE, connect, iter_query_results, run_queries
+from swap_cache import (SwapCache, columns_to_rows, hour_start, rows_to_columns, rows_with_utc, split_window,
+                        text_column_ids)
+from window_aggregates import as_utc, hour_number
+from pnl_engine import RoundTripMatcher
+from pnl_pool import analyze_wallet_batches
+from swap_records import SwapList, SwapRecord, intern_asset
 
-# Database connection parameters
-DB_HOST = "horizon.cz2imkksk7b4.us-west-1.rds.amazonaws.com"
-DB_PORT = 5434
-DB_NAME = "horizon"
-DB_USER = "stellar"
-DB_PASS = "new_stellar_pass"
-
-# Connect to the PostgreSQL database
-def get_db_connection():
-    return psycopg.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS,
-        connect_timeout=300,
-        sslmode="require"
+# Swap history window analyzed per wallet
+WINDOW_HOURS = 48
+
+# Swap query text shared by the batch, range and universe variants below: the swaps of the
+# accounts matching `account_condition` with created_at >= %s (and < %s when `bounded`), cut to
+# each wallet's newest %s (per wallet and hour when `per_hour`, which also returns the operation
+# id), in SWAPS_QUERY column layout, ordered by `order_by` when given.
+# The per-wallet limit is applied server-side with ROW_NUMBER(), so whale accounts only send
+# their newest `limit_per_wallet` swaps; jsonb fields are extracted after the cut.
+def build_swaps_query(account_condition, bounded=False, per_hour=False, order_by=None):
+    operation_id = ",\n    ranked.operation_id" if per_hour else ""
+    inner_operation_id = "\n        ho.id as operation_id," if per_hour else ""
+    partition = "ho.source_account, date_trunc('hour', ht.created_at)" if per_hour else "ho.source_account"
+    end_condition = "\n        AND ht.created_at < %s" if bounded else ""
+    order = f"\nORDER BY {order_by}" if order_by else ""
+    return f"""
+SELECT
+    ranked.source_account,
+    ranked.type,
+    ranked.details->>'source_asset_type' as source_asset_type,
+    ranked.details->>'source_asset_code' as source_asset_code,
+    ranked.details->>'source_asset_issuer' as source_asset_issuer,
+    ranked.details->>'source_amount' as source_amount,
+    ranked.details->>'asset_type' as asset_type,
+    ranked.details->>'asset_code' as asset_code,
+    ranked.details->>'asset_issuer' as asset_issuer,
+    ranked.details->>'amount' as amount,
+    ranked.created_at{operation_id}
+FROM (
+    SELECT
+        ho.source_account,
+        ho.type,
+        ho.details,
+        ht.created_at,{inner_operation_id}
+        ROW_NUMBER() OVER (
+            PARTITION BY {partition}
+            ORDER BY ht.created_at DESC, ho.id DESC
+        ) as swap_rank
+    FROM history_operations ho
+    JOIN history_transactions ht ON ho.transaction_id = ht.id
+    WHERE
+        ho.type IN (2, 13, 24)
+        AND ht.successful = true
+        AND ho.source_account {account_condition}
+        AND ht.created_at >= %s{end_condition}
+) ranked
+WHERE ranked.swap_rank <= %s{order};
+"""
+
+# Swap query for a batch of wallets (rows come back grouped by wallet, newest first).
+# The wallet set is a single text[] parameter, so the statement text never changes with the
+# batch size and Postgres can reuse one prepared plan for every batch.
+# Parameters are (wallets, start, limit_per_wallet).
+SWAPS_QUERY = build_swaps_query("= ANY(%s)", order_by="ranked.source_account, ranked.swap_rank")
+
+# Wallets per query; one batch covers the whole 1000-wallet ranking in a single round trip.
+# Re-tune with bench_batch_size.py against the production database.
+BATCH_SIZE = 1000
+
+# SWAPS_QUERY over every G-account of one time slice [slice_start, slice_end) instead of a
+# wallet batch, for full-universe rankings: a few slice scans replace hundreds of
+# `= ANY(wallets)` batch queries. Parameters are (slice_start, slice_end, limit_per_wallet); rows
+# come back grouped by wallet in byte order (COLLATE "C", like Python's str order), newest first.
+UNIVERSE_SWAPS_QUERY = build_swaps_query("LIKE 'G%%' ESCAPE ''", bounded=True,
+                                         order_by='ranked.source_account COLLATE "C", ranked.swap_rank')
+
+# Rankings with at least this many wallets are analyzed from UNIVERSE_SWAPS_QUERY scans,
+# streamed through server-side cursors in UNIVERSE_ITERSIZE-row chunks. The window is split
+# into UNIVERSE_SLICE_HOURS slices so no single statement scans (and sorts) the whole window
+# under the pool's statement_timeout. Every slice holds its own connection for the whole scan,
+# so there are never more slices than horizon_db's POOL_MAX_SIZE connection budget (slices get
+# longer instead).
+FULL_SCAN_MIN_WALLETS = 20_000
+UNIVERSE_ITERSIZE = 20_000
+UNIVERSE_SLICE_HOURS = 6
+
+# Output columns of SWAPS_QUERY with the types the binary COPY backend decodes them into
+SWAP_COLUMN_TYPES = [
+    ("source_account", "text"),
+    ("type", "int4"),
+    ("source_asset_type", "text"),
+    ("source_asset_code", "text"),
+    ("source_asset_issuer", "text"),
+    ("source_amount", "float8"),
+    ("asset_type", "text"),
+    ("asset_code", "text"),
+    ("asset_issuer", "text"),
+    ("amount", "float8"),
+    ("created_at", "timestamptz"),
+]
+
+# Swap query for a time range [start, end) used to fill the local swap cache. The per-wallet
+# limit is applied per hour, so every cached hour holds each wallet's newest swaps in that hour;
+# the newest `limit_per_wallet` swaps of any window are always contained in those partitions.
+RANGE_SWAPS_QUERY = build_swaps_query("= ANY(%s)", bounded=True, per_hour=True)
+
+# Column layout of cached swap partitions (RANGE_SWAPS_QUERY output)
+CACHED_SWAP_SCHEMA = [
+    ("source_account", "text"),
+    ("type", "int"),
+    ("source_asset_type", "text"),
+    ("source_asset_code", "text"),
+    ("source_asset_issuer", "text"),
+    ("source_amount", "float"),
+    ("asset_type", "text"),
+    ("asset_code", "text"),
+    ("asset_issuer", "text"),
+    ("amount", "float"),
+    ("created_at", "timestamp"),
+    ("operation_id", "int"),
+]
+SWAP_CACHE_NAMESPACE = "wallet_swaps"
+
+# Convert a swap query row into the compact SwapRecord used by estimate_pnl_for_wallet
+def row_to_swap(row):
+    return SwapRecord(
+        row[1],
+        intern_asset(row[2], row[3], row[4]),
+        float(row[5]) if row[5] else 0.0,
+        intern_asset(row[6], row[7], row[8]),
+        float(row[9]) if row[9] else 0.0,
+        row[10]
     )
 
+# Fetch swap rows for one batch through the selected extraction backend:
+# "cursor" (regular row protocol, text amounts) or "copy" (binary COPY, typed amounts)
+def fetch_swap_rows(conn, params, extract="cursor"):
+    if extract == "copy":
+        return list(copy_rows(conn, SWAPS_QUERY, params, SWAP_COLUMN_TYPES))
+    with conn.cursor() as cursor:
+        # Prepared after first use: the statement text is the same for every batch
+        cursor.execute(SWAPS_QUERY, params, prepare=True)
+        return cursor.fetchall()
+
+# SWAPS_QUERY statement for one batch, for horizon_db (column types select the COPY backend)
+def swaps_statement(params, extract="cursor"):
+    if extract == "copy":
+        return (SWAPS_QUERY, params, SWAP_COLUMN_TYPES)
+    return (SWAPS_QUERY, params)
+
+# RANGE_SWAPS_QUERY statement for [range_start, range_end), for horizon_db
+def range_swaps_statement(wallets, range_start, range_end, limit_per_wallet, extract="cursor"):
+    params = (wallets, range_start, range_end, limit_per_wallet)
+    if extract == "copy":
+        return (RANGE_SWAPS_QUERY, params, SWAP_COLUMN_TYPES + [("operation_id", "int8")])
+    return (RANGE_SWAPS_QUERY, params)
+
+# Cache-first variant of fetch_swap_rows(): whole past hours come from the local swap cache and
+# only missing (hour, wallet) combinations plus the partial hours at the window edges are queried,
+# all of them concurrently. Returns rows in SWAPS_QUERY layout, grouped by wallet, newest first,
+# cut to limit_per_wallet.
+def fetch_swap_rows_cached(cache, wallets, start_time, limit_per_wallet, extract="cursor"):
+    end_time = datetime.now(timezone.utc)
+    hours, edges = split_window(start_time, end_time)
+    # Wallet sets are handled as run-wide account ids (ACCOUNTS)
+    wanted_ids = ACCOUNTS.encode_all(wallets)
+    wanted = set(wanted_ids.tolist())
+    rows = []
+
+    # Read cached hours and work out which wallets each hour is still missing
+    partitions = {}
+    missing_by_hour = {}
+    for hour in hours:
+        partition = cache.get(SWAP_CACHE_NAMESPACE, hour)
+        if partition is not None and int(partition["limit_per_wallet"]) == limit_per_wallet:
+            covered = set(ACCOUNTS.encode_all(partition["wallets"].tolist()).tolist())
+            account_ids = text_column_ids(partition, "source_account", ACCOUNTS)
+            rows.extend(columns_to_rows(partition, CACHED_SWAP_SCHEMA, np.isin(account_ids, wanted_ids)))
+        else:
+            partition, covered = None, set()
+        partitions[hour] = (partition, covered)
+        if wanted - covered:
+            missing_by_hour[hour] = frozenset(wanted - covered)
+
+    # Query runs of consecutive hours that miss the same wallets in one range each
+    runs = []
+    for hour in sorted(missing_by_hour):
+        if runs and runs[-1][1] == hour - 1 and missing_by_hour[runs[-1][0]] == missing_by_hour[hour]:
+            runs[-1][1] = hour
+        else:
+            runs.append([hour, hour])
+    if runs:
+        print(f"Swap cache: {len(hours) - len(missing_by_hour)}/{len(hours)} hours fully cached, "
+              f"querying {len(runs)} missing range(s)")
+
+    # Missing ranges and the partial hours at the window edges (never cached) are independent
+    statements = [
+        range_swaps_statement(sorted(ACCOUNTS.decode_all(missing_by_hour[first_hour])), hour_start(first_hour),
+                              hour_start(last_hour + 1), limit_per_wallet, extract)
+        for first_hour, last_hour in runs
+    ] + [
+        range_swaps_statement(wallets, edge_start, edge_end, limit_per_wallet, extract)
+        for edge_start, edge_end in edges
+    ]
+    fetched_ranges = [rows_with_utc(fetched, 10) for fetched in run_queries(statements)]
+    for fetched in fetched_ranges[len(runs):]:
+        rows.extend(fetched)
+
+    for (first_hour, last_hour), fetched in zip(runs, fetched_ranges):
+        missing = missing_by_hour[first_hour]
+        rows.extend(fetched)
+        fetched_by_hour = {hour: [] for hour in range(first_hour, last_hour + 1)}
+        for row in fetched:
+            fetched_by_hour[hour_number(row[10])].append(row)
+
+        # Merge into the hour partitions (keeping rows cached for other wallet sets)
+        for hour, hour_rows in fetched_by_hour.items():
+            partition, covered = partitions[hour]
+            if partition is not None:
+                hour_rows = columns_to_rows(partition, CACHED_SWAP_SCHEMA) + hour_rows
+            arrays = rows_to_columns(hour_rows, CACHED_SWAP_SCHEMA)
+            arrays["wallets"] = np.array(sorted(ACCOUNTS.decode_all(covered | missing)), dtype=np.str_)
+            arrays["limit_per_wallet"] = np.array(limit_per_wallet)
+            cache.put(SWAP_CACHE_NAMESPACE, hour, arrays)
+
+
+    # Same order and per-wallet cut as SWAPS_QUERY; drop the operation id column
+    rows = [row for row in rows if row[10] >= as_utc(start_time)]
+    rows.sort(key=lambda row: (row[10], row[11]), reverse=True)
+    rows.sort(key=lambda row: row[0])
+    limited_rows = []
+    current_wallet = None
+    wallet_count = 0
+    for row in rows:
+        if row[0] != current_wallet:
+            current_wallet = row[0]
+            wallet_count = 0
+        if wallet_count < limit_per_wallet:
+            limited_rows.append(row[:11])
+            wallet_count += 1
+    return limited_rows
+
+# Group SWAPS_QUERY-layout rows (grouped by wallet) into {wallet: SwapList}, cut to the limit
+def group_swaps_by_wallet(rows, limit_per_wallet):
+    swaps_by_wallet = {}
+    current_wallet = None
+    wallet_swaps = SwapList()
+    swap_count = 0
+    for row in rows:
+        wallet = row[0]
+        if wallet != current_wallet:
+            if current_wallet:
+                swaps_by_wallet[current_wallet] = wallet_swaps
+            current_wallet = wallet
+            wallet_swaps = SwapList()
+            swap_count = 0
+        if swap_count < limit_per_wallet:
+            wallet_swaps.append(row_to_swap(row))
+            swap_count += 1
+    # Add the last wallet's swaps
+    if current_wallet:
+        swaps_by_wallet[current_wallet] = wallet_swaps
+    return swaps_by_wallet
+
+# Fetch swaps for all wallets in batches, yielding (batch_wallets, swaps_by_wallet) as each
+# batch completes so callers can start analyzing before the remaining batches are fetched.
+# Batches are queried concurrently on the shared connection pool and yielded in completion order
+# (cache: optional SwapCache consulted before Postgres)
+def iter_swap_batches(wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE, extract="cursor", cache=None):
+    start_time = datetime.now(timezone.utc) - timedelta(hours=WINDOW_HOURS)
+    total_wallets = len(wallet_addresses)
+    batches = [wallet_addresses[batch_start:batch_start + batch_size]
+               for batch_start in range(0, total_wallets, batch_size)]
+
+    if cache is not None:
+        # Each cached batch already runs its missing ranges concurrently
+        for batch_wallets in batches:
+            print(f"Fetching swaps for {len(batch_wallets)} wallets (cache first)...")
+            rows = fetch_swap_rows_cached(cache, batch_wallets, start_time, limit_per_wallet, extract)
+            yield batch_wallets, group_swaps_by_wallet(rows, limit_per_wallet)
+        return
+
+    # Execute each batch with its wallets as one array parameter
+    print(f"Fetching swaps for {total_wallets} wallets in {len(batches)} concurrent batch(es)...")
+    statements = [swaps_statement((batch_wallets, start_time, limit_per_wallet), extract)
+                  for batch_wallets in batches]
+    for index, rows in iter_query_results(statements):
+        batch_start = index * batch_size
+        print(f"Fetched swaps for wallets {batch_start + 1} to {batch_start + len(batches[index])}/{total_wallets}")
+        yield batches[index], group_swaps_by_wallet(rows, limit_per_wallet)
+
 # Fetch swaps for all wallets in batches
-def fetch_swaps_for_all_wallets(wallet_addresses, limit_per_wallet=200, batch_size=100):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# (cache: optional SwapCache consulted before Postgres)
+def fetch_swaps_for_all_wallets(wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE, extract="cursor",
+                                cache=None):
     swaps_by_wallet = {}
+    for _, batch_swaps in iter_swap_batches(wallet_addresses, limit_per_wallet, batch_size, extract, cache):
+        swaps_by_wallet.update(batch_swaps)
+    return swaps_by_wallet
+
+# Cut a wallet-grouped stream of SWAPS_QUERY-layout rows into (batch_wallets, swaps_by_wallet)
+# batches of up to batch_size wanted wallets, skipping rows of other wallets. Wanted wallets
+# without any rows follow in batches of empty histories, so every wallet gets a P&L result.
+def batch_swap_rows(rows, wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE):
+    wanted = set(wallet_addresses)
+    seen = set()
+    batch = {}
+    current_wallet = None
+    wallet_swaps = None
+    for row in rows:
+        wallet = row[0]
+        if wallet != current_wallet:
+            current_wallet = wallet
+            wallet_swaps = None
+            if wallet in wanted:
+                if len(batch) >= batch_size:
+                    yield list(batch), batch
+                    batch = {}
+                wallet_swaps = batch[wallet] = SwapList()
+                seen.add(wallet)
+        if wallet_swaps is not None and len(wallet_swaps) < limit_per_wallet:
+            wallet_swaps.append(row_to_swap(row))
+    if batch:
+        yield list(batch), batch
 
-    start_time = datetime.now(timezone.utc) - timedelta(hours=48)
+    missing = [wallet for wallet in wallet_addresses if wallet not in seen]
+    for batch_start in range(0, len(missing), batch_size):
+        yield missing[batch_start:batch_start + batch_size], {}
+
+# Full-universe variant of iter_swap_batches(): every wallet's swaps in the window streamed
+# through one named cursor per time slice and cut into batches as the rows arrive, so memory
+# stays bounded by one fetch chunk per slice plus the batches the P&L workers have not picked up.
+# The window is cut into equal slices of at most slice_hours, but never into more than
+# POOL_MAX_SIZE slices, since each holds a connection open. The slice streams are merged on the
+# account, newest slice first (heapq.merge is stable), so each account's rows stay newest
+# first and batch_swap_rows() keeps its newest limit_per_wallet swaps of the whole window.
+def iter_universe_swap_batches(wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE,
+                               itersize=UNIVERSE_ITERSIZE, slice_hours=UNIVERSE_SLICE_HOURS):
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(hours=WINDOW_HOURS)
+    num_slices = min(math.ceil(WINDOW_HOURS / slice_hours), POOL_MAX_SIZE)
+    slice_length = (end_time - start_time) / num_slices
+    # Newest slice first; the oldest one starts exactly at the window start
+    slices = [(end_time - slice_length * (i + 1), end_time - slice_length * i) for i in range(num_slices)]
+    slices[-1] = (start_time, slices[-1][1])
+    print(f"Streaming swaps of all accounts for {len(wallet_addresses)} ranked wallets "
+          f"in {len(slices)} time slices...")
+
+    conns = []
+    try:
+        streams = []
+        for index, (slice_start, slice_end) in enumerate(slices):
+            conn = connect()
+            conns.append(conn)
+            cursor = conn.cursor(name=f"universe_swap_stream_{index}")
+            cursor.itersize = itersize
+            cursor.execute(UNIVERSE_SWAPS_QUERY, (slice_start, slice_end, limit_per_wallet))
+            streams.append(cursor)
+        rows = heapq.merge(*streams, key=lambda row: row[0])
+        yield from batch_swap_rows(rows, wallet_addresses, limit_per_wallet, batch_size)
+    finally:
+        for conn in conns:
+            conn.close()
+
+# Stream swaps wallet by wallet through a named (server-side) cursor instead of fetchall().
+# Yields (wallet, swaps) as soon as a wallet's rows are complete, so only one wallet's swaps
+# plus one fetch chunk are held here at a time.
+def stream_swaps_by_wallet(wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE, itersize=2000):
+    conn = connect()
+    start_time = datetime.now(timezone.utc) - timedelta(hours=WINDOW_HOURS)
     total_wallets = len(wallet_addresses)
 
-    # Process wallets in batches
-    for batch_start in range(0, total_wallets, batch_size):
-        batch_end = min(batch_start + batch_size, total_wallets)
-        batch_wallets = wallet_addresses[batch_start:batch_end]
-        print(f"Fetching swaps for wallets {batch_start + 1} to {batch_end}/{total_wallets}...")
-
-        # Create placeholders for the IN clause
-        placeholders = ",".join(["%s"] * len(batch_wallets))
-        query = f"""
-        SELECT
-            ho.source_account,
-            ho.type,
-            ho.details->>'source_asset_type' as source_asset_type,
-            ho.details->>'source_asset_code' as source_asset_code,
-            ho.details->>'source_asset_issuer' as source_asset_issuer,
-            ho.details->>'source_amount' as source_amount,
-            ho.details->>'asset_type' as asset_type,
-            ho.details->>'asset_code' as asset_code,
-            ho.details->>'asset_issuer' as asset_issuer,
-            ho.details->>'amount' as amount,
-            ht.created_at
-        FROM history_operations ho
-        JOIN history_transactions ht ON ho.transaction_id = ht.id
-        WHERE
-            ho.type IN (2, 13, 24)
-            AND ht.successful = true
-            AND ho.source_account IN ({placeholders})
-            AND ht.created_at >= %s
-        ORDER BY ho.source_account, ht.created_at DESC;
-        """
-        # Execute with the batch of wallets and start_time
-        cursor.execute(query, (*batch_wallets, start_time))
-        results = cursor.fetchall()
-
-        # Group results by wallet
-        current_wallet = None
-        wallet_swaps = []
-        swap_count = 0
-        for row in results:
-            wallet = row[0]
-            if wallet != current_wallet:
+    try:
+        for batch_start in range(0, total_wallets, batch_size):
+            batch_end = min(batch_start + batch_size, total_wallets)
+            batch_wallets = wallet_addresses[batch_start:batch_end]
+            print(f"Streaming swaps for wallets {batch_start + 1} to {batch_end}/{total_wallets}...")
+
+            with conn.cursor(name="swap_stream") as cursor:
+                cursor.itersize = itersize
+                cursor.execute(SWAPS_QUERY, (batch_wallets, start_time, limit_per_wallet))
+
+                current_wallet = None
+                wallet_swaps = SwapList()
+                for row in cursor:
+                    wallet = row[0]
+                    if wallet != current_wallet:
+                        if current_wallet:
+                            yield current_wallet, wallet_swaps
+                        current_wallet = wallet
+                        wallet_swaps = SwapList()
+                    if len(wallet_swaps) < limit_per_wallet:
+                        wallet_swaps.append(row_to_swap(row))
                 if current_wallet:
-                    swaps_by_wallet[current_wallet] = wallet_swaps[:limit_per_wallet]
-                current_wallet = wallet
-                wallet_swaps = []
-                swap_count = 0
-            if swap_count < limit_per_wallet:
-                wallet_swaps.append({
-                    "type": row[1],
-                    "source_asset_type": row[2],
-                    "source_asset_code": row[3] if row[2] != "native" else "XLM",
-                    "source_asset_issuer": row[4],
-                    "source_amount": float(row[5]) if row[5] else 0.0,
-                    "asset_type": row[6],
-                    "asset_code": row[7] if row[6] != "native" else "XLM",
-                    "asset_issuer": row[8],
-                    "amount": float(row[9]) if row[9] else 0.0,
-                    "closed_at": row[10]
-                })
-                swap_count += 1
-        # Add the last wallet's swaps
-        if current_wallet:
-            swaps_by_wallet[current_wallet] = wallet_swaps[:limit_per_wallet]
+                    yield current_wallet, wallet_swaps
+            conn.commit()  # Close the server-side cursor's transaction
+    finally:
+        conn.close()
 
-    cursor.close()
-    conn.close()
-    return swaps_by_wallet
+# Analyze P&L while swaps are still streaming in: each completed wallet goes straight to the
+# worker pool. Tasks are submitted from this thread, and once max_in_flight wallets are queued
+# ahead of the workers it waits for the oldest result before reading more rows, so the stream
+# is never drained faster than the workers keep up. A worker error surfaces from that wait,
+# and leaving the Pool block then terminates the workers.
+def analyze_wallets_streaming(wallets, limit_per_wallet=200, batch_size=BATCH_SIZE, max_in_flight=None):
+    wallets_by_address = {wallet["source_account"]: wallet for wallet in wallets}
+    processes = cpu_count()
+    max_in_flight = max_in_flight or processes * 4
+    addresses = [wallet["source_account"] for wallet in wallets]
+
+    results_by_address = {}
+    with Pool(processes=processes) as pool:
+        pending = deque()
+        for wallet_address, swaps in stream_swaps_by_wallet(addresses, limit_per_wallet, batch_size):
+            wallet = wallets_by_address.get(wallet_address)
+            if wallet is None:
+                continue
+            if len(pending) >= max_in_flight:
+                result = pending.popleft().get()
+                results_by_address[result["source_account"]] = result
+            pending.append(pool.apply_async(estimate_pnl_for_wallet, ({
+                "source_account": wallet_address,
+                "num_swaps": wallet["num_swaps"],
+                "total_volume_xlm": wallet["total_volume_xlm"],
+                "swaps": swaps
+            },)))
+        while pending:
+            result = pending.popleft().get()
+            results_by_address[result["source_account"]] = result
+
+    # Wallets without swaps in the window never appear in the stream
+    pnl_results = []
+    for wallet in wallets:
+        result = results_by_address.get(wallet["source_account"])
+        if result is None:
+            result = estimate_pnl_for_wallet({
+                "source_account": wallet["source_account"],
+                "num_swaps": wallet["num_swaps"],
+                "total_volume_xlm": wallet["total_volume_xlm"],
+                "swaps": []
+            })
+        pnl_results.append(result)
+    return pnl_results
 
 # Function to estimate P&L for a single wallet (for parallel processing)
 def estimate_pnl_for_wallet(wallet_data):
@@ -122,39 +473,37 @@ def estimate_pnl_for_wallet(wallet_data):
         }
 
     # Sort swaps by timestamp (ascending)
-    swaps.sort(key=lambda x: x["closed_at"])
+    swaps.sort(key=lambda x: x.closed_at)
 
     # Track XLM balance changes and asset pairs
     xlm_balance = 0.0
     fee_per_swap = 0.00001  # 100 stroops per operation
     num_swaps_analyzed = len(swaps)
-    asset_pairs = set()
+    asset_pairs = set()  # Pair ids, decoded when the result is returned
 
     # Track round-trips for P&L calculation
     round_trips = []
-    pending_trades = {}  # {asset_key: [(amount, xlm_amount)]}
+    pending_trades = {}  # {asset key id: RoundTripMatcher of (amount, xlm_amount)}
 
     for swap in swaps:
         # Record the asset pair
-        if swap["source_asset_type"] == "native":
-            pair = f"XLM/{swap['asset_code']}"
-            xlm_balance -= swap["source_amount"]
-            asset_key = f"{swap['asset_code']}_{swap['asset_issuer']}" if swap["asset_type"] != "native" else "XLM"
+        if swap.source_asset.native:
+            pair = swap.asset.buy_pair_id
+            xlm_balance -= swap.source_amount
+            asset_key = swap.asset.key_id
             if asset_key not in pending_trades:
-                pending_trades[asset_key] = []
-            pending_trades[asset_key].append((swap["amount"], swap["source_amount"]))
+                pending_trades[asset_key] = RoundTripMatcher()
+            pending_trades[asset_key].add(swap.amount, swap.source_amount)
         else:
-            pair = f"{swap['source_asset_code']}/XLM"
-            xlm_balance += swap["amount"]
-            asset_key = f"{swap['source_asset_code']}_{swap['source_asset_issuer']}" if swap["source_asset_type"] != "native" else "XLM"
-            if asset_key in pending_trades and pending_trades[asset_key]:
-                for i, (prev_amount, prev_xlm) in enumerate(pending_trades[asset_key]):
-                    if abs(prev_amount - swap["source_amount"]) < 0.01:
-                        slippage = 0.005  # 0.5% slippage per trade
-                        pnl_xlm = (swap["amount"] - prev_xlm) * (1 - slippage) - (2 * fee_per_swap)
-                        round_trips.append(pnl_xlm)
-                        pending_trades[asset_key].pop(i)
-                        break
+            pair = swap.source_asset.sell_pair_id
+            xlm_balance += swap.amount
+            asset_key = swap.source_asset.key_id
+            if asset_key in pending_trades:
+                prev_xlm = pending_trades[asset_key].match(swap.source_amount)
+                if prev_xlm is not None:
+                    slippage = 0.005  # 0.5% slippage per trade
+                    pnl_xlm = (swap.amount - prev_xlm) * (1 - slippage) - (2 * fee_per_swap)
+                    round_trips.append(pnl_xlm)
         asset_pairs.add(pair)
         xlm_balance -= fee_per_swap
 
@@ -172,16 +521,13 @@ def estimate_pnl_for_wallet(wallet_data):
             "avg_pnl_per_round_trip": avg_pnl,
             "net_xlm_change": xlm_balance,
             "num_swaps_analyzed": num_swaps_analyzed,
-            "asset_pairs": list(asset_pairs)
+            "asset_pairs": PAIRS.decode_all(asset_pairs)
         }
     }
 
-# Main script logic
-if __name__ == "__main__":
-    # Load the wallet rankings
-    with open("wallet_rankings.json", "r") as f:
-        wallet_rankings = json.load(f)
-
+# Estimate P&L for the ranked wallets (the wallet_rankings.json records); returns the
+# wallet_pnl.json records. cache is an optional SwapCache consulted before Postgres.
+def analyze_wallet_pnl(wallet_rankings, stream=False, extract="cursor", engine="numpy", cache=None):
     # Validate addresses in wallet_rankings
     wallet_rankings = [
         wallet for wallet in wallet_rankings
@@ -189,29 +535,74 @@ if __name__ == "__main__":
     ]
 
     # Select all wallets
-    wallets = wallet_rankings  # Already limited to 1,000 by the query
+    wallets = wallet_rankings  # The top 1,000 by default, every active account for full-universe rankings
     print(f"Selected {len(wallets)} wallets for P&L analysis.")
 
-    # Fetch swaps for all wallets
-    print("Fetching swaps for all wallets (including Soroban transactions)...")
-    wallet_addresses = [wallet["source_account"] for wallet in wallets]
-    swaps_by_wallet = fetch_swaps_for_all_wallets(wallet_addresses, limit_per_wallet=200, batch_size=100)
+    if stream:
+        # Fetch and analyze concurrently
+        print(f"Streaming swaps and analyzing P&L using {cpu_count()} CPU cores...")
+        pnl_results = analyze_wallets_streaming(wallets, limit_per_wallet=200, batch_size=BATCH_SIZE)
+    else:
+        # Fetch swaps for all wallets
+        print("Fetching swaps for all wallets (including Soroban transactions)...")
+        wallet_addresses = [wallet["source_account"] for wallet in wallets]
 
-    # Prepare data for parallel processing
-    wallet_data_list = []
-    for wallet in wallets:
-        wallet_address = wallet["source_account"]
-        wallet_data_list.append({
-            "source_account": wallet_address,
-            "num_swaps": wallet["num_swaps"],
-            "total_volume_xlm": wallet["total_volume_xlm"],
-            "swaps": swaps_by_wallet.get(wallet_address, [])
-        })
-
-    # Analyze P&L in parallel
-    print(f"Analyzing P&L for {len(wallet_data_list)} wallets using {cpu_count()} CPU cores...")
-    with Pool(processes=cpu_count()) as pool:
-        pnl_results = pool.map(estimate_pnl_for_wallet, wallet_data_list)
+        if engine == "numpy":
+            # Analyze each batch on the columnar engine as soon as it is fetched, on worker
+            # processes reading shared-memory columns (in-process for small workloads)
+            print(f"Analyzing P&L for {len(wallets)} wallets with the columnar engine...")
+            if len(wallets) >= FULL_SCAN_MIN_WALLETS:
+                if extract != "cursor" or cache is not None:
+                    print(f"Full-universe scan of {len(wallets)} wallets streams through server-side cursors: "
+                          f"ignoring --extract {extract}" + (" and the swap cache" if cache is not None else ""))
+                swap_batches = iter_universe_swap_batches(wallet_addresses, limit_per_wallet=200,
+                                                          batch_size=BATCH_SIZE)
+            else:
+                swap_batches = iter_swap_batches(wallet_addresses, limit_per_wallet=200, batch_size=BATCH_SIZE,
+                                                 extract=extract, cache=cache)
+            pnl_results = analyze_wallet_batches(wallets, swap_batches, limit_per_wallet=200)
+        else:
+            swaps_by_wallet = fetch_swaps_for_all_wallets(wallet_addresses, limit_per_wallet=200,
+                                                          batch_size=BATCH_SIZE, extract=extract, cache=cache)
+
+            # Prepare data for parallel processing
+            wallet_data_list = []
+            for wallet in wallets:
+                wallet_address = wallet["source_account"]
+                wallet_data_list.append({
+                    "source_account": wallet_address,
+                    "num_swaps": wallet["num_swaps"],
+                    "total_volume_xlm": wallet["total_volume_xlm"],
+                    "swaps": swaps_by_wallet.get(wallet_address, [])
+                })
+
+            # Analyze P&L in parallel
+            print(f"Analyzing P&L for {len(wallet_data_list)} wallets using {cpu_count()} CPU cores...")
+            with Pool(processes=cpu_count()) as pool:
+                pnl_results = pool.map(estimate_pnl_for_wallet, wallet_data_list)
+
+    return pnl_results
+
+# Main script logic
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate P&L for the ranked wallets")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream swaps through a server-side cursor and analyze wallets as they arrive")
+    parser.add_argument("--extract", choices=["cursor", "copy"], default="cursor",
+                        help="swap extraction backend: regular cursor or binary COPY")
+    parser.add_argument("--engine", choices=["numpy", "python"], default="numpy",
+                        help="P&L engine: columnar NumPy engine on shared-memory worker processes, "
+                             "or the per-wallet process pool")
+    parser.add_argument("--cache", action="store_true",
+                        help="read whole past hours from the local swap cache and only query missing ranges")
+    args = parser.parse_args()
+
+    # Load the wallet rankings
+    with open("wallet_rankings.json", "r") as f:
+        wallet_rankings = json.load(f)
+
+    pnl_results = analyze_wallet_pnl(wallet_rankings, stream=args.stream, extract=args.extract, engine=args.engine,
+                                     cache=SwapCache() if args.cache else None)
 
     # Archive the current wallet_pnl.json with a timestamp
     import os
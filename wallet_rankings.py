@@ -1,42 +1,41 @@
 import json
-import psycopg
 from datetime import datetime, timedelta, timezone
+import argparse
+import heapq
 import os
+from horizon_db import connect, run_queries, run_query
+from window_aggregates import HourlyRingBuffer, hour_number, hour_start
 
-# Database connection parameters
-DB_HOST = "horizon.cz2imkksk7b4.us-west-1.rds.amazonaws.com"
-DB_PORT = 5434
-DB_NAME = "horizon"
-DB_USER = "stellar"
-DB_PASS = "new_stellar_pass"
-
-# Connect to the PostgreSQL database
-conn = psycopg.connect(
-    host=DB_HOST,
-    port=DB_PORT,
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASS,
-    connect_timeout=300,
-    sslmode="require"
-)
-cursor = conn.cursor()
-
-# Fetch swaps for the last 36 hours
+# Ranking window and incremental ingestion state
+WINDOW_HOURS = 36
+INGEST_STATE_FILE = "wallet_rankings_state.json"
+RING_CAPACITY_HOURS = 169  # 168h (7 day) windows plus the partially filled current hour
+BACKFILL_HOURS_PER_RUN = 12  # Older hours filled per incremental run; each scan stays far below statement_timeout
+
+# Ranking universe: by default the top TOP_ACCOUNTS accounts with at least MIN_SWAPS swaps;
+# the full universe keeps every G-account with UNIVERSE_MIN_SWAPS swaps (hundreds of thousands)
+MIN_SWAPS = 5
+TOP_ACCOUNTS = 1000
+UNIVERSE_MIN_SWAPS = 1
+UNIVERSE_ITERSIZE = 50_000  # Aggregate rows per server-side cursor fetch
+
+# Fetch swaps for the last 36 hours.
+# Volumes are summed exactly as numeric and converted to float once, and ties are ordered by
+# account, so the result does not depend on the plan and fetch_swaps_parallel() reproduces it.
 def fetch_swaps():
-    start_time = datetime.now(timezone.utc) - timedelta(hours=36)
+    start_time = datetime.now(timezone.utc) - timedelta(hours=WINDOW_HOURS)
     query = """
     SELECT 
         ho.source_account,
         COUNT(*) as num_swaps,
         SUM(CASE 
-            WHEN ho.type = 2 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::float
-            WHEN ho.type = 2 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::float
-            WHEN ho.type = 13 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::float
-            WHEN ho.type = 13 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::float
+            WHEN ho.type = 2 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
+            WHEN ho.type = 2 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
             WHEN ho.type = 24 THEN 100.0  -- Placeholder for Soroban transactions
             ELSE 0
-        END) as total_volume_xlm
+        END)::float as total_volume_xlm
     FROM history_operations ho
     JOIN history_transactions ht ON ho.transaction_id = ht.id
     WHERE 
@@ -46,13 +45,10 @@ def fetch_swaps():
         AND ho.source_account LIKE 'G%%' ESCAPE ''
     GROUP BY ho.source_account
     HAVING COUNT(*) >= 5
-    ORDER BY num_swaps DESC
+    ORDER BY num_swaps DESC, ho.source_account COLLATE "C"
     LIMIT 1000;
     """
-    # Set a statement timeout to prevent hanging
-    cursor.execute("SET statement_timeout = '300s';")  # 5-minute timeout
-    cursor.execute(query, (start_time,))
-    results = cursor.fetchall()
+    results = run_query(query, (start_time,))
 
     wallet_rankings = []
     for row in results:
@@ -64,24 +60,324 @@ def fetch_swaps():
 
     return wallet_rankings
 
-# Main script logic
-if __name__ == "__main__":
-    print("Fetching swaps from Horizon PostgreSQL database...")
+# Full-universe variant of fetch_swaps(): no LIMIT, and the aggregate is sorted server-side and
+# read through a named (server-side) cursor, so hundreds of thousands of accounts stream in
+# UNIVERSE_ITERSIZE chunks instead of arriving as one result set. Ties are ordered by account
+# so repeated runs over the same data publish identical files.
+def fetch_swaps_universe(min_swaps=UNIVERSE_MIN_SWAPS, itersize=UNIVERSE_ITERSIZE):
+    start_time = datetime.now(timezone.utc) - timedelta(hours=WINDOW_HOURS)
+    query = """
+    SELECT
+        ho.source_account,
+        COUNT(*) as num_swaps,
+        SUM(CASE
+            WHEN ho.type = 2 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
+            WHEN ho.type = 2 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
+            WHEN ho.type = 24 THEN 100.0  -- Placeholder for Soroban transactions
+            ELSE 0
+        END)::float as total_volume_xlm
+    FROM history_operations ho
+    JOIN history_transactions ht ON ho.transaction_id = ht.id
+    WHERE
+        ho.type IN (2, 13, 24)  -- Payment, PathPaymentStrictSend, InvokeHostFunction
+        AND ht.successful = true
+        AND ht.created_at >= %s
+        AND ho.source_account LIKE 'G%%' ESCAPE ''
+    GROUP BY ho.source_account
+    HAVING COUNT(*) >= %s
+    ORDER BY num_swaps DESC, ho.source_account COLLATE "C";
+    """
+    conn = connect()
+    try:
+        with conn.cursor(name="universe_rankings") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, (start_time, min_swaps))
+            wallet_rankings = rankings_from_rows(cursor)
+        conn.commit()  # Close the server-side cursor's transaction
+    finally:
+        conn.close()
+    print(f"Ranked {len(wallet_rankings)} accounts (full universe)")
+    return wallet_rankings
+
+# Ranking records from (source_account, num_swaps, total_volume_xlm) rows, in row order
+def rankings_from_rows(rows):
+    return [
+        {"source_account": account, "num_swaps": num_swaps, "total_volume_xlm": total_volume_xlm or 0.0}
+        for account, num_swaps, total_volume_xlm in rows
+    ]
+
+# Aggregation statement for one time slice [slice_start, slice_end).
+# Volumes are summed as numeric so the partial sums merge exactly client-side; the merged total
+# converts to the same float as fetch_swaps()' SUM(...)::float.
+def swaps_slice_statement(slice_start, slice_end):
+    query = """
+    SELECT
+        ho.source_account,
+        COUNT(*) as num_swaps,
+        SUM(CASE
+            WHEN ho.type = 2 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
+            WHEN ho.type = 2 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::numeric
+            WHEN ho.type = 13 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::numeric
+            WHEN ho.type = 24 THEN 100.0  -- Placeholder for Soroban transactions
+            ELSE 0
+        END) as total_volume_xlm
+    FROM history_operations ho
+    JOIN history_transactions ht ON ho.transaction_id = ht.id
+    WHERE
+        ho.type IN (2, 13, 24)  -- Payment, PathPaymentStrictSend, InvokeHostFunction
+        AND ht.successful = true
+        AND ht.created_at >= %s
+        AND (%s::timestamptz IS NULL OR ht.created_at < %s)
+        AND ho.source_account LIKE 'G%%' ESCAPE ''
+    GROUP BY ho.source_account;
+    """
+    return (query, (slice_start, slice_end, slice_end))
+
+# Parallel variant of fetch_swaps(): split the window into time slices, scan them concurrently
+# (one pooled connection each), merge the per-account partials and select the global top K
+# (every account when limit is None)
+def fetch_swaps_parallel(num_slices=4, min_swaps=MIN_SWAPS, limit=TOP_ACCOUNTS):
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(hours=WINDOW_HOURS)
+    slice_length = (end_time - start_time) / num_slices
+    slices = []
+    for i in range(num_slices):
+        slice_start = start_time + slice_length * i
+        # The last slice stays open-ended, like the single query
+        slice_end = start_time + slice_length * (i + 1) if i < num_slices - 1 else None
+        slices.append((slice_start, slice_end))
+
+    totals = {}
+    for results in run_queries([swaps_slice_statement(*bounds) for bounds in slices]):
+        for account, num_swaps, total_volume_xlm in results:
+            account_totals = totals.get(account)
+            if account_totals is None:
+                totals[account] = [num_swaps, total_volume_xlm or 0]
+            else:
+                account_totals[0] += num_swaps
+                account_totals[1] += total_volume_xlm or 0
+
+    # HAVING COUNT(*) >= min_swaps ORDER BY num_swaps DESC LIMIT limit
+    candidates = (
+        (account, num_swaps, total_volume_xlm)
+        for account, (num_swaps, total_volume_xlm) in totals.items()
+        if num_swaps >= min_swaps
+    )
+    if limit is None:
+        top_accounts = sorted(candidates, key=lambda x: (-x[1], x[0]))
+    else:
+        # Ties ordered by account, like fetch_swaps()
+        top_accounts = heapq.nsmallest(limit, candidates, key=lambda x: (-x[1], x[0]))
+    return [
+        {"source_account": account, "num_swaps": num_swaps, "total_volume_xlm": float(total_volume_xlm)}
+        for account, num_swaps, total_volume_xlm in top_accounts
+    ]
+
+# Load the incremental ingestion state: high-water mark, hourly per-account ring buffer, the
+# oldest hour the ring holds completely (covered_from_hour) and the hour of the last ingestion
+def load_ingest_state(path=INGEST_STATE_FILE, capacity=RING_CAPACITY_HOURS):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return {
+            "last_operation_id": data["last_operation_id"],
+            "ring": HourlyRingBuffer.from_dict(data["ring"], capacity=capacity),
+            # States written before backfilling have neither and start over from the window
+            "covered_from_hour": data.get("covered_from_hour"),
+            "ingested_hour": data.get("ingested_hour")
+        }
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return {"last_operation_id": None, "ring": HourlyRingBuffer(capacity), "covered_from_hour": None,
+                "ingested_hour": None}
+
+# Persist the ingestion state atomically so a crash never leaves a half-written file
+def save_ingest_state(state, path=INGEST_STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "last_operation_id": state["last_operation_id"],
+            "ring": state["ring"].to_dict(),
+            "covered_from_hour": state["covered_from_hour"],
+            "ingested_hour": state["ingested_hour"]
+        }, f)
+    os.replace(tmp_path, path)
+
+# Per-account, per-hour aggregates of the operations matching `condition` (parameterized on
+# the operation id and created_at bounds), with the largest operation id of each group
+def hourly_swaps_query(condition):
+    return f"""
+    SELECT
+        ho.source_account,
+        date_trunc('hour', ht.created_at) as bucket,
+        COUNT(*) as num_swaps,
+        SUM(CASE
+            WHEN ho.type = 2 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::float
+            WHEN ho.type = 2 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::float
+            WHEN ho.type = 13 AND ho.details->>'source_asset_type' = 'native' THEN (ho.details->>'source_amount')::float
+            WHEN ho.type = 13 AND ho.details->>'asset_type' = 'native' THEN (ho.details->>'amount')::float
+            WHEN ho.type = 24 THEN 100.0  -- Placeholder for Soroban transactions
+            ELSE 0
+        END) as total_volume_xlm,
+        MAX(ho.id) as max_operation_id
+    FROM history_operations ho
+    JOIN history_transactions ht ON ho.transaction_id = ht.id
+    WHERE
+        ho.type IN (2, 13, 24)  -- Payment, PathPaymentStrictSend, InvokeHostFunction
+        AND ht.successful = true
+        AND {condition}
+        AND ho.source_account LIKE 'G%%' ESCAPE ''
+    GROUP BY ho.source_account, bucket
+    ORDER BY bucket;
+    """
+
+# Pull only the operations past the saved high-water mark and fold them into hourly buckets.
+# history_operations.id is a TOID (ledger/tx/op order), so "ho.id > last id" never skips
+# or repeats an operation and is served by the primary key index.
+# A first run (or one after lost state, or after a gap longer than the ranking window) only
+# scans the WINDOW_HOURS window plus the current hour, the same span as fetch_swaps(); older
+# hours are filled later by backfill_older_hours().
+def ingest_new_swaps(state):
+    ring = state["ring"]
+    current_hour = hour_number(datetime.now(timezone.utc))
+    last_operation_id = state["last_operation_id"] or 0
+    if state["ingested_hour"] is None or current_hour - state["ingested_hour"] > WINDOW_HOURS:
+        # Older buckets would leave a hole before the new scan; start over from the window
+        ring = state["ring"] = HourlyRingBuffer(ring.capacity)
+        state["covered_from_hour"] = current_hour - WINDOW_HOURS
+        last_operation_id = 0
+    covered_from_hour = max(state["covered_from_hour"], current_hour - ring.capacity + 1)
+    query = hourly_swaps_query("ho.id > %s  -- High-water mark from the previous run\n"
+                               "        AND ht.created_at >= %s")
+    results = run_query(query, (last_operation_id, hour_start(covered_from_hour)))
+
+    max_operation_id = last_operation_id
+    for row in results:
+        ring.add(row[1], row[0], row[2], row[3], current_hour=current_hour)
+        max_operation_id = max(max_operation_id, row[4])
+
+    state["last_operation_id"] = max_operation_id
+    state["covered_from_hour"] = covered_from_hour
+    state["ingested_hour"] = current_hour
+    print(f"Ingested {len(results)} new account/hour aggregates (high-water mark: {max_operation_id})")
+    return state
+
+# Fill up to `max_hours` hours before covered_from_hour, walking back until the ring holds its
+# whole capacity. Only operations up to the high-water mark are read: later ones are counted
+# by ingest_new_swaps(), so nothing is added twice.
+def backfill_older_hours(state, max_hours=BACKFILL_HOURS_PER_RUN):
+    ring = state["ring"]
+    current_hour = state["ingested_hour"]
+    oldest_hour = current_hour - ring.capacity + 1
+    covered_from_hour = state["covered_from_hour"]
+    if covered_from_hour <= oldest_hour:
+        return state
+    from_hour = max(oldest_hour, covered_from_hour - max_hours)
+    query = hourly_swaps_query("ho.id <= %s\n"
+                               "        AND ht.created_at >= %s AND ht.created_at < %s")
+    results = run_query(query, (state["last_operation_id"], hour_start(from_hour), hour_start(covered_from_hour)))
+    for row in results:
+        ring.add(row[1], row[0], row[2], row[3], current_hour=current_hour)
+    state["covered_from_hour"] = from_hour
+    print(f"Backfilled {covered_from_hour - from_hour} older hours "
+          f"({current_hour - from_hour}h of {ring.capacity - 1}h now covered)")
+    return state
+
+# Rank accounts over a window of hourly buckets, matching fetch_swaps() filters and ordering
+# (every account when limit is None). An N-hour window sums the current, partially filled
+# bucket plus the N whole hours before it, so it holds every swap of the last N hours plus
+# those from the start of the oldest hour (N to N+1 hours).
+def rank_window(ring, hours, min_swaps=MIN_SWAPS, limit=TOP_ACCOUNTS):
+    totals = ring.window_totals(hours + 1)
+    wallet_rankings = [
+        {"source_account": account, "num_swaps": num_swaps, "total_volume_xlm": total_volume_xlm}
+        for account, (num_swaps, total_volume_xlm) in totals.items()
+        if num_swaps >= min_swaps
+    ]
+    # Ties ordered by account, like fetch_swaps() (COLLATE "C" is code point order for G-addresses)
+    wallet_rankings.sort(key=lambda x: (-x["num_swaps"], x["source_account"]))
+    return wallet_rankings if limit is None else wallet_rankings[:limit]
+
+# Incremental variant of fetch_swaps(): only scans operations added since the last run and
+# returns rankings for every requested window from that single ingestion pass
+def fetch_swaps_incremental(windows=(WINDOW_HOURS,), state_path=INGEST_STATE_FILE, min_swaps=MIN_SWAPS,
+                            limit=TOP_ACCOUNTS):
+    state = ingest_new_swaps(load_ingest_state(state_path))
+    save_ingest_state(state, state_path)
     try:
-        wallet_rankings = fetch_swaps()
+        state = backfill_older_hours(state)
+        save_ingest_state(state, state_path)
+    except Exception as e:
+        # The new operations are already saved; the older hours are retried next run
+        print(f"Backfill of older hours failed: {e}")
 
-        # Archive the current wallet_rankings.json with a timestamp
-        if os.path.exists("wallet_rankings.json"):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            os.rename("wallet_rankings.json", f"backups/wallet_rankings_{timestamp}.json")
+    now = datetime.now(timezone.utc)
+    current_hour = hour_number(now)
+    for hours in windows:
+        window_start = hour_start(current_hour - hours)
+        covered_start = max(window_start, hour_start(state["covered_from_hour"]))
+        span = (now - covered_start) / timedelta(hours=1)
+        if covered_start > window_start:
+            print(f"{hours}h window: only swaps since {covered_start:%Y-%m-%d %H:%M} UTC ({span:.1f}h) "
+                  f"are ingested so far; older hours are backfilled on later runs")
+        else:
+            print(f"{hours}h window: swaps since {window_start:%Y-%m-%d %H:%M} UTC ({span:.1f}h)")
+    return {hours: rank_window(state["ring"], hours, min_swaps, limit) for hours in windows}
 
-        with open("wallet_rankings.json", "w") as f:
-            json.dump(wallet_rankings, f, indent=2)
+# Archive the previous rankings file and write the new one
+def save_rankings(wallet_rankings, file_path):
+    if os.path.exists(file_path):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name, ext = os.path.splitext(file_path)
+        os.rename(file_path, f"backups/{name}_{timestamp}{ext}")
 
-        print(f"Saved {len(wallet_rankings)} wallet rankings to wallet_rankings.json")
+    with open(file_path, "w") as f:
+        json.dump(wallet_rankings, f, indent=2)
+
+    print(f"Saved {len(wallet_rankings)} wallet rankings to {file_path}")
+
+# Compute the WINDOW_HOURS rankings with the selected strategy.
+# Returns (wallet_rankings, {hours: rankings}) where the dict holds the extra incremental windows.
+# The incremental rankings of an N-hour window cover N to N+1 hours of swaps (whole hourly
+# buckets, see rank_window); the other strategies cover exactly the last N hours.
+# With universe=True every active account is ranked instead of the top TOP_ACCOUNTS.
+def compute_rankings(incremental=False, extra_windows=(), slices=1, universe=False):
+    print("Fetching swaps from Horizon PostgreSQL database...")
+    min_swaps, limit = (UNIVERSE_MIN_SWAPS, None) if universe else (MIN_SWAPS, TOP_ACCOUNTS)
+    if incremental:
+        rankings_by_window = fetch_swaps_incremental(windows=[WINDOW_HOURS] + list(extra_windows),
+                                                     min_swaps=min_swaps, limit=limit)
+        return rankings_by_window[WINDOW_HOURS], {hours: rankings_by_window[hours] for hours in extra_windows}
+    if slices > 1:
+        return fetch_swaps_parallel(num_slices=slices, min_swaps=min_swaps, limit=limit), {}
+    if universe:
+        return fetch_swaps_universe(min_swaps=min_swaps), {}
+    return fetch_swaps(), {}
+
+# Main script logic
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank network-wide wallets by swap activity")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only scan operations added since the last run (state kept in {INGEST_STATE_FILE})")
+    parser.add_argument("--windows", default="",
+                        help="extra comma-separated windows in hours (e.g. 1,6,24,168), published as "
+                             "wallet_rankings_<N>h.json from the same incremental pass; each covers N to "
+                             "N+1 hours of swaps (whole hourly buckets)")
+    parser.add_argument("--slices", type=int, default=1,
+                        help="split the window into N time slices scanned concurrently on pooled connections")
+    parser.add_argument("--universe", action="store_true",
+                        help=f"rank every active account instead of the top {TOP_ACCOUNTS} by swap count")
+    args = parser.parse_args()
+    extra_windows = [int(hours) for hours in args.windows.split(",") if hours.strip()]
+    if extra_windows and not args.incremental:
+        parser.error("--windows requires --incremental")
+
+    try:
+        wallet_rankings, extra_rankings = compute_rankings(args.incremental, extra_windows, args.slices, args.universe)
+        for hours, rankings in extra_rankings.items():
+            save_rankings(rankings, f"wallet_rankings_{hours}h.json")
+        save_rankings(wallet_rankings, "wallet_rankings.json")
     except Exception as e:
         print(f"Error occurred: {e}")
-    finally:
-        # Clean up
-        cursor.close()
-        conn.close()
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Copy-trade scoring shared by analyze_copy_trade_candidates.py and
+# analyze_domain_copy_trade_candidates.py.
+# Each analyzer supplies a feature extractor that maps one of its wallet records to
+# (net_xlm_change, num_swaps, total_volume_xlm, profit_swaps, asset_pairs, round_trip_profit):
+# profit_swaps is the swap count per-swap profit is measured over, and round_trip_profit tells
+# whether the wallet made money on round trips. The features of all wallets go into one matrix;
+# the normalizing maxima are column-wise reductions and scores, risk levels and trade types are
+# computed for every wallet at once.
+
+# Score weights (applied to features normalized by their maximum over the scored wallets):
+# - profitability: higher net_xlm_change is better
+# - activity: higher daily_swaps is better
+# - efficiency: higher per_swap_profit is better
+# - stability: lower pair_diversity is better (less volatility)
+WEIGHTS = {"profitability": 0.4, "activity": 0.3, "efficiency": 0.2, "stability": 0.1}
+
+# Risk rules: "Low" above LOW_RISK_DAILY_SWAPS daily swaps, "Moderate" above
+# MODERATE_RISK_DAILY_SWAPS, otherwise "High"; more than MAX_STABLE_PAIRS pairs raises the risk
+# one level
+RISK_RULES = {"low_risk_daily_swaps": 100, "moderate_risk_daily_swaps": 10, "max_stable_pairs": 20}
+
+SWAP_WINDOW_DAYS = 2.0  # num_swaps covers the 48-hour ranking window
+
+RISK_LEVELS = np.array(["Low", "Moderate", "High"])
+TRADE_TYPES = np.array(["Directional", "Directional and Round-Trips"])
+
+# Feature matrix columns
+NET_XLM, NUM_SWAPS, PROFIT_SWAPS, PAIR_DIVERSITY, ROUND_TRIP_PROFIT = range(5)
+
+# x / max(x) per column where the maximum is positive, `default` elsewhere
+def normalize(values, default):
+    peak = values.max()
+    return values / peak if peak > 0 else np.full_like(values, default)
+
+# Score every wallet and return the ranked records, best score first (ties keep input order)
+def score_wallets(wallets, extract_features, weights=WEIGHTS, risk_rules=RISK_RULES):
+    if not wallets:
+        return []
+    features = [extract_features(wallet) for wallet in wallets]
+    matrix = np.array([(net, swaps, profit_swaps, len(pairs), round_trip)
+                       for net, swaps, _, profit_swaps, pairs, round_trip in features], dtype=float)
+
+    net_xlm = matrix[:, NET_XLM]
+    profit_swaps = matrix[:, PROFIT_SWAPS]
+    per_swap_profit = np.divide(net_xlm, profit_swaps, out=np.zeros_like(net_xlm), where=profit_swaps > 0)
+    daily_swaps = matrix[:, NUM_SWAPS] / SWAP_WINDOW_DAYS
+    pair_diversity = matrix[:, PAIR_DIVERSITY]
+
+    score = (
+        weights["profitability"] * normalize(net_xlm, 0.0) +
+        weights["activity"] * normalize(daily_swaps, 0.0) +
+        weights["efficiency"] * normalize(per_swap_profit, 0.0) +
+        weights["stability"] * (1 - normalize(pair_diversity, 0.0))
+    )
+
+    # Risk level index: 0 Low, 1 Moderate, 2 High; a wide pair spread raises Low to Moderate
+    # and anything else to High
+    risk = np.where(daily_swaps > risk_rules["low_risk_daily_swaps"], 0,
+                    np.where(daily_swaps > risk_rules["moderate_risk_daily_swaps"], 1, 2))
+    risk = np.where(pair_diversity > risk_rules["max_stable_pairs"], np.where(risk == 0, 1, 2), risk)
+    risk_level = RISK_LEVELS[risk].tolist()
+    trade_type = TRADE_TYPES[(matrix[:, ROUND_TRIP_PROFIT] > 0).astype(int)].tolist()
+
+    ranking = np.argsort(-score, kind="stable").tolist()
+    per_swap_profit, daily_swaps, score = per_swap_profit.tolist(), daily_swaps.tolist(), score.tolist()
+    ranked_wallets = []
+    for i in ranking:
+        net, swaps, volume, _, pairs, _ = features[i]
+        ranked_wallets.append({
+            "source_account": wallets[i]["source_account"],
+            "net_xlm_change": net,
+            "num_swaps": swaps,
+            "total_volume_xlm": volume,
+            "per_swap_profit": per_swap_profit[i],
+            "daily_swaps": daily_swaps[i],
+            "pair_diversity": len(pairs),
+            "asset_pairs": pairs,
+            "score": score[i],
+            "risk_level": risk_level[i],
+            "trade_type": trade_type[i]
+        })
+    return ranked_wallets
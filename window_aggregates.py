@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+SECONDS_PER_HOUR = 3600
+
+# Timestamp as an aware UTC datetime. Horizon's created_at is `timestamp without time zone`
+# holding UTC, so the cursor path returns naive datetimes while COPY and the cache return aware
+# ones; every comparison or conversion of swap times goes through here first.
+def as_utc(ts):
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+# Convert a timestamp into an absolute hour number (hours since the Unix epoch)
+def hour_number(ts):
+    return int(as_utc(ts).timestamp()) // SECONDS_PER_HOUR
+
+# Start of an absolute hour number as an aware UTC datetime
+def hour_start(hour):
+    return datetime.fromtimestamp(hour * SECONDS_PER_HOUR, tz=timezone.utc)
+
+# Ring buffer of hourly per-account aggregates (num_swaps, total_volume_xlm).
+# Slot i holds the hour h with h % capacity == i, so moving to a new hour only
+# replaces one slot's dict (O(1) expiry) and any window up to `capacity` hours
+# is answered as a sum over the most recent slots.
+# Buckets are whole clock hours and the newest one is still filling, so a sum of
+# N + 1 buckets holds every swap of the last N hours plus those since the start of
+# the oldest hour: between N and N + 1 hours of swaps, never exactly N. An N-hour
+# window therefore needs N + 1 slots (169 for 7 days).
+class HourlyRingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.slot_hours = [None] * capacity
+        self.slots = [{} for _ in range(capacity)]
+
+    # Return the bucket for an hour, recycling the slot if it still holds an expired hour
+    def _slot_for(self, hour):
+        index = hour % self.capacity
+        if self.slot_hours[index] != hour:
+            self.slot_hours[index] = hour
+            self.slots[index] = {}
+        return self.slots[index]
+
+    # Fold an aggregate row for one account/hour into the buffer
+    def add(self, ts, account, num_swaps, total_volume_xlm, current_hour=None):
+        hour = hour_number(ts)
+        if current_hour is not None and hour <= current_hour - self.capacity:
+            return  # Older than anything the buffer can answer
+        bucket = self._slot_for(hour)
+        totals = bucket.get(account)
+        if totals is None:
+            bucket[account] = [num_swaps, total_volume_xlm or 0.0]
+        else:
+            totals[0] += num_swaps
+            totals[1] += total_volume_xlm or 0.0
+
+    # Sum the last `hours` buckets ending at `now` into {account: [num_swaps, total_volume_xlm]}
+    def window_totals(self, hours, now=None):
+        if hours > self.capacity:
+            raise ValueError(f"Window of {hours}h exceeds ring buffer capacity of {self.capacity}h")
+        current_hour = hour_number(now or datetime.now(timezone.utc))
+        totals = {}
+        for hour in range(current_hour - hours + 1, current_hour + 1):
+            index = hour % self.capacity
+            if self.slot_hours[index] != hour:
+                continue
+            for account, (num_swaps, total_volume_xlm) in self.slots[index].items():
+                account_totals = totals.get(account)
+                if account_totals is None:
+                    totals[account] = [num_swaps, total_volume_xlm]
+                else:
+                    account_totals[0] += num_swaps
+                    account_totals[1] += total_volume_xlm
+        return totals
+
+    # Serialize only the live slots, keyed by hour number
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "slots": {
+                str(hour): bucket
+                for hour, bucket in zip(self.slot_hours, self.slots)
+                if hour is not None
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data, capacity=None):
+        ring = cls(capacity or data["capacity"])
+        # Replay in hour order so newer hours win when the capacity shrank
+        for hour in sorted(data["slots"], key=int):
+            ring._slot_for(int(hour)).update(data["slots"][hour])
+        return ring